@@ -1,12 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta, date
 import pandas as pd
-from app.services.excel_service import ExcelService
-from app.core.config import settings
+import numpy as np
+from app.services.accessories import weekly_volume
+from app.services.dataset_registry import DatasetProxy
+from app.services.timeline import PRODUCTIVITY_KEY, TrendIndicators
+from app.services.habit_stats import activity_patterns, habit_correlations, value_distribution
+from app.services.series import GRANULARITIES, SERIES_METRICS, compute_series, packed_bitsets, window_kpis
 
 router = APIRouter()
-excel_service = ExcelService(settings.EXCEL_DATA_PATH)
+# Excel service of the dataset selected by the request URL
+excel_service = DatasetProxy("excel_service")
 
 def calculate_perfect_days_streak(entries, habits):
     """Calculate the longest streak of perfect days (all habits completed)"""
@@ -51,18 +56,53 @@ def calculate_perfect_days_streak(entries, habits):
     
     return best_streak
 
+def productivity_window_kpis(data: Dict[str, Any], windows: List[int], compare_last_year: bool = False) -> Optional[Dict[str, Any]]:
+    """KPIs of daily productivity minutes (all time habits) for windows ending on the last logged day"""
+    timeline = data['timeline']
+    time_rows = timeline.rows(timeline.habit_ids_of_type('time'))
+    logged_days = np.flatnonzero(timeline.present[time_rows].any(axis=0)) if time_rows else []
+    if len(logged_days) == 0:
+        return None
+
+    anchor = int(logged_days[-1])
+    anchor_date = timeline.date_at(anchor)
+    last_year_anchor = None
+    if compare_last_year:
+        # Feb 29 falls back to Feb 28
+        last_year_date = anchor_date.replace(year=anchor_date.year - 1, day=min(anchor_date.day, 28 if anchor_date.month == 2 else 31))
+        last_year_anchor = timeline.day_index(last_year_date)
+
+    results = window_kpis(data['rollup'].productivity_minutes, anchor, windows, last_year_anchor)
+    for result in results.values():
+        for period in ("current", "previous", "last_year"):
+            if period in result:
+                result[period]["total_hours"] = result[period]["total"] / 60  # Convert to hours
+
+    return {
+        "end": str(anchor_date),
+        "windows": {str(days): result for days, result in results.items()}
+    }
+
+def add_trend_series(chart_data: List[Dict[str, Any]], data: Dict[str, Any]):
+    """Add moving averages and the trend slope of total productive minutes to each chart day"""
+    indicators = data['trends']
+    timeline = data['timeline']
+    if not indicators.num_days or not chart_data:
+        return
+    days = np.array([timeline.day_index(date.fromisoformat(day_data["date"])) for day_data in chart_data])
+    known = (days >= 0) & (days < indicators.num_days)
+    values = indicators.indicators([indicators.key_index[PRODUCTIVITY_KEY]], np.clip(days, 0, indicators.num_days - 1))
+    for i, day_data in enumerate(chart_data):
+        day_data["trend"] = {name: float(series[0, i]) if known[i] else None for name, series in values.items()}
+
 @router.get("/")
 def get_analytics() -> Dict[str, Any]:
     """Get analytics data"""
     try:
-        all_habits = []
-        all_entries = []
         excel_files = excel_service.find_excel_files()
-        
-        for file_path in excel_files:
-            data = excel_service.parse_excel_file(file_path)
-            all_habits.extend(data['habits'])
-            all_entries.extend(data['entries'])
+        data = excel_service.load_data(excel_files)
+        all_habits = data['habits']
+        all_entries = data['entries']
         
         streaks = excel_service.calculate_streaks(all_entries)
         
@@ -85,23 +125,20 @@ def get_analytics() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Error loading analytics: {str(e)}")
 
 @router.get("/productivity-chart")
-def get_productivity_chart() -> Dict[str, Any]:
-    """Get productivity chart data by categories for last 7 days"""
+def get_productivity_chart(trends: bool = False) -> Dict[str, Any]:
+    """Get productivity chart data by categories for last 7 days (?trends=true adds moving averages of the total)"""
     try:
         excel_files = excel_service.find_excel_files()
         if not excel_files:
             return {"chart_data": [], "categories": [], "category_colors": {}}
         
-        # Parse Excel file to get real data
-        file_path = excel_files[0]
-        data = excel_service.parse_excel_file(file_path)
-        
-        # Get productivity columns directly from Excel for analytics (independent of habit visibility)
-        import pandas as pd
-        df = pd.read_excel(file_path)
-        
         # Define productivity columns that should always appear in analytics
         productivity_columns = ['Tech + Praca', 'YouTube', 'Czytanie', 'Gitara', 'Inne']
+        
+        # Only these columns of the last 7 days of the core sheets (independent of habit visibility)
+        df = excel_service.load_frame(excel_files, 'core', columns=productivity_columns, last_days=7)
+        if df is None:
+            return {"chart_data": [], "categories": [], "category_colors": {}}
         available_productivity_columns = [col for col in productivity_columns if col in df.columns]
         
         print(f"Available productivity columns for analytics: {available_productivity_columns}")
@@ -109,17 +146,8 @@ def get_productivity_chart() -> Dict[str, Any]:
         if not available_productivity_columns:
             return {"chart_data": [], "categories": [], "category_colors": {}}
         
-        # Process data directly from Excel for analytics
-        date_col = df.columns[0]  # First column is date
-        
-        # Parse dates
-        try:
-            df[date_col] = pd.to_datetime(df[date_col], dayfirst=True).dt.date
-        except:
-            try:
-                df[date_col] = pd.to_datetime(df[date_col], format='%d.%m.%Y').dt.date
-            except:
-                df[date_col] = pd.to_datetime(df[date_col]).dt.date
+        # Dates are already parsed in the merged frames
+        date_col = 'date'
         
         # Get most recent 7 days of data
         all_dates = df[date_col].dropna()
@@ -186,6 +214,9 @@ def get_productivity_chart() -> Dict[str, Any]:
             else:
                 category_colors[category] = fallback_colors[i % len(fallback_colors)]
         
+        if trends:
+            add_trend_series(chart_data, excel_service.load_data(excel_files))
+
         return {
             "chart_data": chart_data,
             "categories": categories,
@@ -210,9 +241,8 @@ def get_productivity_metrics() -> Dict[str, Any]:
                 "total_productive_hours_change": 0
             }
         
-        # Parse Excel file to get real data
-        file_path = excel_files[0]
-        data = excel_service.parse_excel_file(file_path)
+        # Merge all workbooks into one timeline
+        data = excel_service.load_data(excel_files)
         
         # Get time-based habits
         time_habits = [h for h in data['habits'] if h.habit_type == 'time']
@@ -228,22 +258,8 @@ def get_productivity_metrics() -> Dict[str, Any]:
                 "total_productive_hours_change": 0
             }
         
-        # Get entries for time-based habits
-        time_entries = [e for e in data['entries'] if e.habit_id in time_habit_ids]
-        
-        # Calculate daily totals
-        daily_totals = {}
-        for entry in time_entries:
-            date_key = entry.date.date() if hasattr(entry.date, 'date') else entry.date
-            if date_key not in daily_totals:
-                daily_totals[date_key] = 0
-            try:
-                value = float(entry.value) if entry.value not in ['NA', 'nan', None, ''] else 0
-            except (ValueError, TypeError):
-                value = 0
-            daily_totals[date_key] += value
-        
-        if not daily_totals:
+        kpis = productivity_window_kpis(data, [7])
+        if kpis is None:
             return {
                 "avg_daily_productivity": 0,
                 "max_daily_productivity": 0,
@@ -253,90 +269,42 @@ def get_productivity_metrics() -> Dict[str, Any]:
                 "total_productive_hours_change": 0
             }
         
-        # Get most recent date and calculate periods
-        most_recent_date = max(daily_totals.keys())
-        current_week_start = most_recent_date - timedelta(days=6)
-        prev_week_start = most_recent_date - timedelta(days=13)
-        prev_week_end = most_recent_date - timedelta(days=7)
-        
-        # Calculate metrics for current 7 days
-        current_week_values = []
-        for i in range(7):
-            date = current_week_start + timedelta(days=i)
-            current_week_values.append(daily_totals.get(date, 0))
-        
-        # Calculate metrics for previous 7 days
-        prev_week_values = []
-        for i in range(7):
-            date = prev_week_start + timedelta(days=i)
-            prev_week_values.append(daily_totals.get(date, 0))
-        
-        # Current period metrics
-        avg_daily_current = sum(current_week_values) / len(current_week_values) if current_week_values else 0
-        max_daily_current = max(current_week_values) if current_week_values else 0
-        total_hours_current = sum(current_week_values) / 60  # Convert to hours
-        
-        # Previous period metrics
-        avg_daily_prev = sum(prev_week_values) / len(prev_week_values) if prev_week_values else 0
-        max_daily_prev = max(prev_week_values) if prev_week_values else 0
-        total_hours_prev = sum(prev_week_values) / 60 if prev_week_values else 0
-        
-        # Calculate percentage changes
-        def calculate_change(current, previous):
-            if previous == 0:
-                return 0 if current == 0 else 100
-            return ((current - previous) / previous) * 100
-        
-        avg_change = calculate_change(avg_daily_current, avg_daily_prev)
-        max_change = calculate_change(max_daily_current, max_daily_prev)
-        hours_change = calculate_change(total_hours_current, total_hours_prev)
-        
+        # Last 7 days vs previous 7 days
+        week = kpis["windows"]["7"]
         return {
-            "avg_daily_productivity": float(avg_daily_current),
-            "max_daily_productivity": float(max_daily_current),
-            "total_productive_hours": float(total_hours_current),
-            "avg_daily_productivity_change": float(avg_change),
-            "max_daily_productivity_change": float(max_change),
-            "total_productive_hours_change": float(hours_change)
+            "avg_daily_productivity": week["current"]["avg"],
+            "max_daily_productivity": week["current"]["max"],
+            "total_productive_hours": week["current"]["total_hours"],
+            "avg_daily_productivity_change": week["change"]["avg"],
+            "max_daily_productivity_change": week["change"]["max"],
+            "total_productive_hours_change": week["change"]["total"]
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading productivity metrics: {str(e)}")
 
 @router.get("/productivity-chart-30days")
-def get_productivity_chart_30days() -> Dict[str, Any]:
-    """Get productivity chart data for last 30 days"""
+def get_productivity_chart_30days(trends: bool = False) -> Dict[str, Any]:
+    """Get productivity chart data for last 30 days (?trends=true adds moving averages of the total)"""
     try:
         excel_files = excel_service.find_excel_files()
         if not excel_files:
             return {"chart_data": [], "categories": [], "category_colors": {}}
         
-        # Parse Excel file to get real data
-        file_path = excel_files[0]
-        data = excel_service.parse_excel_file(file_path)
-        
-        # Get productivity columns directly from Excel for analytics (independent of habit visibility)
-        import pandas as pd
-        df = pd.read_excel(file_path)
-        
         # Define productivity columns that should always appear in analytics
         productivity_columns = ['Tech + Praca', 'YouTube', 'Czytanie', 'Gitara', 'Inne']
+        
+        # Only these columns of the last 30 days of the core sheets (independent of habit visibility)
+        df = excel_service.load_frame(excel_files, 'core', columns=productivity_columns, last_days=30)
+        if df is None:
+            return {"chart_data": [], "categories": [], "category_colors": {}}
         available_productivity_columns = [col for col in productivity_columns if col in df.columns]
         
         if not available_productivity_columns:
             return {"chart_data": [], "categories": [], "category_colors": {}}
         
-        # Process data directly from Excel for analytics
-        date_col = df.columns[0]  # First column is date
-        
-        # Parse dates
-        try:
-            df[date_col] = pd.to_datetime(df[date_col], dayfirst=True).dt.date
-        except:
-            try:
-                df[date_col] = pd.to_datetime(df[date_col], format='%d.%m.%Y').dt.date
-            except:
-                df[date_col] = pd.to_datetime(df[date_col]).dt.date
+        # Dates are already parsed in the merged frames
+        date_col = 'date'
         
         # Get most recent 30 days of data
         all_dates = df[date_col].dropna()
@@ -403,6 +371,9 @@ def get_productivity_chart_30days() -> Dict[str, Any]:
             else:
                 category_colors[category] = fallback_colors[i % len(fallback_colors)]
         
+        if trends:
+            add_trend_series(chart_data, excel_service.load_data(excel_files))
+
         return {
             "chart_data": chart_data,
             "categories": categories,
@@ -420,8 +391,7 @@ def debug_data() -> Dict[str, Any]:
         if not excel_files:
             return {"error": "No Excel files found", "data_path": str(excel_service.data_path)}
         
-        file_path = excel_files[0]
-        data = excel_service.parse_excel_file(file_path)
+        data = excel_service.load_data(excel_files)
         
         # Return summary of parsed data
         habits_summary = []
@@ -446,13 +416,14 @@ def debug_data() -> Dict[str, Any]:
         all_entry_dates = [e.date.date() if hasattr(e.date, 'date') else e.date for e in data['entries']]
         most_recent_date = max(all_entry_dates) if all_entry_dates else None
         
-        # Read raw Excel to check columns
-        import pandas as pd
-        raw_df = pd.read_excel(file_path)
-        all_columns = list(raw_df.columns)
+        # Columns of the merged core sheets
+        core_df = data['frames'].get('core')
+        all_columns = [str(col) for col in core_df.columns] if core_df is not None else []
         
         return {
-            "file_path": str(file_path),
+            "files": data['files'],
+            "dataset_version": data['version'],
+            "timeline": data['timeline'].summary(),
             "habits_count": len(data['habits']),
             "entries_count": len(data['entries']),
             "habits": habits_summary,
@@ -474,30 +445,16 @@ def debug_data() -> Dict[str, Any]:
 def get_recent_workouts() -> Dict[str, Any]:
     """Get recent workout data from workouts sheet"""
     try:
-        import pandas as pd
-
         excel_files = excel_service.find_excel_files()
         if not excel_files:
             print("No Excel files found for workouts")
             return {"workouts": []}
 
-        file_path = excel_files[0]
-        print(f"Reading workouts from: {file_path}")
-
-        # Try to read workouts sheet with different case variations
-        workouts_df = None
-        for sheet_name in ['workouts', 'Workouts', 'WORKOUTS']:
-            try:
-                workouts_df = pd.read_excel(file_path, sheet_name=sheet_name)
-                print(f"Successfully read sheet '{sheet_name}' with shape {workouts_df.shape}")
-                print(f"Columns: {list(workouts_df.columns)}")
-                break
-            except Exception as e:
-                print(f"Failed to read sheet '{sheet_name}': {e}")
-                continue
+        # Only the newest rows of the workouts sheets are needed for the last 20 workouts
+        workouts_df = excel_service.load_frame(excel_files, 'workouts', last_rows=20)
 
         if workouts_df is None:
-            print("Could not find workouts sheet in any case variation")
+            print("No workouts sheet found in any workbook")
             return {"workouts": []}
 
         # Parse columns: Date, Activity, Time, Grade, Avg_HR
@@ -505,16 +462,11 @@ def get_recent_workouts() -> Dict[str, Any]:
 
         for _, row in workouts_df.iterrows():
             try:
-                # Parse date - try different column name variations
-                date_val = row.get('Data') or row.get('Date') or row.get('date') or row.get('DATA')
-                if pd.isna(date_val):
+                # Dates are already parsed in the merged frames
+                date_obj = row['date']
+                if pd.isna(date_obj):
                     continue
 
-                if isinstance(date_val, str):
-                    date_obj = pd.to_datetime(date_val, dayfirst=True).date()
-                else:
-                    date_obj = pd.to_datetime(date_val).date()
-
                 # Parse activity
                 activity = row.get('activity') or row.get('Activity') or row.get('ACTIVITY') or 'Unknown'
                 if pd.isna(activity):
@@ -573,12 +525,11 @@ def get_selfcare_summary() -> Dict[str, Any]:
         if not excel_files:
             return {"activities": []}
 
-        file_path = excel_files[0]
         activities = []
         today = datetime.now().date()
 
-        # Get parsed data from excel service
-        data = excel_service.parse_excel_file(file_path)
+        # Get merged data of all workbooks from excel service
+        data = excel_service.load_data(excel_files)
 
         # Define activities to track with their search terms and lucide icon names
         selfcare_config = [
@@ -612,19 +563,9 @@ def get_selfcare_summary() -> Dict[str, Any]:
                 })
 
         # Handle sauna and yoga from accessories column (if multi-sheet format)
-        xl_file = pd.ExcelFile(file_path)
-        if 'core' in xl_file.sheet_names:
-            df_core = pd.read_excel(file_path, sheet_name='core')
-
-            # Parse dates
-            date_col = df_core.columns[0]
-            try:
-                df_core[date_col] = pd.to_datetime(df_core[date_col], dayfirst=True).dt.date
-            except:
-                try:
-                    df_core[date_col] = pd.to_datetime(df_core[date_col], format='%d.%m.%Y').dt.date
-                except:
-                    df_core[date_col] = pd.to_datetime(df_core[date_col]).dt.date
+        df_core = data['frames'].get('core')
+        if df_core is not None:
+            date_col = 'date'
 
             # Find accessories column
             accessories_col = None
@@ -642,15 +583,9 @@ def get_selfcare_summary() -> Dict[str, Any]:
 
                 for activity_config in accessories_activities:
                     keyword = activity_config["keyword"]
-                    last_date = None
-
-                    for _, row in df_core.iterrows():
-                        if pd.notna(row[accessories_col]) and pd.notna(row[date_col]):
-                            accessories_text = str(row[accessories_col]).lower()
-                            if keyword in accessories_text:
-                                entry_date = row[date_col]
-                                if last_date is None or entry_date > last_date:
-                                    last_date = entry_date
+                    logged = df_core[df_core[accessories_col].notna() & df_core[date_col].notna()]
+                    matches = logged[accessories_col].astype(str).str.lower().str.contains(keyword, regex=False)
+                    last_date = logged.loc[matches, date_col].max() if matches.any() else None
 
                     days_since = None
                     if last_date:
@@ -678,77 +613,299 @@ def get_calendar_data(days: int = 14) -> List[Dict[str, Any]]:
         if not excel_files:
             return []
 
-        file_path = excel_files[0]
-        data = excel_service.parse_excel_file(file_path)
+        # Daily totals are rolled up once per dataset version, so any range is a slice
+        data = excel_service.load_data(excel_files)
+        return data['rollup'].calendar(days)
 
-        habits = data['habits']
-        entries = data['entries']
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading calendar data: {str(e)}")
+
+@router.get("/series")
+def get_series(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    granularity: str = "day",
+    metrics: str = "sum,completed",
+    habit: Optional[List[str]] = Query(None),
+    max_points: Optional[int] = Query(None, ge=1)
+) -> Dict[str, Any]:
+    """Per-habit metrics bucketed by day, week, month or year (defaults to the whole history).
+
+    max_points caps the number of points by joining consecutive buckets.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    metric_list = [m.strip() for m in metrics.split(',') if m.strip()]
+    unknown_metrics = [m for m in metric_list if m not in SERIES_METRICS]
+    if unknown_metrics or not metric_list:
+        raise HTTPException(status_code=400, detail=f"metrics must be a comma-separated list of: {', '.join(SERIES_METRICS)}")
 
-        # Get trackable habits (non-description types)
-        trackable_habits = [h for h in habits if h.habit_type in ['binary', 'time', 'grade']]
-        total_trackable = len(trackable_habits)
+    try:
+        excel_files = excel_service.find_excel_files()
+        if not excel_files:
+            return {"granularity": granularity, "buckets": [], "series": {}}
+
+        data = excel_service.load_data(excel_files)
+        timeline = data['timeline']
+        if timeline.num_days == 0:
+            return {"granularity": granularity, "buckets": [], "series": {}}
+
+        habit_ids = habit or timeline.habit_ids
+        unknown_habits = [h for h in habit_ids if h not in timeline.habit_index]
+        if unknown_habits:
+            raise HTTPException(status_code=404, detail=f"Habits not found: {', '.join(unknown_habits)}")
+
+        start = from_date or timeline.start
+        end = to_date or timeline.end
+        if start > end:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+        result = compute_series(timeline, habit_ids, start, end, granularity, metric_list, max_points)
+        result["version"] = data['version']
+        return result
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading series: {str(e)}")
 
-        # Get productivity time habits
-        time_habit_ids = [h.id for h in habits if h.habit_type == 'time']
+@router.get("/productivity-kpis")
+def get_productivity_kpis(windows: str = "7,30,90,365", compare_last_year: bool = False) -> Dict[str, Any]:
+    """Productivity avg/max/total for several windows vs their preceding windows (and optionally last year)"""
+    try:
+        window_list = sorted({int(w) for w in windows.split(',') if w.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="windows must be a comma-separated list of day counts")
+    if not window_list or window_list[0] < 1 or window_list[-1] > 3660:
+        raise HTTPException(status_code=400, detail="windows must be between 1 and 3660 days")
 
-        # Group entries by date
-        entries_by_date = {}
-        for entry in entries:
-            date_key = entry.date.date() if hasattr(entry.date, 'date') else entry.date
-            if date_key not in entries_by_date:
-                entries_by_date[date_key] = []
-            entries_by_date[date_key].append(entry)
+    try:
+        excel_files = excel_service.find_excel_files()
+        if not excel_files:
+            return {"end": None, "windows": {}}
 
-        # Get most recent date and calculate range
-        if not entries_by_date:
-            return []
+        data = excel_service.load_data(excel_files)
+        return productivity_window_kpis(data, window_list, compare_last_year) or {"end": None, "windows": {}}
 
-        most_recent_date = max(entries_by_date.keys())
-        start_date = most_recent_date - timedelta(days=days-1)
-
-        # Build calendar data
-        calendar_data = []
-        for i in range(days):
-            current_date = start_date + timedelta(days=i)
-            day_entries = entries_by_date.get(current_date, [])
-
-            # Count completed trackable habits
-            completed_count = 0
-            productivity_minutes = 0
-            workout_grade = None
-
-            for entry in day_entries:
-                if entry.completed:
-                    # Check if this is a trackable habit
-                    habit = next((h for h in trackable_habits if h.id == entry.habit_id), None)
-                    if habit:
-                        completed_count += 1
-
-                # Sum productivity minutes
-                if entry.habit_id in time_habit_ids:
-                    try:
-                        value = float(entry.value) if entry.value not in ['NA', 'nan', None, ''] else 0
-                        productivity_minutes += value
-                    except (ValueError, TypeError):
-                        pass
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading productivity KPIs: {str(e)}")
 
-                # Get workout grade
-                if 'workout_grade' in entry.habit_id:
-                    workout_grade = entry.value
+@router.get("/heatmap")
+def get_heatmap(year: Optional[int] = None, habit: Optional[List[str]] = Query(None)) -> Dict[str, Any]:
+    """Year of completions per habit as base64 bitsets (bit i = day i from Jan 1, little-endian bytes)"""
+    try:
+        excel_files = excel_service.find_excel_files()
+        if not excel_files:
+            return {"year": year, "habits": {}}
+
+        data = excel_service.load_data(excel_files)
+        timeline = data['timeline']
+        if year is None:
+            year = timeline.end.year if timeline.end else datetime.now().year
+        if not 1 <= year <= 9999:
+            raise HTTPException(status_code=400, detail="Invalid year")
+
+        habit_ids = habit or timeline.habit_ids_of_type('binary', 'time', 'grade')
+        unknown_habits = [h for h in habit_ids if h not in timeline.habit_index]
+        if unknown_habits:
+            raise HTTPException(status_code=404, detail=f"Habits not found: {', '.join(unknown_habits)}")
+
+        start = date(year, 1, 1)
+        days = (date(year, 12, 31) - start).days + 1
+        return {
+            "year": year,
+            "start": str(start),
+            "days": days,
+            "bit_order": "little",
+            "habits": packed_bitsets(timeline, habit_ids, start, days),
+            "version": data['version']
+        }
 
-            # Check if it's a perfect day
-            perfect_day = completed_count == total_trackable and total_trackable > 0
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading heatmap: {str(e)}")
+
+@router.get("/correlations")
+def get_correlations(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    min_days: int = Query(7, ge=1),
+    habit: Optional[List[str]] = Query(None)
+) -> Dict[str, Any]:
+    """Pairwise same-day completion correlation and next-day lift (rows: today's habit, columns: tomorrow's)"""
+    try:
+        excel_files = excel_service.find_excel_files()
+        if not excel_files:
+            return {"habits": [], "same_day": {}, "next_day": {}}
 
-            calendar_data.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "completed_habits": completed_count,
-                "total_habits": total_trackable,
-                "productivity_minutes": productivity_minutes,
-                "perfect_day": perfect_day,
-                "workout_grade": workout_grade
-            })
+        data = excel_service.load_data(excel_files)
+        timeline = data['timeline']
+        if timeline.num_days == 0:
+            return {"habits": [], "same_day": {}, "next_day": {}}
+
+        habit_ids = habit or timeline.habit_ids_of_type('binary', 'time', 'grade')
+        unknown_habits = [h for h in habit_ids if h not in timeline.habit_index]
+        if unknown_habits:
+            raise HTTPException(status_code=404, detail=f"Habits not found: {', '.join(unknown_habits)}")
+
+        start = from_date or timeline.start
+        end = to_date or timeline.end
+        if start > end:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+        result = habit_correlations(timeline, habit_ids, start, end, min_days)
+        return {**result, "version": data['version']}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading correlations: {str(e)}")
+
+@router.get("/patterns")
+def get_patterns(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    habit: Optional[List[str]] = Query(None)
+) -> Dict[str, Any]:
+    """Completion by weekday and month of year per habit, and productivity minutes by weekday and month"""
+    try:
+        excel_files = excel_service.find_excel_files()
+        if not excel_files:
+            return {"weekday": {}, "month_of_year": {}}
+
+        data = excel_service.load_data(excel_files)
+        timeline = data['timeline']
+        if timeline.num_days == 0:
+            return {"weekday": {}, "month_of_year": {}}
+
+        habit_ids = habit or timeline.habit_ids_of_type('binary', 'time', 'grade')
+        unknown_habits = [h for h in habit_ids if h not in timeline.habit_index]
+        if unknown_habits:
+            raise HTTPException(status_code=404, detail=f"Habits not found: {', '.join(unknown_habits)}")
+
+        start = from_date or timeline.start
+        end = to_date or timeline.end
+        if start > end:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+        result = activity_patterns(timeline, data['rollup'], habit_ids, start, end)
+        result["version"] = data['version']
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading patterns: {str(e)}")
+
+@router.get("/distribution")
+def get_distribution(
+    habit: Optional[str] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    bins: int = Query(20, ge=1, le=200)
+) -> Dict[str, Any]:
+    """Histogram, p50/p90/p99, zero-day ratio and std of a time habit's minutes (default: total productive minutes)"""
+    try:
+        excel_files = excel_service.find_excel_files()
+        if not excel_files:
+            return {"habit": habit or PRODUCTIVITY_KEY, "count": 0}
+
+        data = excel_service.load_data(excel_files)
+        timeline = data['timeline']
+        if timeline.num_days == 0:
+            return {"habit": habit or PRODUCTIVITY_KEY, "count": 0}
+
+        if habit is not None:
+            if habit not in timeline.habit_index:
+                raise HTTPException(status_code=404, detail=f"Habits not found: {habit}")
+            if timeline.habits[timeline.habit_index[habit]].habit_type != 'time':
+                raise HTTPException(status_code=400, detail=f"Habit '{habit}' is not a time habit")
+
+        start = from_date or timeline.start
+        end = to_date or timeline.end
+        if start > end:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+        result = value_distribution(timeline, habit or PRODUCTIVITY_KEY, start, end, bins)
+        return {"habit": habit or PRODUCTIVITY_KEY, **result, "version": data['version']}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading distribution: {str(e)}")
+
+# Trends within this share of the 28-day average over 28 days are reported as flat
+TREND_FLAT_RATIO = 0.05
+
+@router.get("/trends")
+def get_trends(as_of: Optional[date] = None, habit: Optional[List[str]] = Query(None)) -> Dict[str, Any]:
+    """Latest value, 7/28-day SMA and EWMA and 28-day slope per habit and for total productive minutes"""
+    try:
+        excel_files = excel_service.find_excel_files()
+        if not excel_files:
+            return {"as_of": None, "trends": {}}
+
+        data = excel_service.load_data(excel_files)
+        timeline = data['timeline']
+        indicators = data['trends']
+        if timeline.num_days == 0:
+            return {"as_of": None, "trends": {}}
+
+        keys = habit or timeline.habit_ids_of_type('binary', 'time', 'grade') + [PRODUCTIVITY_KEY]
+        unknown_habits = [h for h in keys if h not in indicators.key_index]
+        if unknown_habits:
+            raise HTTPException(status_code=404, detail=f"Habits not found: {', '.join(unknown_habits)}")
+
+        as_of = min(as_of or timeline.end, timeline.end)
+        day = timeline.day_index(as_of)
+        if day < 0:
+            raise HTTPException(status_code=400, detail="as_of is before the first entry")
+
+        window = TrendIndicators.WINDOWS[-1]
+        values = indicators.indicators([indicators.key_index[key] for key in keys], np.array([day]))
+        result = {}
+        for i, key in enumerate(keys):
+            summary = {"value": float(indicators.daily[indicators.key_index[key], day])}
+            summary.update({name: float(series[i, 0]) for name, series in values.items()})
+            change = summary[f"slope_{window}"] * window
+            if abs(change) <= TREND_FLAT_RATIO * abs(summary[f"sma_{window}"]):
+                summary["direction"] = "flat"
+            else:
+                summary["direction"] = "up" if change > 0 else "down"
+            result[key] = summary
+
+        return {"as_of": str(as_of), "trends": result, "version": data['version']}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading trends: {str(e)}")
+
+@router.get("/accessories")
+def get_accessories_volume(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    exercise: Optional[List[str]] = Query(None)
+) -> Dict[str, Any]:
+    """Weekly reps x sets per exercise parsed from the workouts accessories column (codes in ACCESSORY_CODES)"""
+    try:
+        excel_files = excel_service.find_excel_files()
+        if not excel_files:
+            return {"exercises": [], "weeks": [], "totals": {}}
+
+        data = excel_service.load_data(excel_files)
+        if from_date and to_date and from_date > to_date:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
 
-        return calendar_data
+        result = weekly_volume(data['accessories']['volume'], from_date, to_date, exercise)
+        result["unknown_codes"] = data['accessories']['unknown_codes']
+        result["version"] = data['version']
+        return result
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error loading calendar data: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error loading accessories volume: {str(e)}")
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from typing import Any, Dict
+from app.services.dataset_registry import registry
+
+router = APIRouter()
+
+@router.get("/")
+def list_datasets() -> Dict[str, Any]:
+    """List datasets; each one's API is under /api/datasets/<name>/..."""
+    return {"datasets": registry.status()}
@@ -0,0 +1,95 @@
+import base64
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.dataset_registry import DatasetProxy
+
+router = APIRouter()
+# Excel service of the dataset selected by the request URL
+excel_service = DatasetProxy("excel_service")
+
+MAX_PAGE_SIZE = 5000
+
+
+def encode_cursor(habit_id: str, day_ordinal: int) -> str:
+    return base64.urlsafe_b64encode(f"{habit_id}:{day_ordinal}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, habit_ids: List[str]) -> Tuple[int, int]:
+    """(index into the requested habits, day ordinal of the last entry returned)
+
+    The cursor names the habit rather than its position, so it stays valid
+    while that habit is still requested; otherwise it is rejected.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        habit_id, day_ordinal = base64.urlsafe_b64decode(padded.encode()).decode().rsplit(':', 1)
+        return habit_ids.index(habit_id), int(day_ordinal)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/")
+def get_entries(
+    habit: Optional[List[str]] = Query(None),
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    completed: Optional[bool] = None,
+    limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """Query entries by habit, date range and completion, ordered by habit then date.
+
+    Pass `next_cursor` from a response as `cursor` to get the next page.
+    """
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    try:
+        data = excel_service.load_data(excel_service.find_excel_files())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading entries: {str(e)}")
+
+    timeline = data['timeline']
+    habit_ids = habit or timeline.habit_ids
+    unknown = [h for h in habit_ids if h not in timeline.habit_index]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Habits not found: {', '.join(unknown)}")
+
+    position, after = decode_cursor(cursor, habit_ids) if cursor else (0, None)
+    low = from_date.toordinal() if from_date else -np.inf
+    high = to_date.toordinal() if to_date else np.inf
+
+    entries = []
+    next_cursor = None
+    for i in range(position, len(habit_ids)):
+        days = timeline.habit_days(habit_ids[i], completed)
+        start = low if after is None or i != position else max(low, after + 1)
+        first = np.searchsorted(days, start, side='left')
+        last = np.searchsorted(days, high, side='right')
+        page_days = days[first:min(last, first + limit - len(entries))]
+
+        row = timeline.habit_index[habit_ids[i]]
+        for day_ordinal in page_days.tolist():
+            day = date.fromordinal(day_ordinal)
+            column = timeline.day_index(day)
+            entries.append({
+                "habit_id": habit_ids[i],
+                "date": day.isoformat(),
+                "value": timeline.raw[row, column],
+                "completed": bool(timeline.completed[row, column])
+            })
+
+        if len(entries) == limit:
+            if first + len(page_days) < last:
+                next_cursor = encode_cursor(habit_ids[i], int(page_days[-1]))
+            elif i + 1 < len(habit_ids):
+                next_cursor = encode_cursor(habit_ids[i + 1], -1)
+            break
+
+    return {
+        "entries": entries,
+        "next_cursor": next_cursor,
+        "version": data['version']
+    }
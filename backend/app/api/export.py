@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import date
+from typing import List, Optional
+from app.services.dataset_registry import DatasetProxy
+from app.services.export_service import EXPORT_FORMATS, export_available, stream_export
+
+router = APIRouter()
+# Excel service of the dataset selected by the request URL
+excel_service = DatasetProxy("excel_service")
+
+@router.get("/")
+def export_entries(
+    format: str = "csv",
+    habit: Optional[List[str]] = Query(None),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to")
+):
+    """Stream all entries as CSV, NDJSON, Parquet or Arrow IPC, optionally filtered by habit and date range"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}', use one of: {', '.join(EXPORT_FORMATS)}")
+    if not export_available(format):
+        raise HTTPException(status_code=501, detail=f"{format} export requires pyarrow to be installed")
+
+    try:
+        data = excel_service.load_data(excel_service.find_excel_files())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading entries: {str(e)}")
+
+    timeline = data['timeline']
+    if habit:
+        unknown = [h for h in habit if h not in timeline.habit_index]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Habits not found: {', '.join(unknown)}")
+
+    media_type, extension, _ = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(timeline, format, habit, start, end),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="habit_entries.{extension}"',
+            "X-Dataset-Version": data['version']
+        }
+    )
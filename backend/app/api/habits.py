@@ -1,10 +1,10 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Dict, Any, Literal, Optional
+from datetime import date
 from pydantic import BaseModel
 from app.models.habit import Habit
-from app.services.excel_service import ExcelService
-from app.services.habit_config_service import HabitConfigService
-from app.core.config import settings
+from app.services.dataset_registry import DatasetProxy
+from app.services.habit_stats import habit_detail, target_progress
 
 class HabitUpdateRequest(BaseModel):
     name: str = None
@@ -12,10 +12,19 @@ class HabitUpdateRequest(BaseModel):
     active: bool = None
     is_personal: bool = None
     order: int = None
+    target_count: int = None
+    target_period: Literal['week', 'month'] = None
+    target_min_value: float = None
+
+class HabitConfigPatchRequest(BaseModel):
+    updates: Dict[str, HabitUpdateRequest]
+    # Optional optimistic-concurrency check against the version from a previous response
+    expected_version: Optional[str] = None
 
 router = APIRouter()
-excel_service = ExcelService(settings.EXCEL_DATA_PATH)
-config_service = HabitConfigService()
+# Services of the dataset selected by the request URL
+excel_service = DatasetProxy("excel_service")
+config_service = DatasetProxy("config_service")
 
 @router.get("/")
 def get_habits(grouped: bool = False):
@@ -24,36 +33,36 @@ def get_habits(grouped: bool = False):
         all_habits = []
         excel_files = excel_service.find_excel_files()
 
-        for file_path in excel_files:
-            data = excel_service.parse_excel_file(file_path)
-            habits = data['habits']
-            entries = data['entries']
-
-            # Calculate streaks
-            streaks = excel_service.calculate_streaks(entries)
-
-            # Update habits with streak data
-            for habit in habits:
-                if habit.id in streaks:
-                    streak_data = streaks[habit.id]
-                    # Create new habit object with updated streak data
-                    updated_habit = Habit(
-                        id=habit.id,
-                        name=habit.name,
-                        emoji=habit.emoji,
-                        habit_type=habit.habit_type,
-                        category=habit.category,
-                        color=habit.color,
-                        active=habit.active,
-                        order=habit.order,
-                        is_personal=habit.is_personal,
-                        current_streak=streak_data['current_streak'],
-                        best_streak=streak_data['best_streak'],
-                        completed_today=streak_data['completed_today']
-                    )
-                    all_habits.append(updated_habit)
-                else:
-                    all_habits.append(habit)
+        # All workbooks merged into one timeline, so streaks carry across years
+        data = excel_service.load_data(excel_files)
+        habits = data['habits']
+        entries = data['entries']
+
+        # Calculate streaks
+        streaks = excel_service.calculate_streaks(entries)
+
+        # Update habits with streak data
+        for habit in habits:
+            if habit.id in streaks:
+                streak_data = streaks[habit.id]
+                # Create new habit object with updated streak data
+                updated_habit = Habit(
+                    id=habit.id,
+                    name=habit.name,
+                    emoji=habit.emoji,
+                    habit_type=habit.habit_type,
+                    category=habit.category,
+                    color=habit.color,
+                    active=habit.active,
+                    order=habit.order,
+                    is_personal=habit.is_personal,
+                    current_streak=streak_data['current_streak'],
+                    best_streak=streak_data['best_streak'],
+                    completed_today=streak_data['completed_today']
+                )
+                all_habits.append(updated_habit)
+            else:
+                all_habits.append(habit)
 
         if grouped:
             # Group habits by category
@@ -83,11 +92,92 @@ def refresh_habits():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error refreshing habits: {str(e)}")
 
+@router.get("/streaks")
+def get_streaks(as_of: Optional[date] = None):
+    """Streaks of all habits as of a date (default today), using only entries up to that date"""
+    try:
+        data = excel_service.load_data(excel_service.find_excel_files())
+        timeline = data['timeline']
+        as_of = as_of or date.today()
+        return {
+            "as_of": str(as_of),
+            "streaks": {habit_id: timeline.streak_index(habit_id).as_of(as_of) for habit_id in timeline.habit_ids}
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading streaks: {str(e)}")
+
+@router.get("/targets")
+def get_targets(as_of: Optional[date] = None):
+    """Progress of every habit with a frequency target (e.g. 2x per week) as of a date (default today)"""
+    try:
+        data = excel_service.load_data(excel_service.find_excel_files())
+        timeline = data['timeline']
+        as_of = as_of or date.today()
+        return {
+            "as_of": str(as_of),
+            "targets": {
+                habit_id: target_progress(timeline, habit_id, habit_config.target_count, habit_config.target_period,
+                                          habit_config.target_min_value, as_of)
+                for habit_id, habit_config in config_service.load_config().items()
+                if habit_config.target_count
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading targets: {str(e)}")
+
+@router.get("/{habit_id}/target")
+def get_habit_target(habit_id: str, as_of: Optional[date] = None):
+    """Progress of one habit's frequency target as of a date (default today)"""
+    try:
+        habit_config = config_service.load_config().get(habit_id)
+        if habit_config is None:
+            raise HTTPException(status_code=404, detail="Habit not found")
+        if not habit_config.target_count:
+            raise HTTPException(status_code=404, detail="Habit has no target")
+        data = excel_service.load_data(excel_service.find_excel_files())
+        return target_progress(data['timeline'], habit_id, habit_config.target_count, habit_config.target_period,
+                               habit_config.target_min_value, as_of or date.today())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading target: {str(e)}")
+
+@router.get("/{habit_id}/streak")
+def get_habit_streak(habit_id: str, as_of: Optional[date] = None):
+    """Streak of one habit as of a date (default today)"""
+    try:
+        data = excel_service.load_data(excel_service.find_excel_files())
+        timeline = data['timeline']
+        if habit_id not in timeline.habit_index:
+            raise HTTPException(status_code=404, detail="Habit not found")
+        as_of = as_of or date.today()
+        return {"habit_id": habit_id, "as_of": str(as_of), **timeline.streak_index(habit_id).as_of(as_of)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading streak: {str(e)}")
+
+@router.get("/{habit_id}/detail")
+def get_habit_detail(habit_id: str, top: int = Query(5, ge=1, le=100)):
+    """History of one habit: streak runs, the `top` longest streaks, monthly completion rates
+    and, for time habits, total minutes and best day/week/month"""
+    try:
+        data = excel_service.load_data(excel_service.find_excel_files())
+        timeline = data['timeline']
+        if habit_id not in timeline.habit_index:
+            raise HTTPException(status_code=404, detail="Habit not found")
+        detail = habit_detail(timeline, habit_id)
+        return {**detail, "top_streaks": detail["top_streaks"][:top], "version": data['version']}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading habit detail: {str(e)}")
+
 @router.put("/{habit_id}")
 def update_habit(habit_id: str, updates: HabitUpdateRequest):
     """Update habit configuration"""
     try:
-        update_dict = {k: v for k, v in updates.dict().items() if v is not None}
+        update_dict = updates.model_dump(exclude_none=True)
         success = config_service.update_habit(habit_id, update_dict)
         
         if success:
@@ -110,22 +200,43 @@ def delete_habit(habit_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting habit: {str(e)}")
 
+@router.patch("/config")
+def patch_habit_config(request: HabitConfigPatchRequest):
+    """Apply a batch of habit updates in one transaction with a single config write"""
+    try:
+        with config_service.transaction() as config:
+            if request.expected_version and request.expected_version != config_service.version_tag():
+                raise HTTPException(status_code=409, detail="Habit configuration was modified by another client")
+
+            missing = [habit_id for habit_id in request.updates if habit_id not in config]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Habits not found: {', '.join(missing)}")
+
+            for habit_id, updates in request.updates.items():
+                for key, value in updates.model_dump(exclude_none=True).items():
+                    setattr(config[habit_id], key, value)
+
+        return {
+            "message": "Habits updated successfully",
+            "updated": len(request.updates),
+            "version": config_service.version_tag()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating habits: {str(e)}")
+
 @router.post("/reorder")
 def reorder_habits(habit_orders: Dict[str, int]):
     """Reorder habits"""
     try:
-        config = config_service.load_config()
+        # Read-modify-write under the config lock so concurrent edits aren't lost
+        with config_service.transaction() as config:
+            for habit_id, new_order in habit_orders.items():
+                if habit_id in config:
+                    config[habit_id].order = new_order
         
-        for habit_id, new_order in habit_orders.items():
-            if habit_id in config:
-                config[habit_id].order = new_order
-        
-        success = config_service.save_config(config)
-        
-        if success:
-            return {"message": "Habits reordered successfully"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save new order")
+        return {"message": "Habits reordered successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reordering habits: {str(e)}")
 
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Response
+from typing import Any, Dict
+from pydantic import BaseModel
+from app.services.dataset_registry import current_dataset
+from app.services.job_service import JOB_KINDS, JobQueueFull, jobs
+
+class JobRequest(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+router = APIRouter()
+
+@router.post("/", status_code=202)
+def submit_job(request: JobRequest, response: Response) -> Dict[str, Any]:
+    """Start an analysis in the background; the same analysis of unchanged data returns the existing job"""
+    if request.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{request.kind}', use one of: {', '.join(JOB_KINDS)}")
+    try:
+        job, cached = jobs.submit(request.kind, request.params, current_dataset.get())
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Too many jobs pending, try again later")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error submitting job: {str(e)}")
+
+    if cached:
+        response.status_code = 200
+    return {**job.to_dict(), "cached": cached}
+
+@router.get("/")
+def list_jobs() -> Dict[str, Any]:
+    """Known jobs of the current dataset without their results"""
+    return {"jobs": [job.to_dict(include_result=False) for job in jobs.list(current_dataset.get())]}
+
+@router.get("/{job_id}")
+def get_job(job_id: str) -> Dict[str, Any]:
+    """Status and progress of a job, with its result once done"""
+    job = jobs.get(job_id)
+    # Jobs of other datasets are not visible through this one
+    if job is None or job.dataset != current_dataset.get():
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -1,10 +1,29 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./app.db"
     EXCEL_DATA_PATH: str = "./data"
     CORS_ORIGINS: str = "http://localhost:3000"
+
+    # Extra datasets: each subdirectory is served under /api/datasets/<name>/...
+    DATASETS_ROOT: str = ""
+    DATASET_MEMORY_BUDGET_MB: float = 512  # 0 disables eviction
+
+    # Workout accessories codes, e.g. "Pu20 Cr30" = 20 push-ups and 30 crunches
+    ACCESSORY_CODES: str = "Pu=push_ups,Cr=crunches"
+
+    # Background analysis jobs (see app/services/job_service.py)
+    JOB_WORKERS: int = 2
+    JOB_MAX_PENDING: int = 16
+    JOB_MAX_RESULTS: int = 100
+
+    # Request profiling (see app/core/profiling.py)
+    PROFILING_TRUSTED_HOSTS: str = "127.0.0.1,::1"
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_SLOW_REQUEST_MS: float = 0  # 0 disables automatic capture
+    PROFILE_DIR: str = "./data/profiles"
+    PROFILE_MAX_FILES: int = 50
     
     @property
     def cors_origins_list(self) -> List[str]:
@@ -15,6 +34,19 @@ class Settings(BaseSettings):
         else:
             # Handle comma-separated format
             return [origin.strip() for origin in self.CORS_ORIGINS.split(',')]
+
+    @property
+    def accessory_codes_map(self) -> Dict[str, str]:
+        codes = {}
+        for pair in self.ACCESSORY_CODES.split(','):
+            if '=' in pair:
+                code, exercise = pair.split('=', 1)
+                codes[code.strip()] = exercise.strip()
+        return codes
+
+    @property
+    def profiling_trusted_hosts_list(self) -> List[str]:
+        return [host.strip() for host in self.PROFILING_TRUSTED_HOSTS.split(',') if host.strip()]
     
     class Config:
         env_file = ".env"
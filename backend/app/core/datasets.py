@@ -0,0 +1,49 @@
+import re
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.services.dataset_registry import DEFAULT_DATASET, current_dataset, registry
+
+# /api/datasets/<name>/habits/... is served by /api/habits/... on that dataset
+DATASET_PATH = re.compile(r'^/api/datasets/([^/]+)(/.+)$')
+
+
+class DatasetMiddleware:
+    """Select the dataset named in the URL for the rest of the request.
+
+    After each request the dataset caches are trimmed to the memory budget,
+    keeping the dataset that was just used.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        match = DATASET_PATH.match(scope["path"])
+        if not match:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                registry.enforce_budget(DEFAULT_DATASET)
+            return
+
+        name, rest = match.groups()
+        try:
+            registry.get(name)
+        except KeyError:
+            response = JSONResponse({"detail": f"Dataset '{name}' not found"}, status_code=404)
+            await response(scope, receive, send)
+            return
+
+        scope = dict(scope, path="/api" + rest, raw_path=("/api" + rest).encode())
+        token = current_dataset.set(name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_dataset.reset(token)
+            registry.enforce_budget(name)
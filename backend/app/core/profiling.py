@@ -0,0 +1,215 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from app.core.config import settings
+
+APP_ROOT = str(Path(__file__).resolve().parent.parent) + os.sep
+PROFILER_FILE = str(Path(__file__).resolve())
+
+Frame = Tuple[str, str, int]
+
+
+class CallTreeNode:
+    """A node in the sampled call tree"""
+
+    def __init__(self, function: str, file: str, line: int):
+        self.function = function
+        self.file = file
+        self.line = line
+        self.samples = 0
+        self.children: Dict[Frame, 'CallTreeNode'] = {}
+
+    def add_stack(self, stack: List[Frame]):
+        """Add one sampled stack (outermost frame first) below this node"""
+        self.samples += 1
+        node = self
+        for frame in stack:
+            child = node.children.get(frame)
+            if child is None:
+                child = CallTreeNode(*frame)
+                node.children[frame] = child
+            child.samples += 1
+            node = child
+
+    def to_dict(self, interval_ms: float, min_samples: int = 1) -> Dict[str, Any]:
+        children = sorted(self.children.values(), key=lambda c: c.samples, reverse=True)
+        return {
+            "function": self.function,
+            "file": self.file,
+            "line": self.line,
+            "samples": self.samples,
+            "time_ms": round(self.samples * interval_ms, 2),
+            "children": [
+                child.to_dict(interval_ms, min_samples)
+                for child in children
+                if child.samples >= min_samples
+            ]
+        }
+
+
+class StackSampler:
+    """Sample the stacks of threads running app code at a fixed interval.
+
+    FastAPI runs sync endpoints in a worker thread, so the sampler looks at
+    every thread and keeps only stacks that pass through the ``app`` package.
+    Concurrent requests are therefore merged into the same tree.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.root = CallTreeNode('<request>', '', 0)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = self._extract_stack(frame)
+                if stack:
+                    self.root.add_stack(stack)
+
+    @staticmethod
+    def _extract_stack(frame) -> List[Frame]:
+        stack = []
+        in_app = False
+        while frame is not None:
+            code = frame.f_code
+            filename = code.co_filename
+            if filename == PROFILER_FILE:
+                # The middleware itself is not interesting
+                return []
+            if filename.startswith(APP_ROOT):
+                in_app = True
+            stack.append((code.co_name, filename, code.co_firstlineno))
+            frame = frame.f_back
+        if not in_app:
+            return []
+        stack.reverse()
+        return stack
+
+    def to_dict(self, min_samples: int = 1) -> Dict[str, Any]:
+        return self.root.to_dict(self.interval * 1000, min_samples)
+
+
+def _save_slow_profile(profile: Dict[str, Any]):
+    """Write a slow-request profile and rotate old ones out of the directory"""
+    profile_dir = Path(settings.PROFILE_DIR)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+
+    timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    route = profile['path'].strip('/').replace('/', '_') or 'root'
+    file_path = profile_dir / f"{timestamp}_{route}.json"
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+
+    saved = sorted(profile_dir.glob('*.json'))
+    for old_file in saved[:-settings.PROFILE_MAX_FILES]:
+        old_file.unlink(missing_ok=True)
+
+    print(f"Saved slow request profile: {file_path}")
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Opt-in request profiling.
+
+    * ``X-Profile: 1`` header or ``?profile=1`` from a trusted client returns
+      the sampled call tree of that request instead of its normal body.
+    * ``PROFILE_SLOW_REQUEST_MS > 0`` samples every request and saves the
+      profile of any request slower than the threshold to ``PROFILE_DIR``.
+    """
+
+    def _is_trusted(self, request: Request) -> bool:
+        host = request.client.host if request.client else None
+        return host in settings.profiling_trusted_hosts_list
+
+    def _wants_profile(self, request: Request) -> bool:
+        requested = (
+            request.headers.get('x-profile') == '1'
+            or request.query_params.get('profile') == '1'
+        )
+        return requested and self._is_trusted(request)
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        on_demand = self._wants_profile(request)
+        threshold_ms = settings.PROFILE_SLOW_REQUEST_MS
+        if not on_demand and threshold_ms <= 0:
+            return await call_next(request)
+
+        sampler = StackSampler(settings.PROFILE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = await call_next(request)
+        except BaseException:
+            sampler.stop()
+            raise
+
+        if on_demand:
+            try:
+                # Streaming responses keep running after call_next returns; the body itself is replaced
+                async for _ in response.body_iterator:
+                    pass
+            finally:
+                sampler.stop()
+            profile = self._finish_profile(request, response.status_code, sampler, started)
+            return JSONResponse(profile, headers={"X-Profile-Duration-Ms": f"{profile['duration_ms']:.2f}"})
+
+        # Threshold mode passes the body through chunk by chunk, so streamed
+        # exports stay streamed; the profile ends when the body is sent
+        body_iterator = response.body_iterator
+
+        async def profiled_body():
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            finally:
+                sampler.stop()
+                self._finish_profile(request, response.status_code, sampler, started)
+
+        response.body_iterator = profiled_body()
+        return response
+
+    def _finish_profile(self, request: Request, status_code: int, sampler: StackSampler,
+                        started: float) -> Dict[str, Any]:
+        """Build the profile of a finished request and save it if it was slow"""
+        duration_ms = (time.perf_counter() - started) * 1000
+        profile = {
+            "method": request.method,
+            "path": request.url.path,
+            "query": str(request.url.query),
+            "status_code": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "interval_ms": settings.PROFILE_INTERVAL_MS,
+            "samples": sampler.root.samples,
+            "call_tree": sampler.to_dict()
+        }
+
+        threshold_ms = settings.PROFILE_SLOW_REQUEST_MS
+        if threshold_ms > 0 and duration_ms >= threshold_ms:
+            try:
+                _save_slow_profile(profile)
+            except OSError as e:
+                print(f"Error saving slow request profile: {e}")
+        return profile
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import habits, analytics, config
+from app.api import habits, analytics, config, datasets, entries, export, jobs
 from app.core.config import settings
+from app.core.datasets import DatasetMiddleware
+from app.core.profiling import ProfilingMiddleware
 
 app = FastAPI(
     title="Modern Habit Tracker API",
@@ -9,6 +11,12 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Innermost, so routes see the rewritten /api/... path of /api/datasets/<name>/...
+app.add_middleware(DatasetMiddleware)
+
+# Added before CORS so it runs inside it and profile responses keep CORS headers
+app.add_middleware(ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -20,6 +28,10 @@ app.add_middleware(
 app.include_router(habits.router, prefix="/api/habits", tags=["habits"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 app.include_router(config.router, prefix="/api/config", tags=["config"])
+app.include_router(datasets.router, prefix="/api/datasets", tags=["datasets"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(entries.router, prefix="/api/entries", tags=["entries"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
 
 @app.get("/")
 def read_root():
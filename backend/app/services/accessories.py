@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# A code followed by reps and optionally sets, e.g. "Pu20", "Pu15x3" or "Pu15X3"
+ACCESSORY_TOKEN = r'\b(?P<code>[A-Za-z]{1,4})(?P<reps>\d+)(?:[xX](?P<sets>\d+))?\b'
+
+VOLUME_COLUMNS = ['date', 'exercise', 'reps', 'sets', 'volume']
+
+
+def accessories_column(frames: Dict[str, pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """Dates and accessories strings of the merged frames (workouts sheet, else a core column)"""
+    for sheet in ('workouts', 'core'):
+        frame = frames.get(sheet)
+        if frame is None:
+            continue
+        column = next((col for col in frame.columns if 'accessories' in str(col).lower()), None)
+        if column is not None:
+            return frame[['date', column]].rename(columns={column: 'accessories'})
+    return None
+
+
+def parse_accessories(frame: Optional[pd.DataFrame], codes: Dict[str, str]) -> Dict[str, Any]:
+    """Tokenize every accessories string at once into one row per exercise set.
+
+    volume = reps x sets (sets default to 1). Codes are matched case-insensitively;
+    tokens with unknown codes are counted in 'unknown_codes' and dropped.
+    """
+    empty = pd.DataFrame({col: pd.Series(dtype=object if col in ('date', 'exercise') else float)
+                          for col in VOLUME_COLUMNS})
+    if frame is None or frame.empty:
+        return {'volume': empty, 'unknown_codes': {}}
+
+    frame = frame[frame['date'].notna() & frame['accessories'].notna()]
+    tokens = frame['accessories'].astype('string').str.extractall(ACCESSORY_TOKEN)
+    if tokens.empty:
+        return {'volume': empty, 'unknown_codes': {}}
+
+    lookup = {code.lower(): exercise for code, exercise in codes.items()}
+    code = tokens['code'].str.lower()
+    exercise = code.map(lookup)
+    unknown = tokens['code'][exercise.isna()].value_counts()
+
+    known = exercise.notna().to_numpy()
+    reps = tokens['reps'].astype(float).to_numpy()[known]
+    sets = tokens['sets'].astype(float).fillna(1).to_numpy()[known]
+    volume = pd.DataFrame({
+        'date': frame['date'].loc[tokens.index.get_level_values(0)].to_numpy()[known],
+        'exercise': exercise.to_numpy()[known],
+        'reps': reps,
+        'sets': sets,
+        'volume': reps * sets,
+    })
+    return {
+        'volume': volume.sort_values('date', kind='stable').reset_index(drop=True),
+        'unknown_codes': {str(k): int(v) for k, v in unknown.items()}
+    }
+
+
+def weekly_volume(volume: pd.DataFrame, start: Optional[date] = None, end: Optional[date] = None,
+                  exercises: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Total volume per exercise and ISO week (Monday start) within an optional date range"""
+    mask = np.ones(len(volume), dtype=bool)
+    if start is not None:
+        mask &= (volume['date'] >= start).to_numpy()
+    if end is not None:
+        mask &= (volume['date'] <= end).to_numpy()
+    if exercises:
+        mask &= volume['exercise'].isin(exercises).to_numpy()
+    volume = volume[mask]
+    if volume.empty:
+        return {"exercises": [], "weeks": [], "totals": {}}
+
+    days = volume['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    week_start = days - (days + 3) % 7  # day 0 (1970-01-01) is a Thursday
+    table = volume.assign(week=week_start).pivot_table(
+        index='week', columns='exercise', values='volume', aggfunc='sum', fill_value=0
+    )
+    exercise_names = [str(col) for col in table.columns]
+    weeks = []
+    for week, row in zip(table.index.tolist(), table.to_numpy(dtype=float).tolist()):
+        first = date(1970, 1, 1) + timedelta(days=int(week))
+        year, number, _ = first.isocalendar()
+        weeks.append({
+            "week": f"{year}-W{number:02d}",
+            "start": str(first),
+            "end": str(first + timedelta(days=6)),
+            "volume": dict(zip(exercise_names, row))
+        })
+    return {
+        "exercises": exercise_names,
+        "weeks": weeks,
+        "totals": {str(col): float(total) for col, total in table.sum().items()}
+    }
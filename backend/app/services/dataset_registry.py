@@ -0,0 +1,147 @@
+import re
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.services.excel_service import ExcelService
+from app.services.habit_config_service import HabitConfigService
+from app.services.schema_manifest import SchemaManifest
+
+DEFAULT_DATASET = "default"
+DATASET_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]*$')
+
+# Dataset selected by the current request (set by DatasetMiddleware)
+current_dataset: ContextVar[str] = ContextVar("current_dataset", default=DEFAULT_DATASET)
+
+
+class Dataset:
+    """One habit log: its workbook directory, habit config and caches"""
+
+    def __init__(self, name: str, data_path: Path, config_path: Optional[Path] = None,
+                 manifest_path: Optional[Path] = None):
+        self.name = name
+        self.configured_path = data_path
+        self.config_service = HabitConfigService(str(config_path or data_path / "habits_config.json"))
+        schema_manifest = SchemaManifest(str(manifest_path or data_path / "schema_manifest.json"))
+        self.excel_service = ExcelService(str(data_path), self.config_service, schema_manifest)
+        self.last_used = time.monotonic()
+
+
+class DatasetRegistry:
+    """Named datasets served by one process.
+
+    The default dataset is EXCEL_DATA_PATH. Every subdirectory of
+    DATASETS_ROOT is another dataset; each keeps its habits_config.json and
+    schema_manifest.json next to its workbooks. When the parsed caches
+    of all datasets exceed DATASET_MEMORY_BUDGET_MB, the least recently used
+    datasets are evicted.
+    """
+
+    def __init__(self):
+        self._datasets: Dict[str, Dataset] = {}
+        self._lock = threading.Lock()
+
+    def _root(self) -> Optional[Path]:
+        return Path(settings.DATASETS_ROOT) if settings.DATASETS_ROOT else None
+
+    def _data_path(self, name: str) -> Optional[Path]:
+        if name == DEFAULT_DATASET:
+            return Path(settings.EXCEL_DATA_PATH)
+        root = self._root()
+        if root is None or not DATASET_NAME_PATTERN.match(name) or not (root / name).is_dir():
+            return None
+        return root / name
+
+    def names(self) -> List[str]:
+        names = [DEFAULT_DATASET]
+        root = self._root()
+        if root is not None and root.is_dir():
+            names.extend(sorted(
+                p.name for p in root.iterdir()
+                if p.is_dir() and p.name != DEFAULT_DATASET and DATASET_NAME_PATTERN.match(p.name)
+            ))
+        return names
+
+    def get(self, name: str) -> Dataset:
+        """Dataset by name; raises KeyError if it doesn't exist"""
+        data_path = self._data_path(name)
+        if data_path is None:
+            raise KeyError(name)
+
+        with self._lock:
+            dataset = self._datasets.get(name)
+            # Rebuilt if the settings now point it somewhere else
+            if dataset is None or dataset.configured_path != data_path:
+                dataset = Dataset(name, data_path)
+                self._datasets[name] = dataset
+            dataset.last_used = time.monotonic()
+            return dataset
+
+    def current(self) -> Dataset:
+        return self.get(current_dataset.get())
+
+    def memory_usage(self) -> Dict[str, int]:
+        with self._lock:
+            datasets = list(self._datasets.values())
+        return {dataset.name: dataset.excel_service.cache_memory_bytes() for dataset in datasets}
+
+    def enforce_budget(self, keep: Optional[str] = None) -> List[str]:
+        """Evict least recently used datasets until the caches fit the memory budget"""
+        budget = settings.DATASET_MEMORY_BUDGET_MB * 1024 * 1024
+        if budget <= 0:
+            return []
+
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        evicted = []
+        with self._lock:
+            by_age = sorted(self._datasets.values(), key=lambda d: d.last_used)
+        for dataset in by_age:
+            if total <= budget:
+                break
+            if dataset.name == keep or not usage.get(dataset.name):
+                continue
+            dataset.excel_service.clear_cache()
+            total -= usage[dataset.name]
+            evicted.append(dataset.name)
+
+        if evicted:
+            print(f"Evicted dataset caches {evicted} to stay within {settings.DATASET_MEMORY_BUDGET_MB} MB")
+        return evicted
+
+    def clear(self):
+        """Forget every dataset; each is rebuilt on its next use"""
+        with self._lock:
+            self._datasets.clear()
+
+    def status(self) -> List[Dict[str, Any]]:
+        usage = self.memory_usage()
+        return [
+            {
+                "name": name,
+                "loaded": usage.get(name, 0) > 0,
+                "memory_bytes": usage.get(name, 0)
+            }
+            for name in self.names()
+        ]
+
+
+class DatasetProxy:
+    """Stands in for a per-dataset service and resolves to the current request's dataset"""
+
+    def __init__(self, attribute: str):
+        object.__setattr__(self, "_attribute", attribute)
+
+    def _target(self):
+        return getattr(registry.current(), self._attribute)
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._target(), name, value)
+
+
+registry = DatasetRegistry()
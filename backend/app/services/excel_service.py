@@ -1,10 +1,18 @@
 import pandas as pd
+import openpyxl
 import os
+import hashlib
+import threading
+from collections import OrderedDict, deque
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from app.core.config import settings
 from app.models.habit import Habit, HabitEntry
+from app.services.accessories import accessories_column, parse_accessories
 from app.services.habit_config_service import HabitConfigService
-from datetime import datetime, date
+from app.services.schema_manifest import SchemaManifest
+from app.services.timeline import DailyRollup, HabitTimeline, TrendIndicators
+from datetime import datetime, date, timedelta
 import re
 
 class ExcelService:
@@ -18,10 +26,41 @@ class ExcelService:
         'youtube_content': ['YouTube']
     }
 
-    def __init__(self, data_path: str):
+    # Habits renamed between yearly workbooks (normalized old key -> normalized new key)
+    HABIT_KEY_ALIASES = {
+        'gaming_1h': 'limited_gaming',
+    }
+
+    # Sheets kept as DataFrames for analytics that read columns directly
+    FRAME_SHEETS = ['core', 'habits', 'workouts']
+
+    # Partial sheet reads kept by load_frame() when the merged dataset isn't loaded
+    MAX_FRAME_CACHE_ENTRIES = 32
+
+    # Approximate size of one cached HabitEntry (model plus its strings), for memory accounting
+    ENTRY_MEMORY_BYTES = 600
+
+    # Date column parsers, tried in this order unless the schema manifest knows which one works
+    DATE_FORMATS = {
+        'dayfirst': lambda values: pd.to_datetime(values, dayfirst=True),
+        '%d.%m.%Y': lambda values: pd.to_datetime(values, format='%d.%m.%Y'),
+        'default': lambda values: pd.to_datetime(values),
+    }
+
+    def __init__(self, data_path: str, config_service: Optional[HabitConfigService] = None,
+                 schema_manifest: Optional[SchemaManifest] = None):
         self.data_path = Path(data_path)
         self.data_path.mkdir(exist_ok=True)
-        self.config_service = HabitConfigService()
+        self.config_service = config_service or HabitConfigService(str(self.data_path / "habits_config.json"))
+        self.schema_manifest = schema_manifest or SchemaManifest(str(self.data_path / "schema_manifest.json"))
+
+        # Per-file parse cache: path -> (signature, parsed data)
+        self._file_cache: Dict[str, Tuple[tuple, Dict[str, Any]]] = {}
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._merged: Optional[Dict[str, Any]] = None
+        self._frame_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
     
     def find_excel_files(self) -> List[Path]:
         """Find all Excel files in the data directory, excluding temporary lock files"""
@@ -73,6 +112,359 @@ class ExcelService:
             print(f"Error parsing Excel file {file_path}: {e}")
             return {'habits': [], 'entries': [], 'file_path': str(file_path), 'last_modified': 0}
 
+    def _file_signature(self, file_path: Path) -> tuple:
+        stat = file_path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def parse_excel_file_cached(self, file_path: Path) -> Dict[str, Any]:
+        """Parse Excel file, reusing the previous result while the file is unchanged"""
+        return self._parse_cached(file_path)[1]
+
+    def _parse_cached(self, file_path: Path) -> Tuple[Optional[tuple], Dict[str, Any]]:
+        """Return (cache signature, parsed data); the signature is None if the result was not cached"""
+        key = str(file_path)
+        with self._cache_lock:
+            file_lock = self._file_locks.setdefault(key, threading.Lock())
+
+        # One parse per file at a time; concurrent requests wait for it and hit the cache
+        with file_lock:
+            try:
+                signature = self._file_signature(file_path)
+            except OSError:
+                return None, self.parse_excel_file(file_path)
+
+            # Habit config (names, order, visibility) is applied at merge time, so it isn't part of the key
+            cached = self._file_cache.get(key)
+            if cached and cached[0] == signature:
+                return cached
+
+            print(f"Parsing {file_path.name} (not cached or changed)")
+            data = self.parse_excel_file(file_path)
+            if not data['last_modified']:
+                return None, data
+
+            data['memory_bytes'] = self._estimate_memory(data)
+            cached = (signature, data)
+            self._file_cache[key] = cached
+            return cached
+
+    def _habit_key(self, habit_id: str) -> str:
+        """Normalize a habit ID so the same habit matches across yearly workbooks"""
+        name = habit_id[len('habit_'):] if habit_id.startswith('habit_') else habit_id
+        key = re.sub(r'[\W_]+', '_', name.lower()).strip('_')
+        return self.HABIT_KEY_ALIASES.get(key, key)
+
+    def load_data(self, excel_files: List[Path]) -> Dict[str, Any]:
+        """Parse all workbooks and merge them into one date-indexed timeline.
+
+        Files are cached individually, so editing the current year's workbook
+        only re-parses that file. Parsing is openpyxl/pandas work that holds
+        the GIL, so the files are parsed one after another.
+        """
+        results = [self._parse_cached(f) for f in excel_files]
+
+        self._prune_cache(excel_files)
+
+        # A config change only re-runs the merge, which applies it to the cached parses
+        version = self._version({str(f): signature for f, (signature, _) in zip(excel_files, results)})
+
+        with self._merge_lock:
+            if self._merged is None or self._merged['version'] != version:
+                merged = self._merge_parsed([data for _, data in results])
+                merged['version'] = version
+                previous = self._merged
+                if previous is not None:
+                    merged['timeline'].carry_over(previous['timeline'])
+                merged['trends'] = TrendIndicators(merged['timeline'], previous['trends'] if previous else None)
+                # Lets load_frame() tell whether the merged frames still match the files
+                merged['file_signatures'] = {
+                    str(f): signature for f, (signature, _) in zip(excel_files, results)
+                }
+                # Entries are shared with the per-file caches, so only the references count here
+                merged['memory_bytes'] = self._estimate_memory(merged, entry_bytes=8)
+                self._merged = merged
+            return self._merged
+
+    def _version(self, signatures: Dict[str, Optional[tuple]]) -> str:
+        """Dataset version: changes whenever any workbook or the config changes"""
+        key = (sorted(signatures.items()), self.config_service.config_version())
+        return hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+
+    def data_version(self, excel_files: List[Path]) -> str:
+        """The version load_data() returns for these files, from their signatures without parsing"""
+        return self._version(self._current_signatures(excel_files))
+
+    def _estimate_memory(self, data: Dict[str, Any], entry_bytes: Optional[int] = None) -> int:
+        """Rough size in bytes of a parsed or merged result"""
+        size = len(data['entries']) * (self.ENTRY_MEMORY_BYTES if entry_bytes is None else entry_bytes)
+        for frame in data.get('frames', {}).values():
+            size += int(frame.memory_usage(deep=True).sum())
+        accessories = data.get('accessories')
+        if accessories is not None:
+            size += int(accessories['volume'].memory_usage(deep=True).sum())
+        return size
+
+    def cache_memory_bytes(self) -> int:
+        """Approximate memory held by this service's caches"""
+        with self._cache_lock:
+            size = sum(data.get('memory_bytes', 0) for _, data in self._file_cache.values())
+            size += sum(frame_size for _, _, frame_size in self._frame_cache.values())
+        merged = self._merged
+        if merged is not None:
+            size += merged.get('memory_bytes', 0)
+            # The timeline's caches grow as it is queried, so they are measured now rather than at merge time
+            size += merged['timeline'].memory_bytes() + merged['rollup'].memory_bytes() + merged['trends'].memory_bytes()
+        return size
+
+    def clear_cache(self):
+        """Drop every cached parse and merged result; they are rebuilt on next use"""
+        with self._cache_lock:
+            self._file_cache.clear()
+            self._frame_cache.clear()
+        with self._merge_lock:
+            self._merged = None
+
+    def _prune_cache(self, excel_files: List[Path]):
+        """Forget workbooks that were removed from the data directory"""
+        keep = {str(f) for f in excel_files}
+        with self._cache_lock:
+            for key in [k for k in self._file_cache if k not in keep]:
+                del self._file_cache[key]
+
+    def _merge_parsed(self, parsed: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge per-file results; newer workbooks win on overlapping habits and dates"""
+        parsed = sorted(parsed, key=lambda d: (
+            max((e.date for e in d['entries']), default=date.min), d['last_modified']
+        ))
+
+        # Canonical ID of each habit is the one used by the newest workbook. Keys only
+        # match habits across workbooks: columns of one workbook always stay separate.
+        canonical_ids = {}
+        habits = []
+        known = set()
+        id_maps = [{} for _ in parsed]
+        for data, id_map in zip(reversed(parsed), reversed(id_maps)):
+            claimed = set()  # canonical IDs already taken by a column of this workbook
+            # Exact ID matches claim their habit before any key-based match
+            for habit in sorted(data['habits'], key=lambda h: h.id not in known):
+                key = self._habit_key(habit.id)
+                canonical = habit.id if habit.id in known else canonical_ids.get(key)
+                if canonical is None or canonical in claimed:
+                    canonical = habit.id
+                    if canonical not in known:
+                        known.add(canonical)
+                        habits.append(habit)
+                    canonical_ids.setdefault(key, canonical)
+                claimed.add(canonical)
+                id_map[habit.id] = canonical
+
+        habits, hidden = self._apply_config(habits)
+
+        entries_by_key = {}
+        for data, id_map in zip(parsed, id_maps):
+            for entry in data['entries']:
+                habit_id = id_map.get(entry.habit_id, entry.habit_id)
+                if habit_id in hidden:
+                    continue
+                if habit_id != entry.habit_id:
+                    entry = entry.model_copy(update={'habit_id': habit_id})
+                entries_by_key[(habit_id, entry.date)] = entry
+        entries = sorted(entries_by_key.values(), key=lambda e: e.date)
+
+        frames = {}
+        for sheet in self.FRAME_SHEETS:
+            sheet_frames = [d['frames'][sheet] for d in parsed if sheet in d.get('frames', {})]
+            if sheet_frames:
+                frames[sheet] = self._concat_frames(sheet_frames)
+
+        timeline = HabitTimeline(habits, entries)
+        # Accessories tokens of all years in one pass, for weekly exercise volume
+        accessories = parse_accessories(accessories_column(frames), settings.accessory_codes_map)
+
+        print(f"Merged {len(parsed)} workbooks: {len(habits)} habits, {len(entries)} entries")
+        return {
+            'habits': habits,
+            'entries': entries,
+            'timeline': timeline,
+            'rollup': DailyRollup(timeline),
+            'frames': frames,
+            'accessories': accessories,
+            'files': [d['file_path'] for d in parsed],
+            'last_modified': max((d['last_modified'] for d in parsed), default=0)
+        }
+
+    def _apply_config(self, habits: List[Habit]) -> Tuple[List[Habit], set]:
+        """Overlay the saved config on parsed habits; returns the visible habits and the hidden IDs"""
+        saved_config = self.config_service.load_config()
+        visible = []
+        hidden = set()
+        for habit in habits:
+            config = saved_config.get(habit.id)
+            if config is None:
+                visible.append(habit)
+            elif not config.active:
+                hidden.add(habit.id)
+            else:
+                visible.append(habit.model_copy(update={
+                    'name': config.name,
+                    'emoji': config.emoji,
+                    'order': config.order,
+                    'is_personal': config.is_personal
+                }))
+        return visible, hidden
+
+    @staticmethod
+    def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """Combine per-file frames ordered oldest to newest; later files win on duplicate dates"""
+        frame = pd.concat(frames, ignore_index=True)
+        frame = frame[frame['date'].notna()].drop_duplicates('date', keep='last')
+        return frame.sort_values('date').reset_index(drop=True)
+
+    def load_frame(self, excel_files: List[Path], sheet: str, columns: Optional[List[str]] = None,
+                   start: Optional[date] = None, end: Optional[date] = None,
+                   last_days: Optional[int] = None, last_rows: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """Read part of one sheet across all workbooks, returned with a 'date' column.
+
+        `columns` projects the sheet, `start`/`end` bound the dates, `last_days`
+        keeps the days within that many of the newest date and `last_rows` the
+        newest rows. Sliced from the merged dataset when it is loaded and
+        current, otherwise only the requested cells are streamed from the files.
+        """
+        merged = self._merged
+        if merged is not None and merged.get('file_signatures') == self._current_signatures(excel_files):
+            frame = merged['frames'].get(sheet)
+            if frame is None:
+                return None
+            if columns is not None:
+                frame = frame[['date'] + [col for col in frame.columns if col in columns]]
+        else:
+            frames = []
+            for file_path in excel_files:
+                frame = self._read_sheet_cached(file_path, sheet, columns, start, end, last_days, last_rows)
+                if frame is not None and len(frame):
+                    frames.append(frame)
+            if not frames:
+                return None
+            frame = self._concat_frames(sorted(frames, key=lambda f: f['date'].max()))
+
+        return self._select_rows(frame, start, end, last_days, last_rows)
+
+    @staticmethod
+    def _select_rows(frame: pd.DataFrame, start: Optional[date], end: Optional[date],
+                     last_days: Optional[int], last_rows: Optional[int]) -> pd.DataFrame:
+        if start is not None:
+            frame = frame[frame['date'] >= start]
+        if end is not None:
+            frame = frame[frame['date'] <= end]
+        if last_days and len(frame):
+            frame = frame[frame['date'] > frame['date'].max() - timedelta(days=last_days)]
+        if last_rows:
+            frame = frame.tail(last_rows)
+        return frame.reset_index(drop=True)
+
+    def _current_signatures(self, excel_files: List[Path]) -> Dict[str, Optional[tuple]]:
+        signatures = {}
+        for file_path in excel_files:
+            try:
+                signatures[str(file_path)] = self._file_signature(file_path)
+            except OSError:
+                signatures[str(file_path)] = None
+        return signatures
+
+    def _read_sheet_cached(self, file_path: Path, *args) -> Optional[pd.DataFrame]:
+        """_read_sheet() with a small LRU cache keyed by file signature and read arguments"""
+        try:
+            signature = self._file_signature(file_path)
+        except OSError:
+            return None
+
+        key = (str(file_path),) + tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
+        with self._cache_lock:
+            cached = self._frame_cache.get(key)
+            if cached and cached[0] == signature:
+                self._frame_cache.move_to_end(key)
+                return cached[1]
+
+        frame = self._read_sheet(file_path, *args)
+        frame_size = int(frame.memory_usage(deep=True).sum()) if frame is not None else 0
+        with self._cache_lock:
+            self._frame_cache[key] = (signature, frame, frame_size)
+            self._frame_cache.move_to_end(key)
+            while len(self._frame_cache) > self.MAX_FRAME_CACHE_ENTRIES:
+                self._frame_cache.popitem(last=False)
+        return frame
+
+    def _read_sheet(self, file_path: Path, sheet: str, columns: Optional[List[str]],
+                    start: Optional[date], end: Optional[date],
+                    last_days: Optional[int], last_rows: Optional[int]) -> Optional[pd.DataFrame]:
+        """Stream one sheet row by row, keeping only the requested columns and dates.
+
+        Sheets are in date order, so reading stops at the first row after `end`
+        and `last_days`/`last_rows` only keep a sliding window of rows.
+        """
+        try:
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        except Exception as e:
+            print(f"Error opening {file_path}: {e}")
+            return None
+
+        try:
+            sheet_names = workbook.sheetnames
+            if set(self.FRAME_SHEETS).issubset(sheet_names):
+                if sheet not in sheet_names:
+                    return None
+                worksheet = workbook[sheet]
+            elif sheet == 'core':
+                # Single-sheet workbooks keep everything in what 2026 calls the core sheet
+                worksheet = workbook[sheet_names[0]]
+            else:
+                return None
+
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                return None
+
+            # Same names pandas would give the columns
+            names = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+            indices = [i for i in range(1, len(names)) if columns is None or names[i] in columns]
+
+            kept = deque(maxlen=last_rows or None)
+            for row in rows:
+                row_date = self._cell_date(row[0] if row else None)
+                if row_date is None:
+                    continue
+                if end is not None and row_date > end:
+                    break
+                if start is not None and row_date < start:
+                    continue
+                if last_days:
+                    while kept and kept[0][0] <= row_date - timedelta(days=last_days):
+                        kept.popleft()
+                kept.append([row_date] + [row[i] if i < len(row) else None for i in indices])
+        finally:
+            workbook.close()
+
+        return pd.DataFrame.from_records(list(kept), columns=['date'] + [names[i] for i in indices])
+
+    @staticmethod
+    def _cell_date(value: Any) -> Optional[date]:
+        """Date of a raw date-column cell, None if it isn't one"""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return None
+        try:
+            return datetime.strptime(str(value).strip(), '%d.%m.%Y').date()
+        except ValueError:
+            pass
+        try:
+            return pd.to_datetime(value, dayfirst=True).date()
+        except (ValueError, TypeError):
+            return None
+
     def _parse_single_sheet_excel(self, file_path: Path) -> Dict[str, Any]:
         """Parse single-sheet Excel file (2025 format)"""
         try:
@@ -87,22 +479,18 @@ class ExcelService:
             print(f"Raw Excel columns: {list(df.columns)}")  # Debug
             print(f"DataFrame shape: {df.shape}")  # Debug
             
+            # Column types compiled by an earlier parse, reused while the header is unchanged
+            header = list(df.columns)
+            schema = self.schema_manifest.get(file_path, 'core', header)
+            compiled = {}
+            
             # Assume first column is date
             date_col = df.columns[0]
             print(f"Date column: '{date_col}'")  # Debug
             print(f"Sample date values: {list(df[date_col].dropna().head(3))}")  # Debug
             
-            # Try multiple date formats that might be in your Excel file
-            try:
-                df[date_col] = pd.to_datetime(df[date_col], dayfirst=True).dt.date
-                print("Successfully parsed dates with dayfirst=True")  # Debug
-            except:
-                try:
-                    df[date_col] = pd.to_datetime(df[date_col], format='%d.%m.%Y').dt.date
-                    print("Successfully parsed dates with format '%d.%m.%Y'")  # Debug
-                except:
-                    df[date_col] = pd.to_datetime(df[date_col]).dt.date
-                    print("Parsed dates with default format")  # Debug
+            df[date_col], date_format = self._parse_dates(df[date_col], schema['date_format'] if schema else None)
+            print(f"Parsed dates with format '{date_format}'")  # Debug
             
             # Extract habit columns (exclude date and system columns)
             # Handle all possible variations of "Tech + Praca" column name
@@ -135,8 +523,9 @@ class ExcelService:
             habits = []
             entries = []
             
-            # Load saved configuration
+            # Load saved configuration; defaults for new habits are saved in one write at the end
             saved_config = self.config_service.load_config()
+            new_configs = {}
             
             for i, col in enumerate(habit_columns):
                 habit_id = f"habit_{col}"  # Use column name as ID for consistency
@@ -148,85 +537,76 @@ class ExcelService:
                 default_emoji = self._get_smart_emoji(col)
                 default_name = col.replace('🔒 ', '').strip()  # Remove lock emoji from display name
                 
-                # Determine habit type based on values
-                sample_values = df[col].dropna().head(10)
-                
-                # Special handling for potential data issues
-                if len(sample_values) == 0:
-                    print(f"WARNING: Column '{col}' has no non-null values")  # Debug
-                    # Check total values including nulls
-                    total_values = len(df[col])
-                    null_values = df[col].isnull().sum()
-                    print(f"  Total values: {total_values}, Null values: {null_values}")  # Debug
-                    
-                    # Don't skip essential analytics columns even if they have no data
-                    if col.lower() not in ['inne', 'other']:
-                        continue
-                    else:
-                        print(f"  Keeping '{col}' for analytics despite no data")  # Debug
-                
-                # For columns with no data, assume 'time' type if they're analytics columns
-                if len(sample_values) == 0 and col.lower() in ['inne', 'other']:
-                    habit_type = 'time'
-                    print(f"  Defaulting to 'time' type for analytics column '{col}'")  # Debug
+                known = schema['columns'].get(str(col)) if schema else None
+                if known and df[col].notna().any():
+                    habit_type = known['habit_type']
+                    category = known['category']
+                    compiled[str(col)] = known
                 else:
-                    habit_type = self._determine_habit_type(sample_values)
-                
-                print(f"Column '{col}': type={habit_type}, sample_count={len(sample_values)}, sample_values={list(sample_values[:3])}")  # Debug
-                
-                # Force "Tech + Praca" type if needed - productivity columns should be 'time'
-                if "tech" in col.lower() or "praca" in col.lower():
-                    print(f"*** TECH+PRACA COLUMN FOUND: '{col}' with {len(sample_values)} values")  # Debug
-                    print(f"    Sample values: {list(sample_values[:5])}")  # Debug
-                    print(f"    Detected type: {habit_type}")  # Debug
+                    # Determine habit type based on values
+                    sample_values = df[col].dropna().head(10)
+                    
+                    # Special handling for potential data issues
+                    if len(sample_values) == 0:
+                        print(f"WARNING: Column '{col}' has no non-null values")  # Debug
+                        # Check total values including nulls
+                        total_values = len(df[col])
+                        null_values = df[col].isnull().sum()
+                        print(f"  Total values: {total_values}, Null values: {null_values}")  # Debug
+                        
+                        # Don't skip essential analytics columns even if they have no data
+                        if col.lower() not in ['inne', 'other']:
+                            continue
+                        else:
+                            print(f"  Keeping '{col}' for analytics despite no data")  # Debug
                     
-                    # Force to 'time' type if it looks like productivity data
-                    if habit_type != 'time':
-                        print(f"    FORCING type to 'time' for productivity column")  # Debug
+                    # For columns with no data, assume 'time' type if they're analytics columns
+                    if len(sample_values) == 0 and col.lower() in ['inne', 'other']:
                         habit_type = 'time'
-                
-                # Assign category
-                category = self._get_habit_category(col)
-
-                # Use saved config or create default
-                if habit_id in saved_config:
-                    config = saved_config[habit_id]
-                    # Skip if marked as inactive
-                    if not config.active:
-                        continue
+                        print(f"  Defaulting to 'time' type for analytics column '{col}'")  # Debug
+                    else:
+                        habit_type = self._determine_habit_type(sample_values)
+                    
+                    print(f"Column '{col}': type={habit_type}, sample_count={len(sample_values)}, sample_values={list(sample_values[:3])}")  # Debug
+                    
+                    # Force "Tech + Praca" type if needed - productivity columns should be 'time'
+                    if "tech" in col.lower() or "praca" in col.lower():
+                        print(f"*** TECH+PRACA COLUMN FOUND: '{col}' with {len(sample_values)} values")  # Debug
+                        print(f"    Sample values: {list(sample_values[:5])}")  # Debug
+                        print(f"    Detected type: {habit_type}")  # Debug
+                        
+                        # Force to 'time' type if it looks like productivity data
+                        if habit_type != 'time':
+                            print(f"    FORCING type to 'time' for productivity column")  # Debug
+                            habit_type = 'time'
+                    
+                    # Assign category
+                    category = self._get_habit_category(col)
+                    
+                    # Empty columns are left out so they get inferred once data appears
+                    if len(sample_values) > 0:
+                        compiled[str(col)] = {'habit_type': habit_type, 'category': category}
 
-                    habit = Habit(
-                        id=habit_id,
-                        name=config.name,
-                        emoji=config.emoji,
-                        habit_type=habit_type,
-                        category=category,
-                        order=config.order,
-                        current_streak=0,
-                        best_streak=0,
-                        completed_today=False,
-                        is_personal=config.is_personal
-                    )
-                else:
-                    # Create default config and save it
+                # Parsed habits keep their defaults; the saved config is overlaid at merge time
+                if habit_id not in saved_config:
                     default_config = self.config_service.create_default_config(
                         habit_id, default_name, default_emoji, i, is_personal
                     )
                     saved_config[habit_id] = default_config
-                    self.config_service.save_config(saved_config)
+                    new_configs[habit_id] = default_config
 
-                    habit = Habit(
-                        id=habit_id,
-                        name=default_name,
-                        emoji=default_emoji,
-                        habit_type=habit_type,
-                        category=category,
-                        order=i,
-                        current_streak=0,
-                        best_streak=0,
-                        completed_today=False,
-                        is_personal=is_personal
-                    )
+                habit = Habit(
+                    id=habit_id,
+                    name=default_name,
+                    emoji=default_emoji,
+                    habit_type=habit_type,
+                    category=category,
+                    order=i,
+                    current_streak=0,
+                    best_streak=0,
+                    completed_today=False,
+                    is_personal=is_personal
+                )
                 
                 habits.append(habit)
                 
@@ -254,52 +634,30 @@ class ExcelService:
             for essential_col in essential_productivity_columns:
                 if essential_col in df.columns and essential_col not in time_habit_names:
                     habit_id = f"habit_{essential_col}"
-                    
-                    # Check if this habit is marked as inactive in config
-                    if habit_id in saved_config and not saved_config[habit_id].active:
-                        print(f"SKIPPING force-add for {essential_col} - marked as inactive in config")  # Debug
-                        continue
-                    
                     print(f"FORCE-ADDING missing productivity column: {essential_col}")  # Debug
 
                     default_emoji = self._get_smart_emoji(essential_col)
                     category = self._get_habit_category(essential_col)
 
-                    # Use saved config if available, otherwise create default
-                    if habit_id in saved_config:
-                        config = saved_config[habit_id]
-                        habit = Habit(
-                            id=habit_id,
-                            name=config.name,
-                            emoji=config.emoji,
-                            habit_type='time',  # Force time type for analytics
-                            category=category,
-                            order=config.order,
-                            current_streak=0,
-                            best_streak=0,
-                            completed_today=False,
-                            is_personal=config.is_personal
-                        )
-                    else:
-                        # Create default config and save it
+                    if habit_id not in saved_config:
                         default_config = self.config_service.create_default_config(
                             habit_id, essential_col, default_emoji, len(habits), False
                         )
                         saved_config[habit_id] = default_config
-                        self.config_service.save_config(saved_config)
-
-                        habit = Habit(
-                            id=habit_id,
-                            name=essential_col,
-                            emoji=default_emoji,
-                            habit_type='time',  # Force time type
-                            category=category,
-                            order=len(habits),
-                            current_streak=0,
-                            best_streak=0,
-                            completed_today=False,
-                            is_personal=False
-                        )
+                        new_configs[habit_id] = default_config
+
+                    habit = Habit(
+                        id=habit_id,
+                        name=essential_col,
+                        emoji=default_emoji,
+                        habit_type='time',  # Force time type
+                        category=category,
+                        order=len(habits),
+                        current_streak=0,
+                        best_streak=0,
+                        completed_today=False,
+                        is_personal=False
+                    )
                     habits.append(habit)
                     
                     # Add entries for this habit
@@ -317,11 +675,19 @@ class ExcelService:
                     
                     print(f"Force-added {entry_count} entries for {essential_col}")  # Debug
             
+            if new_configs:
+                self.config_service.register_defaults(new_configs)
+
+            self.schema_manifest.put(file_path, 'core', header, date_format, compiled)
+            self.schema_manifest.save()
+
             return {
                 'habits': habits,
                 'entries': entries,
                 'file_path': str(file_path),
-                'last_modified': file_path.stat().st_mtime
+                'last_modified': file_path.stat().st_mtime,
+                # Single-sheet workbooks keep everything in what 2026 calls the core sheet
+                'frames': {'core': df.rename(columns={date_col: 'date'})}
             }
             
         except Exception as e:
@@ -369,6 +735,20 @@ class ExcelService:
         
         return "📝"  # Default emoji
     
+    def _parse_dates(self, values: pd.Series, date_format: Optional[str] = None) -> Tuple[pd.Series, str]:
+        """Parse a date column, trying the known format first; returns (dates, format used)"""
+        formats = list(self.DATE_FORMATS)
+        if date_format in self.DATE_FORMATS:
+            formats.remove(date_format)
+            formats.insert(0, date_format)
+
+        for i, name in enumerate(formats):
+            try:
+                return self.DATE_FORMATS[name](values).dt.date, name
+            except Exception:
+                if i == len(formats) - 1:
+                    raise
+
     def _determine_habit_type(self, values: pd.Series) -> str:
         """Determine habit type based on sample values (from original app logic)"""
         if values.empty:
@@ -440,16 +820,21 @@ class ExcelService:
             habits = []
             entries = []
             saved_config = self.config_service.load_config()
+            new_configs = {}
+
+            # Column types compiled by an earlier parse, reused while each header is unchanged
+            core_header = list(df_core.columns)
+            habits_header = list(df_habits.columns)
+            core_schema = self.schema_manifest.get(file_path, 'core', core_header)
+            habits_schema = self.schema_manifest.get(file_path, 'habits', habits_header)
+            core_compiled = {}
+            habits_compiled = {}
 
             # Parse date column from core sheet
             date_col = df_core.columns[0]
-            try:
-                df_core[date_col] = pd.to_datetime(df_core[date_col], dayfirst=True).dt.date
-            except:
-                try:
-                    df_core[date_col] = pd.to_datetime(df_core[date_col], format='%d.%m.%Y').dt.date
-                except:
-                    df_core[date_col] = pd.to_datetime(df_core[date_col]).dt.date
+            df_core[date_col], date_format = self._parse_dates(
+                df_core[date_col], core_schema['date_format'] if core_schema else None
+            )
 
             # Align dates in other sheets
             df_habits[df_habits.columns[0]] = df_core[date_col]
@@ -458,51 +843,34 @@ class ExcelService:
             habit_order = 0
 
             # Helper function to create habit
-            def create_habit(col_name, habit_type, df, sheet_name):
+            def create_habit(col_name, habit_type, df, sheet_name, category=None):
                 nonlocal habit_order
                 habit_id = f"habit_{col_name}"
                 is_personal = col_name.startswith('🔒') or 'personal' in col_name.lower()
                 default_emoji = self._get_smart_emoji(col_name)
                 default_name = col_name.replace('🔒 ', '').strip()
-                category = self._get_habit_category(col_name)
+                category = category or self._get_habit_category(col_name)
 
-                # Use saved config or create default
-                if habit_id in saved_config:
-                    config = saved_config[habit_id]
-                    if not config.active:
-                        return None, []
-
-                    habit = Habit(
-                        id=habit_id,
-                        name=config.name,
-                        emoji=config.emoji,
-                        habit_type=habit_type,
-                        category=category,
-                        order=config.order,
-                        current_streak=0,
-                        best_streak=0,
-                        completed_today=False,
-                        is_personal=config.is_personal
-                    )
-                else:
+                # Parsed habits keep their defaults; the saved config is overlaid at merge time
+                if habit_id not in saved_config:
                     default_config = self.config_service.create_default_config(
                         habit_id, default_name, default_emoji, habit_order, is_personal
                     )
                     saved_config[habit_id] = default_config
-                    self.config_service.save_config(saved_config)
+                    new_configs[habit_id] = default_config
 
-                    habit = Habit(
-                        id=habit_id,
-                        name=default_name,
-                        emoji=default_emoji,
-                        habit_type=habit_type,
-                        category=category,
-                        order=habit_order,
-                        current_streak=0,
-                        best_streak=0,
-                        completed_today=False,
-                        is_personal=is_personal
-                    )
+                habit = Habit(
+                    id=habit_id,
+                    name=default_name,
+                    emoji=default_emoji,
+                    habit_type=habit_type,
+                    category=category,
+                    order=habit_order,
+                    current_streak=0,
+                    best_streak=0,
+                    completed_today=False,
+                    is_personal=is_personal
+                )
 
                 habit_order += 1
 
@@ -526,18 +894,23 @@ class ExcelService:
                 if col in SYSTEM_COLUMNS or str(col).startswith('Unnamed') or col == date_col:
                     continue
 
-                # Determine type
-                sample_values = df_core[col].dropna().head(10)
-                if len(sample_values) == 0:
-                    continue
+                known = core_schema['columns'].get(str(col)) if core_schema else None
+                if not (known and df_core[col].notna().any()):
+                    # Determine type
+                    sample_values = df_core[col].dropna().head(10)
+                    if len(sample_values) == 0:
+                        continue
 
-                habit_type = self._determine_habit_type(sample_values)
+                    habit_type = self._determine_habit_type(sample_values)
 
-                # Force time type for productivity columns
-                if "tech" in col.lower() or "praca" in col.lower() or col.lower() in ['inne', 'other']:
-                    habit_type = 'time'
+                    # Force time type for productivity columns
+                    if "tech" in col.lower() or "praca" in col.lower() or col.lower() in ['inne', 'other']:
+                        habit_type = 'time'
 
-                habit, habit_entries = create_habit(col, habit_type, df_core, 'core')
+                    known = {'habit_type': habit_type, 'category': self._get_habit_category(col)}
+                core_compiled[str(col)] = known
+
+                habit, habit_entries = create_habit(col, known['habit_type'], df_core, 'core', known['category'])
                 if habit:
                     habits.append(habit)
                     entries.extend(habit_entries)
@@ -547,13 +920,19 @@ class ExcelService:
                 if col in SYSTEM_COLUMNS or str(col).startswith('Unnamed') or col == df_habits.columns[0]:
                     continue
 
-                sample_values = df_habits[col].dropna().head(10)
-                if len(sample_values) == 0:
-                    continue
+                known = habits_schema['columns'].get(str(col)) if habits_schema else None
+                if not (known and df_habits[col].notna().any()):
+                    sample_values = df_habits[col].dropna().head(10)
+                    if len(sample_values) == 0:
+                        continue
 
-                habit_type = self._determine_habit_type(sample_values)
+                    known = {
+                        'habit_type': self._determine_habit_type(sample_values),
+                        'category': self._get_habit_category(col)
+                    }
+                habits_compiled[str(col)] = known
 
-                habit, habit_entries = create_habit(col, habit_type, df_habits, 'habits')
+                habit, habit_entries = create_habit(col, known['habit_type'], df_habits, 'habits', known['category'])
                 if habit:
                     habits.append(habit)
                     entries.extend(habit_entries)
@@ -575,60 +954,40 @@ class ExcelService:
                     default_emoji = '🧖' if activity == 'sauna' else '🧘'
 
                     # Create habit
-                    if habit_id in saved_config:
-                        config = saved_config[habit_id]
-                        if not config.active:
-                            continue
-
-                        habit = Habit(
-                            id=habit_id,
-                            name=config.name,
-                            emoji=config.emoji,
-                            habit_type='binary',
-                            category=category,
-                            order=config.order,
-                            current_streak=0,
-                            best_streak=0,
-                            completed_today=False,
-                            is_personal=config.is_personal
-                        )
-                    else:
-                        display_name = f"{activity.capitalize()} Session"
+                    display_name = f"{activity.capitalize()} Session"
+                    if habit_id not in saved_config:
                         default_config = self.config_service.create_default_config(
                             habit_id, display_name, default_emoji, habit_order, False
                         )
                         saved_config[habit_id] = default_config
-                        self.config_service.save_config(saved_config)
-
-                        habit = Habit(
-                            id=habit_id,
-                            name=display_name,
-                            emoji=default_emoji,
-                            habit_type='binary',
-                            category=category,
-                            order=habit_order,
-                            current_streak=0,
-                            best_streak=0,
-                            completed_today=False,
-                            is_personal=False
-                        )
+                        new_configs[habit_id] = default_config
+
+                    habit = Habit(
+                        id=habit_id,
+                        name=display_name,
+                        emoji=default_emoji,
+                        habit_type='binary',
+                        category=category,
+                        order=habit_order,
+                        current_streak=0,
+                        best_streak=0,
+                        completed_today=False,
+                        is_personal=False
+                    )
 
                     habit_order += 1
                     habits.append(habit)
 
-                    # Create entries based on accessories column text
-                    for _, row in df_workouts.iterrows():
-                        if pd.notna(row['accessories']) and pd.notna(row[date_col]):
-                            accessories_text = str(row['accessories']).lower()
-                            has_activity = activity in accessories_text
-
-                            entry = HabitEntry(
-                                habit_id=habit_id,
-                                date=row[date_col],
-                                value='1' if has_activity else '0',
-                                completed=has_activity
-                            )
-                            entries.append(entry)
+                    # Create entries based on accessories column text, one vectorized scan per activity
+                    logged = df_workouts[df_workouts['accessories'].notna() & df_workouts[date_col].notna()]
+                    matches = logged['accessories'].astype(str).str.lower().str.contains(activity, regex=False)
+                    for entry_date, has_activity in zip(logged[date_col], matches.tolist()):
+                        entries.append(HabitEntry(
+                            habit_id=habit_id,
+                            date=entry_date,
+                            value='1' if has_activity else '0',
+                            completed=has_activity
+                        ))
 
                     print(f"Created virtual habit '{activity}_session' from accessories column")
 
@@ -640,11 +999,23 @@ class ExcelService:
                         habits.append(habit)
                         entries.extend(habit_entries)
 
+            if new_configs:
+                self.config_service.register_defaults(new_configs)
+
+            self.schema_manifest.put(file_path, 'core', core_header, date_format, core_compiled)
+            self.schema_manifest.put(file_path, 'habits', habits_header, None, habits_compiled)
+            self.schema_manifest.save()
+
             return {
                 'habits': habits,
                 'entries': entries,
                 'file_path': str(file_path),
-                'last_modified': file_path.stat().st_mtime
+                'last_modified': file_path.stat().st_mtime,
+                'frames': {
+                    'core': df_core.rename(columns={date_col: 'date'}),
+                    'habits': df_habits.rename(columns={df_habits.columns[0]: 'date'}),
+                    'workouts': df_workouts.rename(columns={df_workouts.columns[0]: 'date'})
+                }
             }
 
         except Exception as e:
@@ -0,0 +1,177 @@
+import csv
+import io
+import json
+import numpy as np
+from datetime import date
+from typing import Dict, Iterator, List, Optional
+from app.services.timeline import HabitTimeline
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet and Arrow exports are unavailable without pyarrow
+    pa = None
+    pq = None
+
+# format -> (media type, file extension, needs pyarrow)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv', False),
+    'ndjson': ('application/x-ndjson', 'ndjson', False),
+    'parquet': ('application/vnd.apache.parquet', 'parquet', True),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows', True),
+}
+
+EXPORT_COLUMNS = ['date', 'habit_id', 'value', 'numeric_value', 'completed']
+
+# Days of the timeline serialized per chunk
+CHUNK_DAYS = 92
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_entry_chunks(timeline: HabitTimeline, habit_ids: Optional[List[str]] = None,
+                      start: Optional[date] = None, end: Optional[date] = None,
+                      chunk_days: int = CHUNK_DAYS) -> Iterator[Dict[str, np.ndarray]]:
+    """Entries of the timeline as columns, a block of days at a time, ordered by date then habit"""
+    rows = np.asarray(timeline.rows(habit_ids) if habit_ids is not None else range(len(timeline.habit_ids)), dtype=int)
+    if timeline.num_days == 0 or len(rows) == 0:
+        return
+
+    first = max(0, timeline.day_index(start)) if start else 0
+    last = min(timeline.num_days, timeline.day_index(end) + 1) if end else timeline.num_days
+    ids = np.array(timeline.habit_ids, dtype=object)
+    start_day = np.datetime64(timeline.start, 'D')
+
+    for chunk_start in range(first, last, chunk_days):
+        chunk_end = min(chunk_start + chunk_days, last)
+        days, positions = np.nonzero(timeline.present[rows, chunk_start:chunk_end].T)
+        if len(days) == 0:
+            continue
+        habit_rows = rows[positions]
+        columns = chunk_start + days
+        yield {
+            'date': start_day + columns,
+            'habit_id': ids[habit_rows],
+            'value': timeline.raw[habit_rows, columns],
+            'numeric_value': timeline.values[habit_rows, columns],
+            'completed': timeline.completed[habit_rows, columns],
+        }
+
+
+def _csv_stream(chunks: Iterator[Dict[str, np.ndarray]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        numeric = np.where(np.isnan(chunk['numeric_value']), '', chunk['numeric_value'].astype(str))
+        writer.writerows(zip(
+            np.datetime_as_string(chunk['date']), chunk['habit_id'],
+            ['' if value is None else value for value in chunk['value']],
+            numeric, chunk['completed'].tolist()
+        ))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _ndjson_stream(chunks: Iterator[Dict[str, np.ndarray]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        numeric = [None if np.isnan(v) else v for v in chunk['numeric_value'].tolist()]
+        lines = [
+            json.dumps({
+                'date': day, 'habit_id': habit_id, 'value': value,
+                'numeric_value': number, 'completed': completed
+            }, ensure_ascii=False)
+            for day, habit_id, value, number, completed in zip(
+                np.datetime_as_string(chunk['date']), chunk['habit_id'], chunk['value'],
+                numeric, chunk['completed'].tolist()
+            )
+        ]
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _arrow_schema():
+    return pa.schema([
+        ('date', pa.date32()),
+        ('habit_id', pa.string()),
+        ('value', pa.string()),
+        ('numeric_value', pa.float64()),
+        ('completed', pa.bool_()),
+    ])
+
+
+def _record_batch(chunk: Dict[str, np.ndarray], schema):
+    return pa.record_batch([
+        pa.array(chunk['date'], type=pa.date32()),
+        pa.array(chunk['habit_id'], type=pa.string()),
+        pa.array(chunk['value'], type=pa.string()),
+        pa.array(chunk['numeric_value'], type=pa.float64(), from_pandas=True),
+        pa.array(chunk['completed'], type=pa.bool_()),
+    ], schema=schema)
+
+
+def _arrow_stream(chunks: Iterator[Dict[str, np.ndarray]]) -> Iterator[bytes]:
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(_record_batch(chunk, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _parquet_stream(chunks: Iterator[Dict[str, np.ndarray]]) -> Iterator[bytes]:
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    # Each chunk becomes one row group, flushed to the client as soon as it is written
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(_record_batch(chunk, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+STREAM_WRITERS = {
+    'csv': _csv_stream,
+    'ndjson': _ndjson_stream,
+    'parquet': _parquet_stream,
+    'arrow': _arrow_stream,
+}
+
+
+def export_available(fmt: str) -> bool:
+    return not EXPORT_FORMATS[fmt][2] or pa is not None
+
+
+def stream_export(timeline: HabitTimeline, fmt: str, habit_ids: Optional[List[str]] = None,
+                  start: Optional[date] = None, end: Optional[date] = None) -> Iterator[bytes]:
+    """Serialize timeline entries in `fmt`, one chunk of days at a time"""
+    for data in STREAM_WRITERS[fmt](iter_entry_chunks(timeline, habit_ids, start, end)):
+        if data:
+            yield data
@@ -1,8 +1,18 @@
 import json
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 from pydantic import BaseModel
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 class HabitConfig(BaseModel):
     """Configuration for a single habit"""
@@ -13,60 +23,173 @@ class HabitConfig(BaseModel):
     color: Optional[str] = None
     order: int = 0
     is_personal: bool = False
+    # Frequency goal: target_count qualifying entries per target_period ('week' or 'month');
+    # with target_min_value only entries with at least that value (e.g. minutes) count
+    target_count: Optional[int] = None
+    target_period: str = 'week'
+    target_min_value: Optional[float] = None
 
 class HabitConfigService:
-    """Manages habit configuration persistence"""
-    
-    def __init__(self, config_path: str = "./data/habits_config.json"):
-        self.config_path = Path(config_path)
+    """Manages habit configuration persistence.
+
+    The parsed config is kept in memory and only re-read when the file's
+    signature (mtime, size, inode) changes. Every write happens under a
+    cross-process file lock and replaces the file atomically, so several
+    workers sharing the data directory can't corrupt or lose updates.
+    """
+
+    def __init__(self, config_path: Optional[str] = None):
+        # Kept next to the workbooks unless a path is given
+        self.config_path = Path(config_path or Path(settings.EXCEL_DATA_PATH) / "habits_config.json")
         self.config_path.parent.mkdir(exist_ok=True)
-        
+        self.lock_path = self.config_path.with_name(self.config_path.name + '.lock')
+
+        self._config: Dict[str, HabitConfig] = {}
+        self._signature: Optional[tuple] = None
+        self._lock = threading.RLock()
+
+    def _file_signature(self) -> Optional[tuple]:
+        try:
+            stat = self.config_path.stat()
+        except OSError:
+            return None
+        # Atomic replace gives the file a new inode, even within one mtime tick
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def config_version(self) -> Optional[tuple]:
+        """Signature of the config file (None when missing), for cache invalidation"""
+        return self._file_signature()
+
+    def version_tag(self) -> str:
+        """Opaque string form of config_version() for API clients"""
+        signature = self._file_signature()
+        return '-'.join(format(part, 'x') for part in signature) if signature else '0'
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive lock shared by all processes using this config file"""
+        with open(self.lock_path, 'a+') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _refresh(self):
+        """Re-read the file if it changed since it was last loaded"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+
+        if signature is None:
+            self._config = {}
+            self._signature = None
+            return
+
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._config = {
+            habit_id: HabitConfig(**config)
+            for habit_id, config in data.items()
+        }
+        self._signature = signature
+
+    @staticmethod
+    def _copy(config: Dict[str, HabitConfig]) -> Dict[str, HabitConfig]:
+        return {habit_id: habit_config.model_copy() for habit_id, habit_config in config.items()}
+
+    def _write(self, config: Dict[str, HabitConfig]):
+        """Write via a temp file and rename, so readers never see a partial file"""
+        data = {
+            habit_id: habit_config.model_dump()
+            for habit_id, habit_config in config.items()
+        }
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.config_path.parent, prefix=f".{self.config_path.name}.", suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        self._config = self._copy(config)
+        self._signature = self._file_signature()
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, HabitConfig]]:
+        """Lock the config, yield its latest state for modification and write it once on exit.
+
+        Nothing is written if the block raises or leaves the config unchanged.
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            config = self._copy(self._config)
+            yield config
+            if config != self._config:
+                self._write(config)
+
     def load_config(self) -> Dict[str, HabitConfig]:
-        """Load habit configuration from file"""
+        """Load habit configuration (from memory unless the file changed)"""
         try:
-            if self.config_path.exists():
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return {
-                        habit_id: HabitConfig(**config)
-                        for habit_id, config in data.items()
-                    }
+            with self._lock:
+                self._refresh()
+                return self._copy(self._config)
         except Exception as e:
             print(f"Error loading config: {e}")
         return {}
-    
+
     def save_config(self, config: Dict[str, HabitConfig]) -> bool:
         """Save habit configuration to file"""
         try:
-            data = {
-                habit_id: habit_config.dict()
-                for habit_id, habit_config in config.items()
-            }
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with self._lock, self._file_lock():
+                self._write(config)
+            return True
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            return False
+
+    def register_defaults(self, defaults: Dict[str, HabitConfig]) -> bool:
+        """Add configs for newly discovered habits in one write, keeping existing entries"""
+        try:
+            with self.transaction() as config:
+                for habit_id, habit_config in defaults.items():
+                    config.setdefault(habit_id, habit_config)
             return True
         except Exception as e:
             print(f"Error saving config: {e}")
             return False
-    
+
     def update_habit(self, habit_id: str, updates: Dict[str, Any]) -> bool:
         """Update a specific habit's configuration"""
-        config = self.load_config()
-        if habit_id in config:
-            for key, value in updates.items():
-                if hasattr(config[habit_id], key):
-                    setattr(config[habit_id], key, value)
-            return self.save_config(config)
-        return False
-    
+        try:
+            with self.transaction() as config:
+                if habit_id not in config:
+                    return False
+                for key, value in updates.items():
+                    if hasattr(config[habit_id], key):
+                        setattr(config[habit_id], key, value)
+            return True
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            return False
+
     def delete_habit(self, habit_id: str) -> bool:
         """Delete a habit from configuration (sets active=False)"""
-        config = self.load_config()
-        if habit_id in config:
-            config[habit_id].active = False
-            return self.save_config(config)
-        return False
-    
+        return self.update_habit(habit_id, {"active": False})
+
     def create_default_config(self, habit_id: str, original_name: str, emoji: str,
                             order: int, is_personal: bool = False) -> HabitConfig:
         """Create default configuration for a new habit"""
@@ -82,4 +205,4 @@ class HabitConfigService:
             active=is_active,
             order=order,
             is_personal=is_personal
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,417 @@
+import warnings
+import numpy as np
+from datetime import date
+from typing import Any, Dict, List, Optional
+from app.services.series import bucket_bounds
+from app.services.timeline import DailyRollup, HabitTimeline
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+MINUTE_PERCENTILES = [0, 25, 50, 75, 90, 100]
+
+
+def _month_label(month_number: int) -> str:
+    """'YYYY-MM' of a month counted from January 1970"""
+    return f"{1970 + month_number // 12}-{month_number % 12 + 1:02d}"
+
+
+def _best(totals: np.ndarray, labels) -> Optional[Dict[str, Any]]:
+    """Largest positive bucket total and its label (first one on ties)"""
+    if len(totals) == 0 or totals.max() <= 0:
+        return None
+    best = int(np.argmax(totals))
+    return {"period": labels(best), "minutes": float(totals[best])}
+
+
+def habit_detail(timeline: HabitTimeline, habit_id: str) -> Dict[str, Any]:
+    """Streak runs, monthly completion and, for time habits, minute records of one habit.
+
+    Everything is derived from the habit's row of the timeline and its streak
+    index; the result is memoized on the timeline, so it is computed once per
+    dataset version.
+    """
+    return timeline.cached(('habit_detail', habit_id), lambda: _compute_habit_detail(timeline, habit_id))
+
+
+def _compute_habit_detail(timeline: HabitTimeline, habit_id: str) -> Dict[str, Any]:
+    row = timeline.habit_index[habit_id]
+    habit = timeline.habits[row]
+    index = timeline.streak_index(habit_id)
+
+    runs = [
+        {
+            "start": str(date.fromordinal(int(start))),
+            "end": str(date.fromordinal(int(end))),
+            "length": int(length)
+        }
+        for start, end, length in zip(index.run_start, index.run_end, index.run_length)
+    ]
+    # Longest first, the most recent run wins ties
+    longest = np.lexsort((-index.run_start, -index.run_length)).tolist()
+
+    monthly = []
+    if timeline.num_days:
+        months = timeline.day_numbers('month')
+        offsets = months - months[0]
+        days = np.bincount(offsets)
+        logged = np.bincount(offsets, weights=timeline.present[row])
+        completed = np.bincount(offsets, weights=timeline.completed[row])
+        monthly = [
+            {
+                "month": _month_label(int(months[0]) + i),
+                "days": int(days[i]),
+                "logged": int(logged[i]),
+                "completed": int(completed[i]),
+                "completion_rate": float(completed[i] / days[i] * 100)
+            }
+            for i in range(len(days))
+        ]
+
+    detail = {
+        "habit_id": habit_id,
+        "name": habit.name,
+        "habit_type": habit.habit_type,
+        "streak_runs": runs,
+        "top_streaks": [runs[i] for i in longest],
+        "monthly": monthly,
+        "minutes": None
+    }
+
+    if habit.habit_type == 'time':
+        minutes = np.nan_to_num(timeline.values[row], nan=0.0)
+        detail["minutes"] = {"total": float(minutes.sum()), "best_day": None, "best_week": None, "best_month": None}
+        if timeline.num_days:
+            weeks = timeline.day_numbers('week')
+            months = timeline.day_numbers('month')
+            detail["minutes"].update({
+                "best_day": _best(minutes, lambda i: str(timeline.date_at(i))),
+                # Weeks are labelled by their Monday, which may be before the timeline starts
+                "best_week": _best(
+                    np.bincount(weeks - weeks[0], weights=minutes),
+                    lambda i: str(date.fromordinal(timeline.start.toordinal() - timeline.start.weekday() + 7 * i))
+                ),
+                "best_month": _best(
+                    np.bincount(months - months[0], weights=minutes),
+                    lambda i: _month_label(int(months[0]) + i)
+                ),
+            })
+
+    return detail
+
+
+def _matrix(values: np.ndarray, support: np.ndarray, min_days: int) -> List[List[Optional[float]]]:
+    """Nested lists for JSON; cells with fewer than `min_days` days of support (or undefined) are None"""
+    values = np.where((support >= min_days) & np.isfinite(values), values, np.nan)
+    return [[None if np.isnan(v) else v for v in row] for row in values.tolist()]
+
+
+def habit_correlations(timeline: HabitTimeline, habit_ids: List[str], start: date, end: date,
+                       min_days: int) -> Dict[str, Any]:
+    """Same-day completion correlation and next-day completion lift between habits.
+
+    Both are computed for all pairs at once from matrix products over the
+    habits x days completion matrix, using only days on which both habits of
+    a pair have an entry. The most recently requested results are memoized on
+    the timeline (one dataset version).
+    """
+    key = ('habit_correlations', tuple(habit_ids), start, end, min_days)
+    return timeline.cached_query(key, lambda: _compute_correlations(timeline, habit_ids, start, end, min_days))
+
+
+def _compute_correlations(timeline: HabitTimeline, habit_ids: List[str], start: date, end: date,
+                          min_days: int) -> Dict[str, Any]:
+    rows = timeline.rows(habit_ids)
+    first = max(timeline.day_index(start), 0)
+    last = min(timeline.day_index(end) + 1, timeline.num_days)
+    present = timeline.present[rows, first:max(first, last)].astype(float)
+    completed = timeline.completed[rows, first:max(first, last)].astype(float) * present
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Same day: Pearson (phi) correlation over the days both habits were logged
+        both = present @ present.T
+        rate_x = (completed @ present.T) / both        # rate of habit i on days habit j was logged
+        rate_y = rate_x.T
+        joint = (completed @ completed.T) / both
+        correlation = (joint - rate_x * rate_y) / np.sqrt(rate_x * (1 - rate_x) * rate_y * (1 - rate_y))
+
+        # Next day: P(j completed tomorrow | i completed today) vs P(j completed tomorrow | i logged today)
+        today_completed, today_present = completed[:, :-1], present[:, :-1]
+        tomorrow_completed, tomorrow_present = completed[:, 1:], present[:, 1:]
+        after_completed = today_completed @ tomorrow_present.T
+        rate_after_completed = (today_completed @ tomorrow_completed.T) / after_completed
+        after_logged = today_present @ tomorrow_present.T
+        baseline = (today_present @ tomorrow_completed.T) / after_logged
+        lift = rate_after_completed / baseline
+
+    return {
+        "habits": habit_ids,
+        "from": str(start),
+        "to": str(end),
+        "min_days": min_days,
+        "same_day": {
+            "correlation": _matrix(correlation, both, min_days),
+            "days": both.astype(int).tolist()
+        },
+        "next_day": {
+            "rate_if_completed": _matrix(rate_after_completed * 100, after_completed, min_days),
+            "rate": _matrix(baseline * 100, after_logged, min_days),
+            "lift": _matrix(lift, after_completed, min_days),
+            "days": after_completed.astype(int).tolist()
+        }
+    }
+
+
+def _rates(completed: np.ndarray, logged: np.ndarray) -> List[Optional[float]]:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(logged > 0, completed / np.maximum(logged, 1) * 100, np.nan)
+    return [None if np.isnan(v) else v for v in rates.tolist()]
+
+
+def _optional(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else v for v in values.astype(float).tolist()]
+
+
+def activity_patterns(timeline: HabitTimeline, rollup: DailyRollup, habit_ids: List[str],
+                      start: date, end: date) -> Dict[str, Any]:
+    """Completion by weekday and month of year per habit, and daily productivity minutes by weekday and month.
+
+    Completion rates are completed entries over logged entries. Weekday
+    totals come from the rollup's weekday sums and month totals from the
+    timeline's prefix sums, so only the productivity percentiles look at
+    individual days of the range.
+    """
+    rows = timeline.rows(habit_ids)
+    first = min(max(timeline.day_index(start), 0), timeline.num_days)
+    last = min(max(timeline.day_index(end) + 1, first), timeline.num_days)
+
+    # Weekday x habit completion
+    weekday_sums = rollup.weekday_sums
+    logged = weekday_sums.range_totals('present', rows, first, last)
+    completed = weekday_sums.range_totals('completed', rows, first, last)
+    weekday_habits = {
+        habit_id: {
+            "logged": logged[i].tolist(),
+            "completed": completed[i].tolist(),
+            "completion_rate": _rates(completed[i], logged[i])
+        }
+        for i, habit_id in enumerate(habit_ids)
+    }
+
+    # Daily productivity minutes laid out as weeks x weekdays, NaN outside the range
+    minutes = rollup.productivity_minutes[first:last]
+    lead = timeline.date_at(first).weekday() if last > first else 0
+    grid = np.full(-(-(lead + len(minutes)) // 7) * 7, np.nan)
+    grid[lead:lead + len(minutes)] = minutes
+    grid = grid.reshape(-1, 7)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # weekdays without days in short ranges
+        percentiles = np.nanpercentile(grid, MINUTE_PERCENTILES, axis=0) if len(grid) else np.full((len(MINUTE_PERCENTILES), 7), np.nan)
+        means = np.nanmean(grid, axis=0) if len(grid) else np.full(7, np.nan)
+    productivity = {
+        "days": weekday_sums.day_counts(first, last).tolist(),
+        "mean": _optional(means),
+        "percentiles": {str(p): _optional(percentiles[i]) for i, p in enumerate(MINUTE_PERCENTILES)}
+    }
+
+    # Month of year: per-month totals from prefix sums, folded onto January..December
+    month_totals = {"logged": np.zeros((len(rows), 12)), "completed": np.zeros((len(rows), 12))}
+    if last > first:
+        buckets, _ = bucket_bounds(timeline.date_at(first), timeline.date_at(last - 1), 'month')
+        starts = np.array([timeline.day_index(a) for a, _ in buckets], dtype=np.int64)
+        ends = np.array([timeline.day_index(b) + 1 for _, b in buckets], dtype=np.int64)
+        month_of_year = np.zeros((len(buckets), 12))
+        month_of_year[np.arange(len(buckets)), [a.month - 1 for a, _ in buckets]] = 1
+        prefix = timeline.prefix_sums()
+        month_totals = {
+            "logged": prefix.range_totals('present', rows, starts, ends) @ month_of_year,
+            "completed": prefix.range_totals('completed', rows, starts, ends) @ month_of_year,
+        }
+
+    months = timeline.day_numbers('month')[first:last]
+    calendar_months = months % 12
+    month_days = np.bincount(calendar_months, minlength=12)
+    month_minutes = np.bincount(calendar_months, weights=minutes, minlength=12)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_daily_minutes = np.where(month_days > 0, month_minutes / np.maximum(month_days, 1), np.nan)
+
+    # Average daily minutes of each calendar month, per year
+    by_year = {}
+    if len(months):
+        month_numbers, inverse = np.unique(months, return_inverse=True)
+        days = np.bincount(inverse)
+        totals = np.bincount(inverse, weights=minutes)
+        for month_number, total, count in zip(month_numbers.tolist(), totals.tolist(), days.tolist()):
+            by_year.setdefault(str(1970 + month_number // 12), [None] * 12)[month_number % 12] = total / count
+
+    return {
+        "from": str(start),
+        "to": str(end),
+        "weekdays": WEEKDAYS,
+        "weekday": {
+            "habits": weekday_habits,
+            "productivity_minutes": productivity
+        },
+        "month_of_year": {
+            "habits": {
+                habit_id: {
+                    "logged": month_totals["logged"][i].astype(int).tolist(),
+                    "completed": month_totals["completed"][i].astype(int).tolist(),
+                    "completion_rate": _rates(month_totals["completed"][i], month_totals["logged"][i])
+                }
+                for i, habit_id in enumerate(habit_ids)
+            },
+            "productivity_minutes": {
+                "days": month_days.tolist(),
+                "avg_daily": _optional(avg_daily_minutes),
+                "by_year": by_year
+            }
+        }
+    }
+
+
+TARGET_PERIODS = ('week', 'month')
+
+
+def _period_number(day: date, period: str) -> int:
+    """Same numbering as HabitTimeline.day_numbers"""
+    if period == 'week':
+        return ((day - date(1970, 1, 1)).days + 3) // 7
+    return (day.year - 1970) * 12 + day.month - 1
+
+
+def _period_bounds(number: int, period: str):
+    """First and last day of a period number, and its label (ISO week or YYYY-MM)"""
+    if period == 'week':
+        first = date.fromordinal(date(1970, 1, 1).toordinal() + number * 7 - 3)
+        year, week, _ = first.isocalendar()
+        return first, date.fromordinal(first.toordinal() + 6), f"{year}-W{week:02d}"
+    first = date(1970 + number // 12, number % 12 + 1, 1)
+    following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return first, date.fromordinal(following.toordinal() - 1), _month_label(number)
+
+
+def _period_counts(timeline: HabitTimeline, habit_id: str, period: str,
+                   min_value: Optional[float]) -> Dict[str, Any]:
+    """Qualifying entries per period number (from the timeline's first period).
+
+    Every new target_min_value a client saves is a new key, so results go to
+    the timeline's bounded query cache.
+    """
+    def compute():
+        row = timeline.habit_index[habit_id]
+        qualifying = timeline.completed[row]
+        if min_value is not None:
+            qualifying = qualifying & (np.nan_to_num(timeline.values[row], nan=0.0) >= min_value)
+        numbers = timeline.day_numbers(period)
+        return {
+            "first": int(numbers[0]),
+            "counts": np.bincount(numbers - numbers[0], weights=qualifying).astype(np.int64),
+            "qualifying": qualifying
+        }
+    return timeline.cached_query(('period_counts', habit_id, period, min_value), compute)
+
+
+def target_progress(timeline: HabitTimeline, habit_id: str, target_count: int, period: str,
+                    min_value: Optional[float], as_of: date, history: int = 12) -> Dict[str, Any]:
+    """Progress of a count-per-period goal as of a day.
+
+    The current period is still open, so it extends the hit streak when the
+    target is already met but never breaks it; hit rates only count closed
+    periods since the habit's first logged entry.
+    """
+    current = _period_number(as_of, period)
+    logged = timeline.habit_days(habit_id) if habit_id in timeline.habit_index else np.zeros(0, dtype=np.int64)
+    first_logged = _period_number(date.fromordinal(int(logged[0])), period) if len(logged) else None
+
+    if first_logged is None or first_logged > current:
+        first = current
+        per_period = np.zeros(1, dtype=np.int64)
+    else:
+        # Periods from the first logged one through the current one; beyond the timeline they are empty
+        first = first_logged
+        counts = _period_counts(timeline, habit_id, period, min_value)
+        per_period = np.zeros(current - first + 1, dtype=np.int64)
+        source = counts["counts"][first - counts["first"]:current - counts["first"] + 1]
+        per_period[:len(source)] = source
+        # Entries after the as-of day don't count towards the open period
+        period_start = max(timeline.day_index(_period_bounds(current, period)[0]), 0)
+        as_of_index = timeline.day_index(as_of)
+        if as_of_index < timeline.num_days - 1:
+            per_period[-1] = int(counts["qualifying"][period_start:max(as_of_index + 1, period_start)].sum())
+
+    hits = per_period >= target_count
+    closed = hits[:-1]
+    misses = np.flatnonzero(~closed)
+    streak = len(closed) - (int(misses[-1]) + 1 if len(misses) else 0) + int(hits[-1])
+
+    # Longest run of hits, via the gaps between misses
+    miss_positions = np.concatenate([[-1], np.flatnonzero(~hits), [len(hits)]])
+    best_streak = int(np.max(np.diff(miss_positions) - 1))
+
+    def describe(offset: int) -> Dict[str, Any]:
+        start, end, label = _period_bounds(first + offset, period)
+        return {"period": label, "start": str(start), "end": str(end),
+                "count": int(per_period[offset]), "hit": bool(hits[offset])}
+
+    current_period = describe(len(per_period) - 1)
+    current_period["remaining"] = max(target_count - current_period["count"], 0)
+    return {
+        "habit_id": habit_id,
+        "as_of": str(as_of),
+        "target_count": target_count,
+        "target_period": period,
+        "target_min_value": min_value,
+        "current": current_period,
+        "current_hit_streak": streak,
+        "best_hit_streak": best_streak,
+        "closed_periods": len(closed),
+        "hit_rate": float(closed.mean() * 100) if len(closed) else None,
+        "history": [describe(offset) for offset in range(max(len(per_period) - history, 0), len(per_period))]
+    }
+
+
+DISTRIBUTION_PERCENTILES = [50, 90, 99]
+
+
+def _sorted_percentiles(sorted_values: np.ndarray, percentiles: List[float]) -> Dict[str, float]:
+    """Linear-interpolated percentiles (as numpy's default) read off an already sorted array"""
+    positions = np.asarray(percentiles, dtype=float) / 100 * (len(sorted_values) - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    values = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (positions - lower)
+    return {f"p{p}": float(v) for p, v in zip(percentiles, values)}
+
+
+def value_distribution(timeline: HabitTimeline, key: str, start: date, end: date, bins: int) -> Dict[str, Any]:
+    """Histogram, percentiles, zero-day ratio and spread of a habit's daily values (or PRODUCTIVITY_KEY).
+
+    Habits count the days they were logged with a number; total productivity
+    counts every calendar day. The whole history uses the timeline's cached
+    sorted values, other ranges sort just their slice.
+    """
+    first = min(max(timeline.day_index(start), 0), timeline.num_days)
+    last = min(max(timeline.day_index(end) + 1, first), timeline.num_days)
+    if first == 0 and last == timeline.num_days:
+        values = timeline.sorted_values(key)
+    else:
+        values = np.sort(timeline.day_values(key)[first:last])
+        values = values[~np.isnan(values)]
+
+    result = {"from": str(start), "to": str(end), "count": len(values)}
+    if len(values) == 0:
+        return {**result, "mean": None, "std": None, "min": None, "max": None, "zero_days": 0,
+                "zero_day_ratio": None, "percentiles": None, "histogram": {"edges": [], "counts": []}}
+
+    zero_days = int(np.searchsorted(values, 0, side='right') - np.searchsorted(values, 0, side='left'))
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        **result,
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values[0]),
+        "max": float(values[-1]),
+        "zero_days": zero_days,
+        "zero_day_ratio": zero_days / len(values),
+        "percentiles": _sorted_percentiles(values, DISTRIBUTION_PERCENTILES),
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()}
+    }
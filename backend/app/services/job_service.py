@@ -0,0 +1,259 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.services.dataset_registry import registry
+from app.services.habit_stats import habit_correlations
+from app.services.series import compute_series
+
+TRACKABLE_TYPES = ('binary', 'time', 'grade')
+
+Progress = Callable[[float, Optional[str]], None]
+
+
+class JobQueueFull(Exception):
+    """Raised when JOB_MAX_PENDING jobs are already queued or running"""
+
+
+def _date_param(params: Dict[str, Any], name: str, default: date) -> date:
+    value = params.get(name)
+    return date.fromisoformat(value) if value else default
+
+
+def _habit_param(params: Dict[str, Any], timeline) -> List[str]:
+    habit_ids = params.get('habits') or timeline.habit_ids_of_type(*TRACKABLE_TYPES)
+    unknown = [h for h in habit_ids if h not in timeline.habit_index]
+    if unknown:
+        raise ValueError(f"Habits not found: {', '.join(unknown)}")
+    return habit_ids
+
+
+def _year_review(data: Dict[str, Any], params: Dict[str, Any], report: Progress) -> Dict[str, Any]:
+    """Completion, longest streak and minutes of every habit in a year, grouped by category"""
+    timeline = data['timeline']
+    year = int(params.get('year') or (timeline.end.year if timeline.end else date.today().year))
+    start, end = date(year, 1, 1), date(year, 12, 31)
+    review = {"year": year, "categories": {}, "productivity": None, "perfect_days": 0}
+    if timeline.num_days == 0 or timeline.end < start or timeline.start > end:
+        return review
+
+    first = max(timeline.day_index(start), 0)
+    last = min(timeline.day_index(end) + 1, timeline.num_days)
+    rows = timeline.rows(_habit_param(params, timeline))
+    # Totals of every habit in one lookup per metric
+    prefix = timeline.prefix_sums()
+    logged_totals, completed_totals, minute_totals = (
+        prefix.range_totals(name, rows, np.array([first]), np.array([last]))[:, 0]
+        for name in ('present', 'completed', 'value')
+    )
+    for i, row in enumerate(rows):
+        habit = timeline.habits[row]
+        logged, completed = int(logged_totals[i]), int(completed_totals[i])
+        # Longest run within the year (runs crossing New Year are clipped)
+        index = timeline.streak_index(habit.id)
+        in_year = (index.run_end >= start.toordinal()) & (index.run_start <= end.toordinal())
+        runs = [
+            int(np.searchsorted(index.completed_days, min(run_end, end.toordinal()), side='right')
+                - np.searchsorted(index.completed_days, max(run_start, start.toordinal())))
+            for run_start, run_end in zip(index.run_start[in_year], index.run_end[in_year])
+        ]
+        summary = {
+            "name": habit.name,
+            "logged": logged,
+            "completed": completed,
+            "completion_rate": completed / logged * 100 if logged else None,
+            "longest_streak": max(runs, default=0)
+        }
+        if habit.habit_type == 'time':
+            summary["minutes"] = float(minute_totals[i])
+        review["categories"].setdefault(habit.category or 'other', {})[habit.id] = summary
+        report((i + 1) / (len(rows) + 1), habit.name)
+
+    time_ids = timeline.habit_ids_of_type('time')
+    monthly = compute_series(timeline, time_ids, start, end, 'month', ['sum'])
+    review["productivity"] = {
+        "total_minutes": float(np.nansum(data['rollup'].productivity_minutes[first:last])),
+        "monthly_minutes": [
+            sum(monthly["series"][habit_id]["sum"][i] for habit_id in time_ids)
+            for i in range(len(monthly["buckets"]))
+        ]
+    }
+    review["perfect_days"] = int(data['rollup'].perfect_day[first:last].sum())
+    return review
+
+
+def _correlation_sweep(data: Dict[str, Any], params: Dict[str, Any], report: Progress) -> Dict[str, Any]:
+    timeline = data['timeline']
+    if timeline.num_days == 0:
+        return {"habits": [], "same_day": {}, "next_day": {}}
+    return habit_correlations(
+        timeline, _habit_param(params, timeline),
+        _date_param(params, 'from', timeline.start), _date_param(params, 'to', timeline.end),
+        int(params.get('min_days', 7))
+    )
+
+
+def _year_comparison(data: Dict[str, Any], params: Dict[str, Any], report: Progress) -> Dict[str, Any]:
+    timeline = data['timeline']
+    if timeline.num_days == 0:
+        return {"granularity": "year", "buckets": [], "series": {}}
+    return compute_series(timeline, _habit_param(params, timeline), timeline.start, timeline.end,
+                          'year', ['sum', 'completed', 'completion_rate'])
+
+
+# kind -> function(merged data, params, report(progress, message)) returning a JSON-able result
+JOB_KINDS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any], Progress], Dict[str, Any]]] = {
+    'year_review': _year_review,
+    'correlations': _correlation_sweep,
+    'year_comparison': _year_comparison,
+}
+
+
+class Job:
+    """One submitted analysis and its state"""
+
+    def __init__(self, kind: str, params: Dict[str, Any], dataset: str, version: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.dataset = dataset
+        self.version = version
+        self.status = 'queued'  # queued, running, done, failed
+        self.progress = 0.0
+        self.message: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        job = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "dataset": self.dataset,
+            "version": self.version,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+        if include_result:
+            job["result"] = self.result
+        return job
+
+
+class JobManager:
+    """Runs analyses on a small worker pool.
+
+    Jobs are keyed by (dataset, kind, params, dataset version): submitting
+    the same analysis again while the data is unchanged returns the queued,
+    running or finished job instead of starting another one. At most
+    JOB_MAX_RESULTS finished jobs are kept, oldest dropped first.
+    """
+
+    def __init__(self):
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._by_key: Dict[tuple, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(settings.JOB_WORKERS, 1),
+                                                    thread_name_prefix="analysis-job")
+            return self._executor
+
+    @staticmethod
+    def _key(dataset: str, kind: str, params: Dict[str, Any], version: str) -> tuple:
+        return (dataset, kind, json.dumps(params, sort_keys=True, default=str), version)
+
+    def submit(self, kind: str, params: Dict[str, Any], dataset: str) -> Tuple[Job, bool]:
+        """Queue a job, or return the matching one for the current data version (second value True)"""
+        if kind not in JOB_KINDS:
+            raise KeyError(kind)
+        # Keyed by the files' signatures, so a cold dataset is parsed by the worker, not the request
+        excel_service = registry.get(dataset).excel_service
+        version = excel_service.data_version(excel_service.find_excel_files())
+        key = self._key(dataset, kind, params, version)
+
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None and existing.status != 'failed':
+                self._jobs.move_to_end(existing.id)
+                return existing, True
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= settings.JOB_MAX_PENDING:
+                raise JobQueueFull()
+            job = Job(kind, params, dataset, version)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._prune()
+
+        self._pool().submit(self._run, job)
+        return job, False
+
+    def _run(self, job: Job):
+        job.status = 'running'
+
+        def report(progress: float, message: Optional[str] = None):
+            job.progress = min(max(progress, 0.0), 1.0)
+            job.message = message
+
+        try:
+            excel_service = registry.get(job.dataset).excel_service
+            data = excel_service.load_data(excel_service.find_excel_files())
+            if data['version'] != job.version:
+                # The workbooks changed while queued; the result describes the newer data
+                job.version = data['version']
+                with self._lock:
+                    self._by_key.setdefault(self._key(job.dataset, job.kind, job.params, job.version), job)
+            job.result = JOB_KINDS[job.kind](data, job.params, report)
+            job.progress = 1.0
+            job.message = None
+            job.status = 'done'
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond JOB_MAX_RESULTS (call with the lock held)"""
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(len(finished) - settings.JOB_MAX_RESULTS, 0)]:
+            del self._jobs[job.id]
+            for key in [k for k, v in self._by_key.items() if v is job]:
+                del self._by_key[key]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, dataset: Optional[str] = None) -> List[Job]:
+        """Known jobs, oldest first, optionally only those of one dataset"""
+        with self._lock:
+            return [job for job in self._jobs.values() if dataset is None or job.dataset == dataset]
+
+    def clear(self):
+        """Forget every job; jobs still running finish but are no longer listed"""
+        with self._lock:
+            self._jobs.clear()
+            self._by_key.clear()
+
+
+jobs = JobManager()
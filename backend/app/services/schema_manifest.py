@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+
+class SchemaManifest:
+    """Compiled column schemas per workbook and sheet.
+
+    The first successful parse of a sheet records each habit column's type
+    and category plus the date format that worked. Later parses reuse it as
+    long as the sheet's header row is unchanged, so type inference only runs
+    for new or previously empty columns.
+    """
+
+    # Bump when the inference rules change so old manifests are recompiled
+    FORMAT_VERSION = 1
+
+    def __init__(self, manifest_path: Optional[str] = None):
+        # Kept next to the workbooks it describes unless a path is given
+        self.manifest_path = Path(manifest_path or Path(settings.EXCEL_DATA_PATH) / "schema_manifest.json")
+        self.manifest_path.parent.mkdir(exist_ok=True)
+
+        self._workbooks: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def header_hash(header: List[Any]) -> str:
+        return hashlib.sha1(json.dumps([str(col) for col in header]).encode('utf-8')).hexdigest()[:16]
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._workbooks is None:
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('format_version') != self.FORMAT_VERSION:
+                    raise ValueError("outdated manifest format")
+                self._workbooks = data.get('workbooks', {})
+            except (OSError, ValueError) as e:
+                if self.manifest_path.exists():
+                    print(f"Ignoring schema manifest: {e}")
+                self._workbooks = {}
+        return self._workbooks
+
+    def get(self, workbook: Path, sheet: str, header: List[Any]) -> Optional[Dict[str, Any]]:
+        """Compiled schema of a sheet, or None if missing or the header row changed"""
+        with self._lock:
+            schema = self._load().get(str(workbook), {}).get(sheet)
+        if schema and schema['header_hash'] == self.header_hash(header):
+            return schema
+        return None
+
+    def put(self, workbook: Path, sheet: str, header: List[Any], date_format: Optional[str],
+            columns: Dict[str, Dict[str, str]]):
+        """Record a sheet's compiled schema (written on the next save())"""
+        schema = {
+            'header_hash': self.header_hash(header),
+            'date_format': date_format,
+            'columns': columns
+        }
+        with self._lock:
+            sheets = self._load().setdefault(str(workbook), {})
+            if sheets.get(sheet) != schema:
+                sheets[sheet] = schema
+                self._dirty = True
+
+    def save(self):
+        """Write the manifest if it changed, dropping workbooks that no longer exist"""
+        with self._lock:
+            if not self._dirty:
+                return
+            workbooks = self._load()
+            for workbook in [w for w in workbooks if not Path(w).exists()]:
+                del workbooks[workbook]
+
+            data = {'format_version': self.FORMAT_VERSION, 'workbooks': workbooks}
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.manifest_path.parent, prefix=f".{self.manifest_path.name}.", suffix='.tmp'
+            )
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.manifest_path)
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+            self._dirty = False
@@ -0,0 +1,192 @@
+import base64
+import numpy as np
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.timeline import HabitTimeline
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+# metric -> description, used in the /series error message
+SERIES_METRICS = {
+    'sum': 'sum of numeric values',
+    'avg': 'mean of numeric values',
+    'daily_avg': 'sum of numeric values per calendar day',
+    'completed': 'completed entries',
+    'entries': 'entries logged',
+    'completion_rate': 'completed days as a percentage of calendar days',
+}
+
+MAX_BUCKETS = 5000
+
+
+def _bucket_starts(start: date, end: date, granularity: str) -> np.ndarray:
+    """First day (datetime64[D]) of each bucket from `start` to `end`; the first bucket starts at `start`"""
+    first, last = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+    if granularity == 'day':
+        return np.arange(first, last + 1)
+    if granularity == 'week':
+        # Day 0 of the epoch (1970-01-01) is a Thursday; weeks start on Monday
+        boundaries = np.arange(first + (7 - (first.astype(np.int64) + 3) % 7), last + 1, 7)
+    else:
+        unit = 'datetime64[M]' if granularity == 'month' else 'datetime64[Y]'
+        boundaries = np.arange(first.astype(unit) + 1, last.astype(unit) + 1).astype('datetime64[D]')
+    return np.concatenate([np.array([first]), boundaries])
+
+
+def bucket_bounds(start: date, end: date, granularity: str,
+                  max_points: Optional[int] = None) -> Tuple[List[Tuple[date, date]], int]:
+    """Inclusive (first, last) day of each bucket, and how many buckets were joined into each.
+
+    The first and last buckets are clipped to the range. With `max_points`,
+    runs of consecutive buckets are joined so at most that many remain;
+    MAX_BUCKETS applies to the joined buckets.
+    """
+    starts = _bucket_starts(start, end, granularity)
+    size = max(-(-len(starts) // max_points), 1) if max_points else 1
+    starts = starts[::size]
+    if len(starts) > MAX_BUCKETS:
+        raise ValueError(f"More than {MAX_BUCKETS} buckets, use a coarser granularity, a shorter range or max_points")
+    lasts = np.append(starts[1:] - 1, np.datetime64(end, 'D'))
+    return list(zip(starts.tolist(), lasts.tolist())), size
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), np.nan)
+
+
+def compute_series(timeline: HabitTimeline, habit_ids: List[str], start: date, end: date,
+                   granularity: str, metrics: List[str], max_points: Optional[int] = None) -> Dict[str, Any]:
+    """Aggregate habits into date buckets from the timeline's prefix sums, O(1) per bucket and habit.
+
+    With `max_points`, consecutive buckets are joined until that many remain.
+    Every metric is still computed exactly over the joined ranges, and all
+    habits share the same points.
+    """
+    buckets, bucket_size = bucket_bounds(start, end, granularity, max_points)
+    prefix = timeline.prefix_sums()
+    rows = timeline.rows(habit_ids)
+
+    starts = np.array([timeline.day_index(first) for first, _ in buckets], dtype=np.int64)
+    ends = np.array([timeline.day_index(last) + 1 for _, last in buckets], dtype=np.int64)
+    days = (ends - starts).astype(float)
+
+    totals = {}
+
+    def total(name: str) -> np.ndarray:
+        if name not in totals:
+            totals[name] = prefix.range_totals(name, rows, starts, ends)
+        return totals[name]
+
+    computed = {}
+    for metric in metrics:
+        if metric == 'sum':
+            computed[metric] = total('value')
+        elif metric == 'avg':
+            computed[metric] = _ratio(total('value'), total('numeric'))
+        elif metric == 'daily_avg':
+            computed[metric] = total('value') / days
+        elif metric == 'completed':
+            computed[metric] = total('completed')
+        elif metric == 'entries':
+            computed[metric] = total('present')
+        elif metric == 'completion_rate':
+            computed[metric] = total('completed') / days * 100
+
+    series = {}
+    for i, habit_id in enumerate(habit_ids):
+        series[habit_id] = {
+            metric: [None if np.isnan(v) else v for v in values[i].astype(float).tolist()]
+            for metric, values in computed.items()
+        }
+
+    return {
+        "granularity": granularity,
+        "bucket_size": bucket_size,
+        "from": str(start),
+        "to": str(end),
+        "buckets": [
+            {"start": str(first), "end": str(last), "days": (last - first).days + 1}
+            for first, last in buckets
+        ],
+        "series": series
+    }
+
+
+def percent_change(current: float, previous: float) -> float:
+    """Change in percent; 100 when growing from zero"""
+    if previous == 0:
+        return 0 if current == 0 else 100
+    return ((current - previous) / previous) * 100
+
+
+def window_kpis(daily: np.ndarray, anchor: int, windows: List[int],
+                last_year_anchor: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+    """Avg, max and total of `daily` for each window ending at `anchor`, its preceding window
+    and optionally the same window ending at `last_year_anchor`.
+
+    Totals come from one cumulative sum over the day axis; days outside the
+    array count as zero, so averages are always per calendar day of the window.
+    """
+    cumulative = np.concatenate([[0.0], np.cumsum(daily)])
+    num_days = len(daily)
+
+    def stats(end: int, days: int) -> Dict[str, float]:
+        first = min(max(end - days + 1, 0), num_days)
+        last = min(max(end + 1, 0), num_days)
+        total = float(cumulative[last] - cumulative[first])
+        return {
+            "avg": total / days,
+            "max": float(daily[first:last].max()) if last > first else 0.0,
+            "total": total
+        }
+
+    def changes(current: Dict[str, float], other: Dict[str, float]) -> Dict[str, float]:
+        return {key: float(percent_change(current[key], other[key])) for key in current}
+
+    results = {}
+    for days in windows:
+        current = stats(anchor, days)
+        previous = stats(anchor - days, days)
+        result = {
+            "current": current,
+            "previous": previous,
+            "change": changes(current, previous)
+        }
+        if last_year_anchor is not None:
+            last_year = stats(last_year_anchor, days)
+            result["last_year"] = last_year
+            result["change_vs_last_year"] = changes(current, last_year)
+        results[days] = result
+    return results
+
+
+def packed_bitsets(timeline: HabitTimeline, habit_ids: List[str], start: date, days: int) -> Dict[str, Dict[str, Any]]:
+    """Per-habit completion and logged-day bitsets for `days` days from `start`.
+
+    Bit i (little-endian within each byte) is day start + i; days outside the
+    timeline are 0. Bitsets are base64 encoded.
+    """
+    rows = timeline.rows(habit_ids)
+    completed = np.zeros((len(rows), days), dtype=bool)
+    logged = np.zeros((len(rows), days), dtype=bool)
+
+    if timeline.num_days:
+        first = timeline.day_index(start)
+        source_start, source_end = max(first, 0), min(first + days, timeline.num_days)
+        if source_start < source_end:
+            target = slice(source_start - first, source_end - first)
+            completed[:, target] = timeline.completed[rows, source_start:source_end]
+            logged[:, target] = timeline.present[rows, source_start:source_end]
+
+    packed_completed = np.packbits(completed, axis=1, bitorder='little')
+    packed_logged = np.packbits(logged, axis=1, bitorder='little')
+    counts = completed.sum(axis=1)
+    return {
+        habit_id: {
+            "completed": base64.b64encode(packed_completed[i].tobytes()).decode('ascii'),
+            "logged": base64.b64encode(packed_logged[i].tobytes()).decode('ascii'),
+            "completed_days": int(counts[i])
+        }
+        for i, habit_id in enumerate(habit_ids)
+    }
@@ -0,0 +1,520 @@
+import sys
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.models.habit import Habit, HabitEntry
+
+
+def parse_numeric(value: Any) -> float:
+    """Convert an entry value to float, NaN when it is not a number"""
+    if value is None or value in ['NA', 'na', 'nan', 'NaN', '']:
+        return np.nan
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+# sorted_values() key of the daily total of all time habits
+PRODUCTIVITY_KEY = 'productivity'
+
+
+def _nbytes(value: Any) -> int:
+    """Rough size of a cached value: arrays, containers of them, or plain objects"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(k) + _nbytes(v) for k, v in list(value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return sum(_nbytes(v) for v in list(value))
+    return sys.getsizeof(value)
+
+
+def _array_bytes(obj: Any) -> int:
+    """Bytes held by the numpy arrays stored as attributes of `obj`"""
+    return sum(value.nbytes for value in vars(obj).values() if isinstance(value, np.ndarray))
+
+
+def _stable_delete(sorted_values: np.ndarray, removed: np.ndarray) -> np.ndarray:
+    """Remove one occurrence of each value in `removed` from a sorted array"""
+    removed = np.sort(removed)
+    # Repeated values map to consecutive positions
+    positions = np.searchsorted(sorted_values, removed) + np.arange(len(removed)) - np.searchsorted(removed, removed)
+    return np.delete(sorted_values, positions)
+
+
+class HabitTimeline:
+    """Columnar, date-indexed view of merged habit entries.
+
+    Row ``i`` of every matrix belongs to ``habit_ids[i]`` and column ``d``
+    to the day ``start + d``, so the whole history is one contiguous day
+    axis no matter how many workbooks it came from.
+    """
+
+    # Results of client-parameterized queries kept by cached_query()
+    QUERY_CACHE_SIZE = 32
+
+    def __init__(self, habits: List[Habit], entries: List[HabitEntry]):
+        self.habits = habits
+        self.habit_ids = [h.id for h in habits]
+        self.habit_index = {habit_id: i for i, habit_id in enumerate(self.habit_ids)}
+
+        dates = [e.date for e in entries if e.habit_id in self.habit_index]
+        self.start: Optional[date] = min(dates) if dates else None
+        self.end: Optional[date] = max(dates) if dates else None
+        self.num_days = (self.end - self.start).days + 1 if dates else 0
+
+        shape = (len(habits), self.num_days)
+        self.present = np.zeros(shape, dtype=bool)     # an entry exists for that day
+        self.completed = np.zeros(shape, dtype=bool)   # entry.completed
+        self.values = np.full(shape, np.nan)           # numeric entry value
+        self.raw = np.full(shape, None, dtype=object)  # entry.value as stored
+
+        # Per-habit sorted day ordinals, built on first use (see habit_days)
+        self._day_index: Dict[tuple, np.ndarray] = {}
+        self._prefix_sums: Optional['PrefixSums'] = None
+        self._streak_index: Dict[str, 'StreakIndex'] = {}
+        self._cache: Dict[tuple, Any] = {}
+        self._query_cache: 'OrderedDict[tuple, Tuple[Any, int]]' = OrderedDict()  # key -> (result, bytes)
+        self._query_lock = threading.Lock()
+        self._sorted_values: Dict[str, np.ndarray] = {}
+        # Size of everything above, added as entries are stored so memory_bytes() is O(1)
+        self._cache_bytes = 0
+
+        start_ordinal = self.start.toordinal() if self.start else 0
+        for entry in entries:
+            row = self.habit_index.get(entry.habit_id)
+            if row is None:
+                continue
+            day = entry.date.toordinal() - start_ordinal
+            self.present[row, day] = True
+            self.completed[row, day] = entry.completed
+            self.values[row, day] = parse_numeric(entry.value)
+            self.raw[row, day] = entry.value
+
+    def day_index(self, day: date) -> int:
+        """Column of `day` (may be outside 0..num_days-1)"""
+        return day.toordinal() - self.start.toordinal()
+
+    def date_at(self, index: int) -> date:
+        return self.start + timedelta(days=index)
+
+    def dates(self) -> List[date]:
+        return [self.date_at(i) for i in range(self.num_days)]
+
+    def habit_ids_of_type(self, *habit_types: str) -> List[str]:
+        return [h.id for h in self.habits if h.habit_type in habit_types]
+
+    def rows(self, habit_ids: List[str]) -> List[int]:
+        return [self.habit_index[habit_id] for habit_id in habit_ids if habit_id in self.habit_index]
+
+    def habit_days(self, habit_id: str, completed: Optional[bool] = None) -> np.ndarray:
+        """Sorted day ordinals on which a habit has an entry (optionally only (not) completed ones).
+
+        Meant for binary search with np.searchsorted, so a date-range lookup
+        costs O(log n + k).
+        """
+        key = (habit_id, completed)
+        days = self._day_index.get(key)
+        if days is None:
+            row = self.habit_index[habit_id]
+            mask = self.present[row]
+            if completed is not None:
+                mask = mask & (self.completed[row] == completed)
+            days = np.flatnonzero(mask) + (self.start.toordinal() if self.start else 0)
+            self._day_index[key] = days
+            self._cache_bytes += days.nbytes
+        return days
+
+    def prefix_sums(self) -> 'PrefixSums':
+        """Cumulative per-habit totals over the day axis, built on first use"""
+        if self._prefix_sums is None:
+            self._prefix_sums = PrefixSums(self)
+            self._cache_bytes += self._prefix_sums.memory_bytes()
+        return self._prefix_sums
+
+    def streak_index(self, habit_id: str) -> 'StreakIndex':
+        """Run-length streak index of a habit, built on first use"""
+        index = self._streak_index.get(habit_id)
+        if index is None:
+            days = self.habit_days(habit_id)
+            flags = self.completed[self.habit_index[habit_id], days - self.start.toordinal()] if len(days) else np.zeros(0, dtype=bool)
+            index = StreakIndex(days, flags)
+            self._streak_index[habit_id] = index
+            self._cache_bytes += index.memory_bytes()
+        return index
+
+    def cached(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """Memoize a derived result for the lifetime of this timeline (i.e. one dataset version)"""
+        if key not in self._cache:
+            result = compute()
+            # Sized once when stored; a result computed twice by racing requests counts once
+            if self._cache.setdefault(key, result) is result:
+                self._cache_bytes += _nbytes(key) + _nbytes(result)
+        return self._cache[key]
+
+    def cached_query(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """Like cached(), but keeps only the QUERY_CACHE_SIZE most recently used results.
+
+        For keys built from request parameters, which would otherwise grow the
+        cache without bound.
+        """
+        with self._query_lock:
+            if key in self._query_cache:
+                self._query_cache.move_to_end(key)
+                return self._query_cache[key][0]
+        result = compute()
+        size = _nbytes(key) + _nbytes(result)
+        with self._query_lock:
+            previous = self._query_cache.pop(key, None)
+            self._query_cache[key] = (result, size)
+            self._cache_bytes += size - (previous[1] if previous else 0)
+            while len(self._query_cache) > self.QUERY_CACHE_SIZE:
+                _, (_, evicted) = self._query_cache.popitem(last=False)
+                self._cache_bytes -= evicted
+        return result
+
+    def day_numbers(self, unit: str) -> np.ndarray:
+        """Bucket number of every day: 'week' (Monday-based) or 'month' (months since 1970)"""
+        def compute():
+            days = np.datetime64(self.start, 'D') + np.arange(self.num_days) if self.num_days else np.array([], dtype='datetime64[D]')
+            if unit == 'week':
+                # Day 0 of the epoch (1970-01-01) is a Thursday
+                return (days.astype(np.int64) + 3) // 7
+            return days.astype('datetime64[M]').astype(np.int64)
+        return self.cached(('day_numbers', unit), compute)
+
+    def day_values(self, key: str) -> np.ndarray:
+        """Numeric value per day of a habit (NaN when missing), or daily time-habit minutes for PRODUCTIVITY_KEY"""
+        if key == PRODUCTIVITY_KEY:
+            return self.cached(('day_values', key), lambda: np.nansum(
+                self.values[self.rows(self.habit_ids_of_type('time'))], axis=0))
+        return self.values[self.habit_index[key]]
+
+    def sorted_values(self, key: str) -> np.ndarray:
+        """Sorted non-missing day_values(key), built on first use or carried over from the previous version"""
+        values = self._sorted_values.get(key)
+        if values is None:
+            values = np.sort(self.day_values(key))
+            values = values[~np.isnan(values)]
+            self._sorted_values[key] = values
+            self._cache_bytes += values.nbytes
+        return values
+
+    def carry_over(self, previous: 'HabitTimeline'):
+        """Update the previous version's sorted values with the days that changed instead of re-sorting.
+
+        Appending today's entries only touches the last days, so this costs a
+        comparison and a merge rather than a full sort. Skipped when days were
+        removed from either end.
+        """
+        if not previous.num_days or not self.num_days:
+            return
+        offset = previous.start.toordinal() - self.start.toordinal()
+        if offset < 0 or offset + previous.num_days > self.num_days:
+            return
+
+        for key, old_sorted in list(previous._sorted_values.items()):
+            if key != PRODUCTIVITY_KEY and key not in self.habit_index:
+                continue
+            old = np.full(self.num_days, np.nan)
+            old[offset:offset + previous.num_days] = previous.day_values(key)
+            new = self.day_values(key)
+            changed = ~((old == new) | (np.isnan(old) & np.isnan(new)))
+            removed = old[changed]
+            added = np.sort(new[changed])
+            updated = _stable_delete(old_sorted, removed[~np.isnan(removed)])
+            added = added[~np.isnan(added)]
+            self._sorted_values[key] = np.insert(updated, np.searchsorted(updated, added), added)
+            self._cache_bytes += self._sorted_values[key].nbytes
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the matrices plus every cache built on them so far.
+
+        Cache entries are sized once when stored, so this doesn't walk them.
+        """
+        return _array_bytes(self) + self._cache_bytes
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "start": str(self.start) if self.start else None,
+            "end": str(self.end) if self.end else None,
+            "days": self.num_days,
+            "habits": len(self.habit_ids),
+            "entries": int(self.present.sum())
+        }
+
+
+class StreakIndex:
+    """Runs of consecutive completed entries of one habit, as day ordinals.
+
+    Like calculate_streaks, a streak counts logged entries: days without an
+    entry don't break it, an entry that isn't completed does (except on the
+    as-of day itself, which may not be filled in yet).
+    """
+
+    def __init__(self, days: np.ndarray, completed: np.ndarray):
+        self.completed_days = days[completed]
+        break_days = days[~completed]
+
+        # Completed entries with the same number of breaks before them form one run
+        run_ids = np.cumsum(~completed)[completed]
+        self.run_first = np.flatnonzero(np.diff(run_ids, prepend=-1))
+        run_last = np.append(self.run_first[1:], len(run_ids))[:len(self.run_first)] - 1
+        self.run_start = self.completed_days[self.run_first]
+        self.run_end = self.completed_days[run_last]
+        self.run_length = run_last - self.run_first + 1
+
+        # First break after each run (int64 max when none follows)
+        padded_breaks = np.append(break_days, np.iinfo(np.int64).max)
+        self.break_after = padded_breaks[np.searchsorted(break_days, self.run_end)]
+        # Longest run before each run
+        self.best_before = np.concatenate([[0], np.maximum.accumulate(self.run_length)[:-1]])
+
+    def as_of(self, day: date) -> Dict[str, Any]:
+        """Current streak, best streak and completion on `day`, using only entries up to that day"""
+        ordinal = day.toordinal()
+        run = int(np.searchsorted(self.run_start, ordinal, side='right')) - 1
+        if run < 0:
+            return {'current_streak': 0, 'best_streak': 0, 'completed_today': False}
+
+        # Completed entries of this run up to the as-of day
+        in_run = int(np.searchsorted(self.completed_days, ordinal, side='right')) - int(self.run_first[run])
+        current = in_run if self.break_after[run] >= ordinal else 0
+        position = int(np.searchsorted(self.completed_days, ordinal))
+        completed_today = position < len(self.completed_days) and int(self.completed_days[position]) == ordinal
+        return {
+            'current_streak': current,
+            'best_streak': max(int(self.best_before[run]), in_run),
+            'completed_today': bool(completed_today)
+        }
+
+    def memory_bytes(self) -> int:
+        return _array_bytes(self)
+
+
+class PrefixSums:
+    """Per-habit cumulative sums with a leading zero column.
+
+    The total of days ``start..end-1`` is ``sums[:, end] - sums[:, start]``,
+    so any range costs two lookups however long it is.
+    """
+
+    def __init__(self, timeline: HabitTimeline):
+        self.num_days = timeline.num_days
+        numeric = ~np.isnan(timeline.values)
+        self.value = self._cumulative(np.where(numeric, timeline.values, 0.0))
+        self.numeric = self._cumulative(numeric)
+        self.completed = self._cumulative(timeline.completed)
+        self.present = self._cumulative(timeline.present)
+
+    @staticmethod
+    def _cumulative(matrix: np.ndarray) -> np.ndarray:
+        sums = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=float if matrix.dtype.kind == 'f' else np.int64)
+        np.cumsum(matrix, axis=1, out=sums[:, 1:])
+        return sums
+
+    def memory_bytes(self) -> int:
+        return _array_bytes(self)
+
+    def range_totals(self, name: str, rows: List[int], starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Totals of `name` for each habit row and each [start, end) column range, shape (rows, ranges)"""
+        sums = getattr(self, name)
+        starts = np.clip(starts, 0, self.num_days)
+        ends = np.clip(ends, 0, self.num_days)
+        # Only the needed cells are read, however long the history is
+        return sums[np.ix_(rows, ends)] - sums[np.ix_(rows, starts)]
+
+
+class WeekdaySums:
+    """Per-habit cumulative sums for each weekday separately.
+
+    The day axis is padded to whole Monday-to-Sunday weeks and summed down
+    the weeks, so the totals of every weekday over any day range cost two
+    lookups per weekday, like PrefixSums.
+    """
+
+    def __init__(self, timeline: HabitTimeline):
+        self.num_days = timeline.num_days
+        self.lead = timeline.start.weekday() if timeline.start else 0
+        self.present = self._cumulative(timeline.present)
+        self.completed = self._cumulative(timeline.completed)
+
+    def _cumulative(self, matrix: np.ndarray) -> np.ndarray:
+        weeks = -(-(self.lead + self.num_days) // 7)
+        padded = np.zeros((matrix.shape[0], weeks * 7), dtype=np.int64)
+        padded[:, self.lead:self.lead + self.num_days] = matrix
+        sums = np.zeros((matrix.shape[0], weeks + 1, 7), dtype=np.int64)
+        np.cumsum(padded.reshape(matrix.shape[0], weeks, 7), axis=1, out=sums[:, 1:])
+        return sums
+
+    def memory_bytes(self) -> int:
+        return _array_bytes(self)
+
+    def _week_bounds(self, start: int, end: int):
+        """First and past-the-end week of each weekday within days [start, end)"""
+        weekdays = np.arange(7)
+        start = min(max(start, 0), self.num_days) + self.lead
+        end = min(max(end, 0), self.num_days) + self.lead
+        return (start - weekdays + 6) // 7, (end - weekdays + 6) // 7
+
+    def day_counts(self, start: int, end: int) -> np.ndarray:
+        """Number of days of each weekday (Monday first) within days [start, end)"""
+        first, last = self._week_bounds(start, end)
+        return last - first
+
+    def range_totals(self, name: str, rows: List[int], start: int, end: int) -> np.ndarray:
+        """Totals of `name` per habit row and weekday (Monday first) over days [start, end), shape (rows, 7)"""
+        first, last = self._week_bounds(start, end)
+        sums = getattr(self, name)
+        # Two cells per row and weekday are read, however long the history is
+        rows = np.asarray(rows, dtype=np.intp)[:, None]
+        weekdays = np.arange(7)[None, :]
+        return sums[rows, last[None, :], weekdays] - sums[rows, first[None, :], weekdays]
+
+
+class DailyRollup:
+    """Per-day totals of a timeline, computed once when the dataset is merged"""
+
+    TRACKABLE_TYPES = ('binary', 'time', 'grade')
+
+    def __init__(self, timeline: HabitTimeline):
+        self.timeline = timeline
+        trackable_rows = timeline.rows(timeline.habit_ids_of_type(*self.TRACKABLE_TYPES))
+        time_rows = timeline.rows(timeline.habit_ids_of_type('time'))
+        grade_rows = [timeline.habit_index[h] for h in timeline.habit_ids if 'workout_grade' in h]
+
+        self.trackable_count = np.full(timeline.num_days, len(trackable_rows), dtype=int)
+        self.completed_count = timeline.completed[trackable_rows].sum(axis=0).astype(int)
+        self.productivity_minutes = np.nansum(timeline.values[time_rows], axis=0)
+        self.perfect_day = (self.completed_count == self.trackable_count) & (self.trackable_count > 0)
+        self.weekday_sums = WeekdaySums(timeline)
+
+        # Last workout_grade habit with an entry that day wins
+        self.workout_grade = np.full(timeline.num_days, None, dtype=object)
+        for row in grade_rows:
+            present = timeline.present[row]
+            self.workout_grade[present] = timeline.raw[row, present]
+
+    def memory_bytes(self) -> int:
+        return _array_bytes(self) + self.weekday_sums.memory_bytes()
+
+    def calendar(self, days: int) -> List[Dict[str, Any]]:
+        """The last `days` days up to the newest entry; days without data are zeros"""
+        timeline = self.timeline
+        if timeline.num_days == 0 or days <= 0:
+            return []
+
+        total_trackable = int(self.trackable_count[0])
+        first = timeline.num_days - days
+        calendar_data = []
+        for index in range(first, timeline.num_days):
+            if index < 0:
+                calendar_data.append({
+                    "date": str(timeline.date_at(index)),
+                    "completed_habits": 0,
+                    "total_habits": total_trackable,
+                    "productivity_minutes": 0,
+                    "perfect_day": False,
+                    "workout_grade": None
+                })
+                continue
+            calendar_data.append({
+                "date": str(timeline.date_at(index)),
+                "completed_habits": int(self.completed_count[index]),
+                "total_habits": int(self.trackable_count[index]),
+                "productivity_minutes": float(self.productivity_minutes[index]),
+                "perfect_day": bool(self.perfect_day[index]),
+                "workout_grade": self.workout_grade[index]
+            })
+        return calendar_data
+
+
+class TrendIndicators:
+    """Simple and exponentially weighted moving averages and trend slopes of daily values.
+
+    Rows are the timeline's habits followed by PRODUCTIVITY_KEY. A habit's
+    daily value is its minutes for time habits and 1/0 completion otherwise;
+    days without an entry count as 0. Built when a dataset version is merged:
+    the days that match the previous version are copied from it and only the
+    rest are run through the recurrences, so appending a day costs O(1) per
+    habit instead of a pass over all history.
+    """
+
+    WINDOWS = (7, 28)
+
+    def __init__(self, timeline: HabitTimeline, previous: Optional['TrendIndicators'] = None):
+        self.keys = timeline.habit_ids + [PRODUCTIVITY_KEY]
+        self.key_index = {key: i for i, key in enumerate(self.keys)}
+        self.start = timeline.start
+        self.num_days = timeline.num_days
+
+        time_rows = set(timeline.rows(timeline.habit_ids_of_type('time')))
+        self.daily = np.vstack([
+            np.nan_to_num(timeline.values[row], nan=0.0) if row in time_rows else timeline.completed[row].astype(float)
+            for row in range(len(timeline.habit_ids))
+        ] + [timeline.day_values(PRODUCTIVITY_KEY)]) if self.num_days else np.zeros((len(self.keys), 0))
+        self.reused_days = self._reusable_days(previous)
+
+        reuse = self.reused_days
+        days = np.arange(self.num_days, dtype=float)
+        self.cumulative = self._extend_cumulative(self.daily, previous.cumulative if reuse else None, reuse)
+        self.cumulative_weighted = self._extend_cumulative(
+            self.daily * days, previous.cumulative_weighted if reuse else None, reuse)
+
+        self.ewma: Dict[int, np.ndarray] = {}
+        for window in self.WINDOWS:
+            alpha = 2 / (window + 1)
+            ewma = np.empty_like(self.daily)
+            if reuse:
+                ewma[:, :reuse] = previous.ewma[window][:, :reuse]
+            for day in range(reuse, self.num_days):
+                ewma[:, day] = self.daily[:, day] if day == 0 else alpha * self.daily[:, day] + (1 - alpha) * ewma[:, day - 1]
+            self.ewma[window] = ewma
+
+    def memory_bytes(self) -> int:
+        return _array_bytes(self) + sum(ewma.nbytes for ewma in self.ewma.values())
+
+    def _reusable_days(self, previous: Optional['TrendIndicators']) -> int:
+        """Leading days whose values are unchanged since the previous version"""
+        if previous is None or previous.keys != self.keys or previous.start != self.start:
+            return 0
+        overlap = min(previous.num_days, self.num_days)
+        changed = np.flatnonzero((self.daily[:, :overlap] != previous.daily[:, :overlap]).any(axis=0))
+        return int(changed[0]) if len(changed) else overlap
+
+    @staticmethod
+    def _extend_cumulative(matrix: np.ndarray, previous: Optional[np.ndarray], reuse: int) -> np.ndarray:
+        sums = np.zeros((matrix.shape[0], matrix.shape[1] + 1))
+        if previous is not None:
+            sums[:, :reuse + 1] = previous[:, :reuse + 1]
+        sums[:, reuse + 1:] = sums[:, reuse:reuse + 1] + np.cumsum(matrix[:, reuse:], axis=1)
+        return sums
+
+    def sma(self, window: int, rows: List[int], days: np.ndarray) -> np.ndarray:
+        """Mean of the `window` days ending at each day (fewer at the start of the timeline), shape (rows, days)"""
+        first = np.maximum(days + 1 - window, 0)
+        return (self.cumulative[np.ix_(rows, days + 1)] - self.cumulative[np.ix_(rows, first)]) / (days + 1 - first)
+
+    def slope(self, window: int, rows: List[int], days: np.ndarray) -> np.ndarray:
+        """Least-squares slope (change per day) over the `window` days ending at each day"""
+        first = np.maximum(days + 1 - window, 0)
+        count = (days + 1 - first).astype(float)
+        sum_x = (first + days) * count / 2
+        sum_xx = (days * (days + 1) * (2 * days + 1) - (first - 1) * first * (2 * first - 1)) / 6
+        sum_y = self.cumulative[np.ix_(rows, days + 1)] - self.cumulative[np.ix_(rows, first)]
+        sum_xy = self.cumulative_weighted[np.ix_(rows, days + 1)] - self.cumulative_weighted[np.ix_(rows, first)]
+        denominator = count * sum_xx - sum_x ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominator > 0, (count * sum_xy - sum_x * sum_y) / np.where(denominator > 0, denominator, 1), 0.0)
+
+    def indicators(self, rows: List[int], days: np.ndarray) -> Dict[str, np.ndarray]:
+        """sma_<w>, ewma_<w> and slope_<w> of each row and day, each of shape (rows, days)"""
+        result = {}
+        for window in self.WINDOWS:
+            result[f"sma_{window}"] = self.sma(window, rows, days)
+            result[f"ewma_{window}"] = self.ewma[window][np.ix_(rows, days)]
+        result[f"slope_{self.WINDOWS[-1]}"] = self.slope(self.WINDOWS[-1], rows, days)
+        return result
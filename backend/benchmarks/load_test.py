@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the habit tracker backend
+Drives a locally started (or already running) app with the dashboard's
+request mix, or replays a recorded access log, and reports latency
+percentiles, throughput and errors per route plus server CPU and RSS
+
+Usage:
+    python benchmarks/load_test.py --users 4 --duration 30
+    python benchmarks/load_test.py --data-dir ./data --users 8
+    python benchmarks/load_test.py --url http://192.168.0.53:8000 --pid 1234
+    python benchmarks/load_test.py --replay access.log --users 4
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Requests the dashboard fires in parallel on page load (frontend/src)
+DASHBOARD_MIX = [
+    ("GET", "/api/habits/"),                                 # stores/habitStore.ts fetchHabits
+    ("GET", "/api/analytics/"),                              # stores/habitStore.ts fetchAnalytics
+    ("GET", "/api/analytics/productivity-chart"),            # components/Analytics.tsx
+    ("GET", "/api/analytics/productivity-chart-30days"),     # components/ActivityChart30Days.tsx
+    ("GET", "/api/analytics/productivity-metrics"),          # components/ActivityChart30Days.tsx
+    ("GET", "/api/analytics/productivity-metrics"),          # components/ProductivityKPIs.tsx
+    ("GET", "/api/analytics/selfcare-summary"),              # components/SelfcareBox.tsx
+    ("GET", "/api/analytics/recent-workouts"),               # components/ExerciseActivity.tsx
+]
+
+# Matches uvicorn access logs and common/combined log format request lines
+ACCESS_LOG_PATTERN = re.compile(r'"(GET|POST|PUT|PATCH|DELETE) (\S+) HTTP/[\d.]+"')
+
+Request = Tuple[str, str]
+
+
+class RouteStats:
+    """Latencies and errors collected for one route"""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors = 0
+        self.status_codes: Dict[int, int] = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, latency_ms: float, status: Optional[int]):
+        with self.lock:
+            self.latencies_ms.append(latency_ms)
+            if status is None or status >= 400:
+                self.errors += 1
+            self.status_codes[status or 0] += 1
+
+    def merge(self, other: 'RouteStats'):
+        self.latencies_ms.extend(other.latencies_ms)
+        self.errors += other.errors
+        for status, count in other.status_codes.items():
+            self.status_codes[status] += count
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        latencies = sorted(self.latencies_ms)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0,
+            "mean_ms": round(statistics.mean(latencies), 2) if count else 0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if count else 0,
+            "status_codes": dict(self.status_codes),
+        }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(rank, len(sorted_values)) - 1)]
+
+
+class ProcessMonitor:
+    """Poll CPU time and RSS of a process tree from /proc while the run is going"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.cpu_samples: List[float] = []
+        self.rss_samples_mb: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._clock_ticks = os.sysconf('SC_CLK_TCK')
+
+    def _tree(self) -> List[int]:
+        pids, pending = [], [self.pid]
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            try:
+                with open(f"/proc/{pid}/task/{pid}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                pass
+        return pids
+
+    def _read(self) -> Tuple[float, float]:
+        cpu_seconds, rss_kb = 0.0, 0
+        for pid in self._tree():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    # Fields after the command name; utime and stime are 14th and 15th overall
+                    fields = f.read().rsplit(')', 1)[1].split()
+                cpu_seconds += (int(fields[11]) + int(fields[12])) / self._clock_ticks
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            rss_kb += int(line.split()[1])
+                            break
+            except (OSError, IndexError, ValueError):
+                continue
+        return cpu_seconds, rss_kb / 1024
+
+    def _run(self):
+        last_cpu, _ = self._read()
+        last_time = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            cpu, rss_mb = self._read()
+            now = time.perf_counter()
+            self.cpu_samples.append((cpu - last_cpu) / (now - last_time) * 100)
+            self.rss_samples_mb.append(rss_mb)
+            last_cpu, last_time = cpu, now
+
+    def start(self):
+        if Path(f"/proc/{self.pid}").exists():
+            self._thread.start()
+        else:
+            print(f"⚠️  Cannot read /proc/{self.pid}, CPU and RSS will not be reported")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def summary(self) -> Dict[str, float]:
+        if not self.cpu_samples:
+            return {}
+        return {
+            "cpu_percent_mean": round(statistics.mean(self.cpu_samples), 1),
+            "cpu_percent_max": round(max(self.cpu_samples), 1),
+            "rss_mb_start": round(self.rss_samples_mb[0], 1),
+            "rss_mb_max": round(max(self.rss_samples_mb), 1),
+            "rss_mb_end": round(self.rss_samples_mb[-1], 1),
+        }
+
+
+class LoadClient:
+    """Keep-alive HTTP connection per worker thread"""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def request(self, method: str, path: str) -> Tuple[float, Optional[int]]:
+        started = time.perf_counter()
+        status = None
+        try:
+            conn = self._connection()
+            conn.request(method, path, headers={"Connection": "keep-alive"})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # Drop the broken connection, the next request reconnects
+            self._local.conn = None
+        return (time.perf_counter() - started) * 1000, status
+
+
+def route_key(method: str, path: str) -> str:
+    return f"{method} {path.split('?', 1)[0]}"
+
+
+def run_dashboard_mix(client: LoadClient, stats: Dict[str, RouteStats], users: int,
+                      duration: float, think_time: float):
+    """Each virtual user loads the dashboard (all requests in parallel) in a loop"""
+    deadline = time.perf_counter() + duration
+
+    def user_loop():
+        with ThreadPoolExecutor(max_workers=len(DASHBOARD_MIX)) as page:
+            while time.perf_counter() < deadline:
+                futures = [(method, path, page.submit(client.request, method, path))
+                           for method, path in DASHBOARD_MIX]
+                for method, path, future in futures:
+                    stats[route_key(method, path)].record(*future.result())
+                if think_time:
+                    time.sleep(think_time)
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        for future in [pool.submit(user_loop) for _ in range(users)]:
+            future.result()
+
+
+def load_access_log(path: Path, include_writes: bool) -> List[Request]:
+    requests = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = ACCESS_LOG_PATTERN.search(line)
+            if not match:
+                continue
+            method, target = match.groups()
+            if method != 'GET' and not include_writes:
+                continue
+            requests.append((method, target))
+    return requests
+
+
+def run_replay(client: LoadClient, stats: Dict[str, RouteStats], requests: List[Request], users: int):
+    """Replay recorded requests in order, `users` at a time"""
+    def send(request: Request):
+        method, path = request
+        stats[route_key(method, path)].record(*client.request(method, path))
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(send, requests))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(data_dir: Path, cwd: Path, workers: int, verbose: bool) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = dict(os.environ, EXCEL_DATA_PATH=str(data_dir), PYTHONPATH=str(BACKEND_DIR))
+    output = None if verbose else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=cwd, env=env, stdout=output, stderr=output
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Backend exited during startup (run with --verbose to see why)")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not become healthy within 30s")
+
+
+def print_report(report: Dict):
+    print(f"\n{'Route':<52} {'req':>6} {'err%':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    print("-" * 100)
+    for route, s in sorted(report["routes"].items()):
+        print(f"{route:<52} {s['requests']:>6} {s['error_rate'] * 100:>5.1f}% {s['throughput_rps']:>7.2f} "
+              f"{s['p50_ms']:>7.1f}ms {s['p95_ms']:>7.1f}ms {s['p99_ms']:>7.1f}ms")
+    total = report["total"]
+    print("-" * 100)
+    print(f"{'TOTAL':<52} {total['requests']:>6} {total['error_rate'] * 100:>5.1f}% {total['throughput_rps']:>7.2f} "
+          f"{total['p50_ms']:>7.1f}ms {total['p95_ms']:>7.1f}ms {total['p99_ms']:>7.1f}ms")
+
+    process = report.get("process")
+    if process:
+        print(f"\n🖥️  Server CPU: mean {process['cpu_percent_mean']}%, max {process['cpu_percent_max']}%")
+        print(f"🧠 Server RSS: {process['rss_mb_start']} MB -> max {process['rss_mb_max']} MB "
+              f"(end {process['rss_mb_end']} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend with the dashboard request mix")
+    target = parser.add_argument_group("target")
+    target.add_argument("--url", help="Use an already running backend instead of starting one")
+    target.add_argument("--pid", type=int, help="PID of the --url backend, for CPU/RSS monitoring")
+    target.add_argument("--data-dir", type=Path, help="Excel directory for the started backend "
+                                                      "(default: generate a synthetic workbook)")
+    target.add_argument("--server-workers", type=int, default=1, help="uvicorn workers for the started backend")
+    target.add_argument("--years", type=float, default=2, help="Synthetic workbook size")
+    target.add_argument("--habits", type=int, default=15, help="Synthetic workbook habit columns")
+
+    load = parser.add_argument_group("load")
+    load.add_argument("--users", type=int, default=4, help="Concurrent virtual users")
+    load.add_argument("--duration", type=float, default=20, help="Seconds to run the dashboard mix")
+    load.add_argument("--think-time", type=float, default=0, help="Seconds each user waits between page loads")
+    load.add_argument("--replay", type=Path, help="Replay the requests in this access log instead")
+    load.add_argument("--include-writes", action="store_true", help="Also replay non-GET requests")
+    load.add_argument("--timeout", type=float, default=60)
+
+    parser.add_argument("--output", type=Path, help="Save the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the started backend's output")
+    args = parser.parse_args()
+
+    process = None
+    work_dir = None
+    pid = args.pid
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            if args.data_dir:
+                data_dir, cwd = args.data_dir.resolve(), BACKEND_DIR
+            else:
+                from benchmarks.workbook_generator import generate_multi_sheet_workbook
+                work_dir = tempfile.TemporaryDirectory()
+                cwd = Path(work_dir.name)
+                data_dir = cwd / "data"
+                data_dir.mkdir()
+                generate_multi_sheet_workbook(data_dir / "synthetic.xlsx", years=args.years, habits=args.habits)
+                print(f"📄 Generated synthetic workbook ({args.years} years x {args.habits} habits)")
+            process, base_url = start_server(data_dir, cwd, args.server_workers, args.verbose)
+            pid = process.pid
+            print(f"🚀 Started backend at {base_url} (pid {pid})")
+
+        client = LoadClient(base_url, args.timeout)
+        stats: Dict[str, RouteStats] = defaultdict(RouteStats)
+        monitor = ProcessMonitor(pid) if pid else None
+
+        if monitor:
+            monitor.start()
+        started = time.perf_counter()
+        if args.replay:
+            requests = load_access_log(args.replay, args.include_writes)
+            print(f"🔁 Replaying {len(requests)} requests with {args.users} concurrent users...")
+            run_replay(client, stats, requests, args.users)
+        else:
+            print(f"📈 Running dashboard mix with {args.users} users for {args.duration}s...")
+            run_dashboard_mix(client, stats, args.users, args.duration, args.think_time)
+        elapsed = time.perf_counter() - started
+        if monitor:
+            monitor.stop()
+
+        total = RouteStats()
+        for route_stats in stats.values():
+            total.merge(route_stats)
+
+        report = {
+            "target": base_url,
+            "mode": "replay" if args.replay else "dashboard",
+            "users": args.users,
+            "elapsed_s": round(elapsed, 2),
+            "routes": {route: route_stats.summary(elapsed) for route, route_stats in stats.items()},
+            "total": total.summary(elapsed),
+            "process": monitor.summary() if monitor else {},
+        }
+        print_report(report)
+
+        if args.output:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"\n✅ Report saved to {args.output}")
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        if work_dir:
+            work_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
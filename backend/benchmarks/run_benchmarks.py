@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the habit tracker backend
+Times parsing, streaks and every analytics endpoint against synthetic
+workbooks and saves the results as JSON so runs can be compared
+
+Usage:
+    python benchmarks/run_benchmarks.py --years 3 --habits 30
+    python benchmarks/run_benchmarks.py --compare bench_results/old.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.workbook_generator import (  # noqa: E402
+    generate_multi_sheet_workbook,
+    generate_single_sheet_workbook,
+)
+
+GENERATORS = {
+    "single": generate_single_sheet_workbook,
+    "multi": generate_multi_sheet_workbook,
+}
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Time a first (cold cache) call, then `repeat` warm calls, then one more under tracemalloc for peak memory"""
+    started = time.perf_counter()
+    func()
+    first_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "first_ms": round(first_ms, 3),
+        "min_ms": round(min(timings), 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def analytics_endpoints(router) -> List[str]:
+    """All GET routes of a router that take no path parameters"""
+    paths = []
+    for route in router.routes:
+        if "GET" in getattr(route, "methods", set()) and "{" not in route.path:
+            paths.append(route.path)
+    return paths
+
+
+def run_scenario(fmt: str, data_dir: Path, args) -> Dict[str, Any]:
+    # Imported lazily so EXCEL_DATA_PATH is already pointing at the work dir
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.api import analytics
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    workbook = GENERATORS[fmt](
+        data_dir / f"synthetic_{fmt}.xlsx",
+        years=args.years, habits=args.habits, sparsity=args.sparsity, seed=args.seed
+    )
+
+    # Both routers share the default dataset's service
+    service = analytics.excel_service
+    service.data_path = data_dir
+    client = TestClient(app)
+    results = {}
+
+    # Warm-up parse creates habits_config.json so later parses are steady-state
+    parsed = service.parse_excel_file(workbook)
+
+    results["parse_excel_file"] = measure(lambda: service.parse_excel_file(workbook), args.repeat)
+    results["calculate_streaks"] = measure(
+        lambda: service.calculate_streaks(parsed['entries']), args.repeat
+    )
+    results["calculate_perfect_days_streak"] = measure(
+        lambda: analytics.calculate_perfect_days_streak(parsed['entries'], parsed['habits']), args.repeat
+    )
+
+    endpoints = ["/api/habits/"] + [f"/api/analytics{path}" for path in analytics_endpoints(analytics.router)]
+    for url in endpoints:
+        def call(url=url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}: {response.text[:200]}")
+        results[f"GET {url}"] = measure(call, args.repeat)
+
+    return {
+        "workbook": workbook.name,
+        "rows": len({e.date for e in parsed['entries']}),
+        "habits": len(parsed['habits']),
+        "entries": len(parsed['entries']),
+        "benchmarks": results,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], previous_path: Path):
+    """Print mean time change of each benchmark against a previous results file"""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)
+
+    print(f"\n📊 Comparison with {previous_path} ({previous['meta'].get('commit')})")
+    for fmt, scenario in current["scenarios"].items():
+        old_scenario = previous.get("scenarios", {}).get(fmt)
+        if not old_scenario:
+            continue
+        print(f"\n[{fmt}]")
+        for name, result in scenario["benchmarks"].items():
+            old = old_scenario["benchmarks"].get(name)
+            if not old:
+                print(f"  {name:<55} {result['mean_ms']:>10.2f} ms   (new)")
+                continue
+            ratio = result["mean_ms"] / old["mean_ms"] if old["mean_ms"] else float("inf")
+            print(f"  {name:<55} {old['mean_ms']:>10.2f} -> {result['mean_ms']:>10.2f} ms  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run backend benchmarks against synthetic workbooks")
+    parser.add_argument("--format", choices=["single", "multi", "both"], default="both")
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--habits", type=int, default=15, help="Number of binary habit columns")
+    parser.add_argument("--sparsity", type=float, default=0.1, help="Fraction of blank cells (0-1)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Results file (default: bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results file to compare with")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's debug output")
+    args = parser.parse_args()
+
+    output = args.output or BACKEND_DIR / "bench_results" / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output = output.resolve()
+    formats = ["single", "multi"] if args.format == "both" else [args.format]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app keeps its config under ./data, so run inside a scratch directory
+        os.chdir(work_dir)
+        os.environ["EXCEL_DATA_PATH"] = str(Path(work_dir) / "data")
+
+        scenarios = {}
+        for fmt in formats:
+            print(f"⏱️  Benchmarking {fmt}-sheet workbook "
+                  f"({args.years} years x {args.habits} habits, sparsity {args.sparsity})...")
+            data_dir = Path(work_dir) / "data" / fmt
+            quiet = open(os.devnull, "w") if not args.verbose else None
+            with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+                scenarios[fmt] = run_scenario(fmt, data_dir, args)
+            if quiet:
+                quiet.close()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "years": args.years, "habits": args.habits, "sparsity": args.sparsity,
+                "seed": args.seed, "repeat": args.repeat,
+            },
+        },
+        "scenarios": scenarios,
+    }
+
+    for fmt, scenario in scenarios.items():
+        print(f"\n[{fmt}] {scenario['rows']} days, {scenario['habits']} habits, {scenario['entries']} entries")
+        for name, result in scenario["benchmarks"].items():
+            print(f"  {name:<55} {result['first_ms']:>10.2f} ms first {result['mean_ms']:>10.2f} ms mean"
+                  f"  {result['peak_memory_kb']:>10.1f} KB peak")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Synthetic workbook generator for benchmarks
+Produces the 2025 single-sheet and 2026 core/habits/workouts formats
+at any scale (years x habits x sparsity)
+"""
+
+import argparse
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+TIME_COLUMNS = ['Tech + Praca', 'YouTube', 'Czytanie', 'Gitara', 'Inne']
+
+# Real habit names first so categories, emojis and forced types get exercised
+SINGLE_SHEET_HABITS = ['20min clean', 'YNAB', 'Anki', 'Pamiętnik', 'Gaming <1h', 'No porn', 'suplementy']
+MULTI_SHEET_HABITS = [
+    'digital_blockers', 'no_porn', 'limited_gaming', 'haircare', 'dermapen',
+    'laser_session', 'anki', 'nepali', 'cronometer', 'vegetables', 'suplementy'
+]
+
+SPORTS = ['siłownia', 'bieganie', 'stairmaster', 'rower', '-']
+ACCESSORY_CODES = ['Pu20', 'Cr30', 'Hs5', 'Mu3', 'Dp15', 'sauna', 'yoga']
+GRADES = ['A', 'B', 'C', 'D', 'E', 'F']
+
+
+def _date_range(years: float, end: Optional[date]) -> pd.DatetimeIndex:
+    end = end or date.today()
+    days = max(1, int(round(years * 365)))
+    return pd.date_range(end=pd.Timestamp(end), periods=days, freq='D')
+
+
+def _habit_names(base: list, count: int) -> list:
+    names = list(base[:count])
+    names.extend(f"habit_{i:02d}" for i in range(len(names), count))
+    return names
+
+
+def _sparsify(rng: np.random.Generator, values: np.ndarray, sparsity: float) -> np.ndarray:
+    """Blank out a `sparsity` fraction of cells"""
+    values = values.astype(object)
+    values[rng.random(len(values)) < sparsity] = None
+    return values
+
+
+def _time_columns(rng: np.random.Generator, n: int, sparsity: float) -> dict:
+    columns = {}
+    for col in TIME_COLUMNS:
+        minutes = rng.choice([0, 0, 10, 20, 30, 45, 60, 90, 120], size=n)
+        columns[col] = _sparsify(rng, minutes, sparsity)
+    return columns
+
+
+def _binary_columns(rng: np.random.Generator, names: list, n: int, sparsity: float) -> dict:
+    columns = {}
+    for name in names:
+        success_rate = rng.uniform(0.3, 0.9)
+        columns[name] = _sparsify(rng, (rng.random(n) < success_rate).astype(int), sparsity)
+    return columns
+
+
+def _accessories(rng: np.random.Generator, n: int) -> list:
+    values = []
+    for _ in range(n):
+        count = rng.integers(0, 3)
+        codes = rng.choice(ACCESSORY_CODES, size=count, replace=False)
+        values.append(' '.join(codes) if count else '-')
+    return values
+
+
+def generate_single_sheet_workbook(path: Path, years: float = 1, habits: int = 10,
+                                   sparsity: float = 0.1, seed: int = 0,
+                                   end: Optional[date] = None) -> Path:
+    """Write a 2025-style single-sheet workbook"""
+    rng = np.random.default_rng(seed)
+    dates = _date_range(years, end)
+    n = len(dates)
+
+    data = {'Data': dates, 'WEEKDAY': dates.strftime('%A').str.upper()}
+    data.update(_time_columns(rng, n, sparsity))
+    data['Razem'] = pd.DataFrame({c: data[c] for c in TIME_COLUMNS}).fillna(0).sum(axis=1)
+    data['Unnamed: 8'] = [None] * n
+    data.update(_binary_columns(rng, _habit_names(SINGLE_SHEET_HABITS, habits), n, sparsity))
+    data['sport'] = rng.choice(SPORTS, size=n)
+    data['accessories'] = _accessories(rng, n)
+
+    path = Path(path)
+    pd.DataFrame(data).to_excel(path, index=False)
+    return path
+
+
+def generate_multi_sheet_workbook(path: Path, years: float = 1, habits: int = 10,
+                                  sparsity: float = 0.1, seed: int = 0,
+                                  end: Optional[date] = None) -> Path:
+    """Write a 2026-style workbook with core, habits and workouts sheets"""
+    rng = np.random.default_rng(seed)
+    dates = _date_range(years, end)
+    n = len(dates)
+
+    core = {'Data': dates}
+    core.update(_time_columns(rng, n, sparsity))
+
+    habit_sheet = {'Data': dates}
+    habit_sheet.update(_binary_columns(rng, _habit_names(MULTI_SHEET_HABITS, habits), n, sparsity))
+
+    trained = rng.random(n) < 0.5
+    workouts = {
+        'Data': dates,
+        'activity': np.where(trained, rng.choice(SPORTS[:-1], size=n), None),
+        'time': np.where(trained, rng.choice([30, 45, 60, 90], size=n), None),
+        'workout_grade': np.where(trained, rng.choice(GRADES, size=n), None),
+        'avg_hr': np.where(trained, rng.integers(110, 160, size=n), None),
+        'sport': np.where(trained, rng.choice(SPORTS[:-1], size=n), '-'),
+        'accessories': _accessories(rng, n),
+    }
+
+    path = Path(path)
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame(core).to_excel(writer, sheet_name='core', index=False)
+        pd.DataFrame(habit_sheet).to_excel(writer, sheet_name='habits', index=False)
+        pd.DataFrame(workouts).to_excel(writer, sheet_name='workouts', index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic habit workbook")
+    parser.add_argument("output", type=Path, help="Path of the .xlsx file to write")
+    parser.add_argument("--format", choices=["single", "multi"], default="multi")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--habits", type=int, default=10, help="Number of binary habit columns")
+    parser.add_argument("--sparsity", type=float, default=0.1, help="Fraction of blank cells (0-1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate = generate_multi_sheet_workbook if args.format == "multi" else generate_single_sheet_workbook
+    path = generate(args.output, args.years, args.habits, args.sparsity, args.seed)
+    print(f"✅ Wrote {args.format}-sheet workbook: {path}")
+
+
+if __name__ == "__main__":
+    main()
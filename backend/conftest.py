@@ -5,7 +5,9 @@ from pathlib import Path
 from fastapi.testclient import TestClient
 from app.main import app
 from app.core.config import settings
+from app.services.dataset_registry import registry
 from app.services.excel_service import ExcelService
+from app.services.job_service import jobs
 import pandas as pd
 
 
@@ -68,4 +70,14 @@ def excel_service_with_test_data(temp_data_dir):
 @pytest.fixture(autouse=True)
 def override_settings(temp_data_dir, monkeypatch):
     """Override settings to use temporary directory for tests."""
-    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
\ No newline at end of file
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    """Start every test without datasets or jobs left by earlier tests."""
+    registry.clear()
+    jobs.clear()
+    yield
+    registry.clear()
+    jobs.clear()
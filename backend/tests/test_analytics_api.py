@@ -19,7 +19,7 @@ def test_analytics_endpoint_success(client, excel_file_with_data):
             MagicMock(habit_id="habit_2", completed=False)
         ]
         
-        mock_service.parse_excel_file.return_value = {
+        mock_service.load_data.return_value = {
             'habits': mock_habits,
             'entries': mock_entries
         }
@@ -186,4 +186,306 @@ def test_analytics_error_handling(client):
         response = client.get("/api/analytics/")
         
         assert response.status_code == 500
-        assert "Error loading analytics" in response.json()["detail"]
\ No newline at end of file
+        assert "Error loading analytics" in response.json()["detail"]
+
+def test_calendar_from_daily_rollup(client, excel_file_with_data, temp_data_dir, monkeypatch):
+    """Test calendar days come from the rollup, padded before the first entry."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+    response = client.get("/api/analytics/calendar?days=6")
+
+    assert response.status_code == 200
+    days = response.json()
+    assert [d["date"] for d in days] == ['2025-01-25', '2025-01-26', '2025-01-27',
+                                         '2025-01-28', '2025-01-29', '2025-01-30']
+    assert days[0]["completed_habits"] == 0 and days[0]["workout_grade"] is None
+    last = days[-1]
+    assert last["productivity_minutes"] == 45 + 20 + 25 + 25 + 10  # time habits of 2025-01-30
+    assert last["total_habits"] == days[2]["total_habits"] > 0
+    assert last["perfect_day"] == (last["completed_habits"] == last["total_habits"])
+
+
+def test_series_buckets_from_prefix_sums(client, excel_file_with_data, temp_data_dir, monkeypatch):
+    """Test bucketed sums, averages and counts, including days outside the data."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+    response = client.get("/api/analytics/series", params={
+        "from": "2025-01-26", "to": "2025-01-30", "granularity": "week",
+        "metrics": "sum,avg,completed,entries", "habit": ["habit_Tech + Praca", "habit_Anki"]
+    })
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["buckets"] == [
+        {"start": "2025-01-26", "end": "2025-01-26", "days": 1},
+        {"start": "2025-01-27", "end": "2025-01-30", "days": 4},
+    ]
+    tech = data["series"]["habit_Tech + Praca"]
+    assert tech["sum"] == [0, 125]
+    assert tech["avg"] == [None, 31.25]
+    assert tech["completed"] == [0, 4]
+    assert data["series"]["habit_Anki"]["entries"] == [0, 4]
+
+    monthly = client.get("/api/analytics/series?granularity=month&metrics=completion_rate&habit=habit_Anki").json()
+    assert monthly["buckets"] == [{"start": "2025-01-27", "end": "2025-01-30", "days": 4}]
+    assert monthly["series"]["habit_Anki"]["completion_rate"] == [75.0]
+
+
+def test_series_validation(client):
+    """Test invalid granularity and metrics are rejected."""
+    assert client.get("/api/analytics/series?granularity=hour").status_code == 400
+    assert client.get("/api/analytics/series?metrics=median").status_code == 400
+
+
+def test_productivity_kpis_windows(client, excel_file_with_data, temp_data_dir, monkeypatch):
+    """Test rolling windows against their preceding windows."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+    data = client.get("/api/analytics/productivity-kpis?windows=2,7&compare_last_year=true").json()
+
+    assert data["end"] == "2025-01-30"
+    two_days = data["windows"]["2"]
+    assert two_days["current"] == {"avg": 102.5, "max": 125, "total": 205, "total_hours": 205 / 60}
+    assert two_days["previous"]["total"] == 110
+    assert two_days["change"]["total"] == (205 - 110) / 110 * 100
+    assert two_days["last_year"]["total"] == 0
+    assert two_days["change_vs_last_year"]["total"] == 100
+    assert data["windows"]["7"]["current"]["total"] == 50 + 60 + 80 + 125
+
+    assert client.get("/api/analytics/productivity-kpis?windows=abc").status_code == 400
+
+
+def test_heatmap_bitsets(client, excel_file_with_data, temp_data_dir, monkeypatch):
+    """Test completion bitsets decode to the right days of the year."""
+    import base64
+    import numpy as np
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+    data = client.get("/api/analytics/heatmap?year=2025&habit=habit_Anki").json()
+
+    assert data["start"] == "2025-01-01" and data["days"] == 365
+    anki = data["habits"]["habit_Anki"]
+    completed = np.unpackbits(np.frombuffer(base64.b64decode(anki["completed"]), dtype=np.uint8),
+                              bitorder='little')[:365]
+    logged = np.unpackbits(np.frombuffer(base64.b64decode(anki["logged"]), dtype=np.uint8),
+                           bitorder='little')[:365]
+    # Anki is [0, 1, 1, 1] on Jan 27-30 (days 26-29)
+    assert list(np.flatnonzero(completed)) == [27, 28, 29]
+    assert list(np.flatnonzero(logged)) == [26, 27, 28, 29]
+    assert anki["completed_days"] == 3
+    assert len(base64.b64decode(anki["completed"])) == 46
+
+
+def test_correlations_match_pairwise(client, temp_data_dir):
+    """Test vectorized correlation and next-day lift against a per-pair computation."""
+    import numpy as np
+    import pandas as pd
+    run = [1, 0, 1, 1, 0, 1, 1, 0, 1, 0]
+    pd.DataFrame({
+        'Data': [f"{day:02d}.01.2025" for day in range(1, 11)],
+        'Run': run,
+        'Anki': [1, 0, 1, 1, 0, 0, 1, 0, 1, 1],
+        'Read': [None, 1, 1, 1, 0, 1, 1, 0, 1, 1],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+
+    data = client.get("/api/analytics/correlations", params={
+        "habit": ["habit_Run", "habit_Anki", "habit_Read"], "min_days": 5
+    }).json()
+
+    assert data["habits"] == ["habit_Run", "habit_Anki", "habit_Read"]
+    correlation = data["same_day"]["correlation"]
+    assert correlation[0][0] == pytest.approx(1)
+    expected = np.corrcoef(run, [1, 0, 1, 1, 0, 0, 1, 0, 1, 1])[0, 1]
+    assert correlation[0][1] == pytest.approx(expected)
+    # Read has no entry on Jan 1, so that day is left out of its pairs
+    assert data["same_day"]["days"][0][2] == 9
+    assert correlation[0][2] == pytest.approx(np.corrcoef(run[1:], [1, 1, 1, 0, 1, 1, 0, 1, 1])[0, 1])
+
+    # Read on the day after each run (Jan 10 has no next day)
+    run_days = [d for d in range(9) if run[d]]
+    read = [None, 1, 1, 1, 0, 1, 1, 0, 1, 1]
+    after_run = [read[d + 1] for d in run_days]
+    assert data["next_day"]["days"][0][2] == len(after_run)
+    assert data["next_day"]["rate_if_completed"][0][2] == pytest.approx(sum(after_run) / len(after_run) * 100)
+    baseline = sum(read[1:]) / 9
+    assert data["next_day"]["lift"][0][2] == pytest.approx(sum(after_run) / len(after_run) / baseline)
+
+    # Below min_days the cell is withheld
+    sparse = client.get("/api/analytics/correlations", params={"habit": ["habit_Run"], "min_days": 20}).json()
+    assert sparse["same_day"]["correlation"] == [[None]]
+    assert client.get("/api/analytics/correlations?habit=habit_missing").status_code == 404
+
+
+def test_patterns_match_groupby(client, temp_data_dir):
+    """Test weekday and month-of-year patterns against a pandas groupby over the range."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(7)
+    days = pd.date_range("2024-11-01", "2025-03-31")
+    anki = rng.choice([1, 0, None], size=len(days), p=[0.5, 0.3, 0.2])
+    youtube = rng.integers(0, 120, size=len(days))
+    pd.DataFrame({
+        'Data': days.strftime("%d.%m.%Y"), 'Anki': anki, 'YouTube': youtube,
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+
+    data = client.get("/api/analytics/patterns", params={
+        "habit": ["habit_Anki"], "from": "2024-11-05", "to": "2025-02-20"
+    }).json()
+
+    frame = pd.DataFrame({'day': days, 'anki': anki, 'minutes': youtube})
+    frame = frame[(frame.day >= "2024-11-05") & (frame.day <= "2025-02-20")]
+    logged = frame[frame.anki.notna()]
+
+    weekday = data["weekday"]["habits"]["habit_Anki"]
+    assert weekday["logged"] == logged.groupby(logged.day.dt.weekday).size().reindex(range(7), fill_value=0).tolist()
+    assert weekday["completed"] == (logged.anki == 1).groupby(logged.day.dt.weekday).sum().reindex(range(7), fill_value=0).tolist()
+
+    productivity = data["weekday"]["productivity_minutes"]
+    by_weekday = frame.groupby(frame.day.dt.weekday).minutes
+    assert productivity["days"] == by_weekday.size().tolist()
+    assert productivity["mean"] == pytest.approx(by_weekday.mean().tolist())
+    assert productivity["percentiles"]["50"] == pytest.approx(by_weekday.median().tolist())
+
+    month = data["month_of_year"]["habits"]["habit_Anki"]
+    expected_logged = logged.groupby(logged.day.dt.month).size().reindex(range(1, 13), fill_value=0)
+    assert month["logged"] == expected_logged.tolist()
+    assert month["completion_rate"][5] is None
+    minutes = data["month_of_year"]["productivity_minutes"]
+    assert minutes["avg_daily"][0] == pytest.approx(frame[frame.day.dt.month == 1].minutes.mean())
+    assert minutes["by_year"]["2024"][10] == pytest.approx(frame[frame.day.dt.month == 11].minutes.mean())
+    assert minutes["by_year"]["2025"][10] is None
+
+
+def test_distribution_matches_numpy(client, temp_data_dir):
+    """Test histogram, percentiles and zero days of a time habit and of total productivity."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(3)
+    days = pd.date_range("2025-01-01", "2025-04-30")
+    youtube = np.where(rng.random(len(days)) < 0.3, 0, rng.integers(1, 180, size=len(days)))
+    pd.DataFrame({
+        'Data': days.strftime("%d.%m.%Y"), 'YouTube': youtube, 'Anki': 1,
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+
+    data = client.get("/api/analytics/distribution?habit=habit_YouTube&bins=10").json()
+    assert data["count"] == len(days)
+    assert data["zero_days"] == int((youtube == 0).sum())
+    assert data["zero_day_ratio"] == pytest.approx((youtube == 0).mean())
+    assert data["std"] == pytest.approx(youtube.std())
+    assert data["percentiles"] == pytest.approx({
+        "p50": np.percentile(youtube, 50), "p90": np.percentile(youtube, 90), "p99": np.percentile(youtube, 99)
+    })
+    assert data["histogram"]["counts"] == np.histogram(youtube, bins=10)[0].tolist()
+
+    # A range sorts its own slice; YouTube is the only time habit, so totals match it
+    ranged = client.get("/api/analytics/distribution?from=2025-02-01&to=2025-02-28").json()
+    february = youtube[31:59]
+    assert ranged["habit"] == "productivity"
+    assert ranged["count"] == 28
+    assert ranged["percentiles"]["p90"] == pytest.approx(np.percentile(february, 90))
+    assert ranged["mean"] == pytest.approx(february.mean())
+
+    assert client.get("/api/analytics/distribution?habit=habit_Anki").status_code == 400
+    assert client.get("/api/analytics/distribution?habit=habit_missing").status_code == 404
+
+
+def test_trends_summary_and_chart_series(client, excel_file_with_data, temp_data_dir, monkeypatch):
+    """Test the trends summary and the opt-in trend series of the chart endpoint."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+    data = client.get("/api/analytics/trends").json()
+    assert data["as_of"] == "2025-01-30"
+    productivity = data["trends"]["productivity"]
+    # Total minutes were 50, 60, 80, 125 on Jan 27-30
+    assert productivity["value"] == 125
+    assert productivity["sma_7"] == pytest.approx((50 + 60 + 80 + 125) / 4)
+    assert productivity["slope_28"] == pytest.approx(24.5)
+    assert productivity["direction"] == "up"
+    assert data["trends"]["habit_Anki"]["value"] == 1
+
+    chart = client.get("/api/analytics/productivity-chart-30days?trends=true").json()["chart_data"]
+    assert chart[-1]["trend"]["sma_7"] == pytest.approx(78.75)
+    assert chart[0]["trend"] == {"sma_7": None, "sma_28": None, "ewma_7": None, "ewma_28": None, "slope_28": None}
+    assert "trend" not in client.get("/api/analytics/productivity-chart-30days").json()["chart_data"][-1]
+
+
+def test_series_max_points_joins_buckets(client, excel_file_with_data, temp_data_dir, monkeypatch):
+    """Test max_points caps the points while metrics stay exact over the joined buckets."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+    data = client.get("/api/analytics/series", params={
+        "from": "2025-01-26", "to": "2025-01-30", "metrics": "sum,avg,daily_avg",
+        "habit": "habit_Tech + Praca", "max_points": 2
+    }).json()
+
+    assert data["bucket_size"] == 3
+    assert data["buckets"] == [
+        {"start": "2025-01-26", "end": "2025-01-28", "days": 3},
+        {"start": "2025-01-29", "end": "2025-01-30", "days": 2},
+    ]
+    full = client.get("/api/analytics/series", params={
+        "from": "2025-01-26", "to": "2025-01-30", "metrics": "sum", "habit": "habit_Tech + Praca"
+    }).json()["series"]["habit_Tech + Praca"]["sum"]
+    tech = data["series"]["habit_Tech + Praca"]
+    assert tech["sum"] == [sum(full[:3]), sum(full[3:])]
+    assert tech["avg"] == [sum(full[:3]) / 2, sum(full[3:]) / 2]
+    assert tech["daily_avg"] == [sum(full[:3]) / 3, sum(full[3:]) / 2]
+
+    unchanged = client.get("/api/analytics/series?max_points=100&habit=habit_Anki").json()
+    assert unchanged["bucket_size"] == 1 and len(unchanged["buckets"]) == 4
+    assert client.get("/api/analytics/series?max_points=0").status_code == 422
+
+    # A daily range beyond MAX_BUCKETS days is fine once joined down to max_points
+    long_range = {"from": "2000-01-01", "to": "2025-01-30", "habit": "habit_Anki"}
+    assert client.get("/api/analytics/series", params=long_range).status_code == 400
+    joined = client.get("/api/analytics/series", params={**long_range, "max_points": 50}).json()
+    assert len(joined["buckets"]) <= 50
+    assert sum(joined["series"]["habit_Anki"]["completed"]) == 3
+
+
+def test_accessories_weekly_volume(client, temp_data_dir):
+    """Test accessories codes are tokenized into weekly per-exercise volume."""
+    import pandas as pd
+    dates = ['05.01.2026', '06.01.2026', '07.01.2026', '12.01.2026', '13.01.2026']
+    with pd.ExcelWriter(temp_data_dir / "2026.xlsx") as writer:
+        pd.DataFrame({'Data': dates, 'Tech + Praca': [30] * 5}).to_excel(writer, sheet_name='core', index=False)
+        pd.DataFrame({'Data': dates, 'no_porn': [1] * 5}).to_excel(writer, sheet_name='habits', index=False)
+        pd.DataFrame({'Data': dates, 'accessories': ['Pu20 Cr30', 'sauna', 'pu15x3, Zz5', None, 'Cr40 yoga']}).to_excel(
+            writer, sheet_name='workouts', index=False)
+
+    data = client.get("/api/analytics/accessories").json()
+
+    assert data["exercises"] == ["crunches", "push_ups"]
+    assert data["weeks"] == [
+        {"week": "2026-W02", "start": "2026-01-05", "end": "2026-01-11", "volume": {"crunches": 30, "push_ups": 65}},
+        {"week": "2026-W03", "start": "2026-01-12", "end": "2026-01-18", "volume": {"crunches": 40, "push_ups": 0}},
+    ]
+    assert data["totals"] == {"crunches": 70, "push_ups": 65}
+    assert data["unknown_codes"] == {"Zz": 1}
+
+    ranged = client.get("/api/analytics/accessories?from=2026-01-12&exercise=crunches").json()
+    assert ranged["totals"] == {"crunches": 40}
+
+    # The sauna and yoga session habits are still derived from the same column
+    sauna = client.get("/api/entries/?habit=habit_sauna_session&completed=true").json()
+    assert [entry["date"] for entry in sauna["entries"]] == ["2026-01-06"]
+
+
+def test_accessories_sets_separator_is_case_insensitive():
+    """Test an uppercase X between reps and sets is parsed like a lowercase one."""
+    from datetime import date
+    import pandas as pd
+    from app.services.accessories import parse_accessories
+    frame = pd.DataFrame({'date': [date(2026, 1, 5), date(2026, 1, 6)], 'accessories': ['Pu15X3', 'cr10x2']})
+
+    volume = parse_accessories(frame, {'Pu': 'push_ups', 'Cr': 'crunches'})['volume']
+
+    assert volume[['exercise', 'reps', 'sets', 'volume']].values.tolist() == [
+        ['push_ups', 15, 3, 45], ['crunches', 10, 2, 20]
+    ]
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from app.core.config import settings
+from app.services.dataset_registry import registry
+
+
+@pytest.fixture
+def datasets_root(temp_data_dir, monkeypatch):
+    """Two datasets with one workbook each."""
+    root = temp_data_dir / "datasets"
+    for name, habit in [("alice", "Anki"), ("bob", "YNAB")]:
+        (root / name).mkdir(parents=True)
+        pd.DataFrame({'Data': ['01.01.2025', '02.01.2025'], habit: [1, 1]}).to_excel(
+            root / name / "log.xlsx", index=False)
+    monkeypatch.setattr(settings, "DATASETS_ROOT", str(root))
+    return root
+
+
+def test_url_selects_dataset(client, datasets_root):
+    """Test each dataset serves its own habits and keeps its own config."""
+    alice = client.get("/api/datasets/alice/habits/").json()
+    bob = client.get("/api/datasets/bob/habits/").json()
+
+    assert [h["id"] for h in alice] == ["habit_Anki"]
+    assert [h["id"] for h in bob] == ["habit_YNAB"]
+    assert (datasets_root / "alice" / "habits_config.json").exists()
+
+    response = client.patch("/api/datasets/alice/habits/config",
+                            json={"updates": {"habit_Anki": {"name": "Flashcards"}}})
+    assert response.status_code == 200
+    assert client.get("/api/datasets/alice/habits/").json()[0]["name"] == "Flashcards"
+    assert "habit_Anki" not in registry.get("bob").config_service.load_config()
+
+
+def test_unknown_dataset(client, datasets_root):
+    """Test unknown or invalid dataset names return 404."""
+    assert client.get("/api/datasets/carol/habits/").status_code == 404
+    assert client.get("/api/datasets/..%2Falice/habits/").status_code == 404
+
+    names = [d["name"] for d in client.get("/api/datasets/").json()["datasets"]]
+    assert names == ["default", "alice", "bob"]
+
+
+def test_memory_budget_evicts_least_recently_used(client, datasets_root, monkeypatch):
+    """Test the least recently used dataset is evicted first when over budget."""
+    client.get("/api/datasets/alice/habits/")
+    client.get("/api/datasets/bob/habits/")
+    usage = registry.memory_usage()
+    assert usage["alice"] > 0 and usage["bob"] > 0
+
+    # Room for one dataset only
+    monkeypatch.setattr(settings, "DATASET_MEMORY_BUDGET_MB", max(usage["alice"], usage["bob"]) / (1024 * 1024))
+    assert registry.enforce_budget(keep="bob") == ["alice"]
+    assert registry.memory_usage()["alice"] == 0
+    assert registry.memory_usage()["bob"] == usage["bob"]
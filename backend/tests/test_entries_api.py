@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+from app.api.entries import encode_cursor
+from app.core.config import settings
+
+
+@pytest.fixture
+def entries_data(temp_data_dir, monkeypatch):
+    """Default dataset with two binary habits over five days."""
+    pd.DataFrame({
+        'Data': ['01.01.2025', '02.01.2025', '03.01.2025', '04.01.2025', '05.01.2025'],
+        'Anki': [1, 0, 1, 1, None],
+        'YNAB': [1, 1, 1, 1, 1],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+
+def test_entries_filters(client, entries_data):
+    """Test habit, date range and completion filters."""
+    response = client.get("/api/entries/?habit=habit_Anki&from=2025-01-02&to=2025-01-04&completed=true")
+
+    assert response.status_code == 200
+    assert response.json()["entries"] == [
+        {"habit_id": "habit_Anki", "date": "2025-01-03", "value": "1.0", "completed": True},
+        {"habit_id": "habit_Anki", "date": "2025-01-04", "value": "1.0", "completed": True},
+    ]
+    assert response.json()["next_cursor"] is None
+
+
+def test_entries_cursor_pagination(client, entries_data):
+    """Test pages follow each other without gaps or repeats across habits."""
+    seen = []
+    cursor = None
+    for _ in range(10):
+        url = "/api/entries/?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).json()
+        seen.extend((e["habit_id"], e["date"]) for e in page["entries"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 9
+    assert len(set(seen)) == 9
+    assert seen[:4] == [("habit_Anki", f"2025-01-0{d}") for d in range(1, 5)]
+
+
+def test_entries_cursor_follows_habit(client, entries_data):
+    """Test a cursor resumes at its habit when the requested habit list changes."""
+    page = client.get("/api/entries/?habit=habit_Anki&habit=habit_YNAB&limit=2").json()
+    cursor = page["next_cursor"]
+
+    # Same habit, now second in the list: continues after 2025-01-02
+    resumed = client.get(f"/api/entries/?habit=habit_YNAB&habit=habit_Anki&limit=1&cursor={cursor}").json()
+    assert resumed["entries"][0]["habit_id"] == "habit_Anki"
+    assert resumed["entries"][0]["date"] == "2025-01-03"
+
+    # Habit no longer requested
+    assert client.get(f"/api/entries/?habit=habit_YNAB&cursor={cursor}").status_code == 400
+
+
+def test_entries_errors(client, entries_data):
+    """Test invalid cursors, ranges and habits."""
+    assert client.get("/api/entries/?cursor=not-a-cursor").status_code == 400
+    assert client.get(f"/api/entries/?cursor={encode_cursor('habit_missing', 0)}").status_code == 400
+    assert client.get("/api/entries/?from=2025-02-01&to=2025-01-01").status_code == 400
+    assert client.get("/api/entries/?habit=habit_missing").status_code == 404
@@ -3,6 +3,7 @@ import pandas as pd
 from pathlib import Path
 from app.services.excel_service import ExcelService
 from app.models.habit import Habit, HabitEntry
+from datetime import date
 
 
 def test_find_excel_files(excel_service_with_test_data, excel_file_with_data):
@@ -140,4 +141,271 @@ def test_file_not_found(excel_service_with_test_data, temp_data_dir):
     
     # Should handle gracefully
     assert result['habits'] == []
-    assert result['entries'] == []
\ No newline at end of file
+    assert result['entries'] == []
+
+def _write_multi_sheet(path, dates, no_porn, tech):
+    """Write a minimal 2026-format workbook."""
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({'Data': dates, 'Tech + Praca': tech}).to_excel(writer, sheet_name='core', index=False)
+        pd.DataFrame({'Data': dates, 'no_porn': no_porn}).to_excel(writer, sheet_name='habits', index=False)
+        pd.DataFrame({'Data': dates, 'workout_grade': ['A'] * len(dates)}).to_excel(
+            writer, sheet_name='workouts', index=False)
+
+
+def test_load_data_merges_years(excel_service_with_test_data, temp_data_dir):
+    """Test that yearly workbooks merge into one timeline with reconciled habit IDs."""
+    service = excel_service_with_test_data
+    pd.DataFrame({
+        'Data': ['30.12.2025', '31.12.2025'],
+        'Tech + Praca': [30, 40],
+        'No porn': [1, 1],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+    _write_multi_sheet(temp_data_dir / "2026.xlsx", ['31.12.2025', '01.01.2026', '02.01.2026'],
+                       no_porn=[0, 1, 1], tech=[50, 60, 70])
+
+    data = service.load_data(service.find_excel_files())
+
+    habit_ids = [h.id for h in data['habits']]
+    assert 'habit_no_porn' in habit_ids
+    assert 'habit_No porn' not in habit_ids
+    assert habit_ids.count('habit_Tech + Praca') == 1
+
+    no_porn = {e.date: e for e in data['entries'] if e.habit_id == 'habit_no_porn'}
+    assert sorted(no_porn) == [date(2025, 12, 30), date(2025, 12, 31), date(2026, 1, 1), date(2026, 1, 2)]
+    # The newer workbook wins on overlapping days
+    assert no_porn[date(2025, 12, 31)].completed is False
+
+    timeline = data['timeline']
+    assert timeline.start == date(2025, 12, 30)
+    assert timeline.num_days == 4
+    row = timeline.habit_index['habit_Tech + Praca']
+    assert list(timeline.values[row]) == [30, 50, 60, 70]
+
+    core = data['frames']['core']
+    assert list(core['date']) == [date(2025, 12, 30), date(2025, 12, 31), date(2026, 1, 1), date(2026, 1, 2)]
+
+
+def test_load_data_keeps_same_workbook_columns_separate(excel_service_with_test_data, temp_data_dir):
+    """Test separate Tech and Praca columns of one workbook are not merged into one habit."""
+    service = excel_service_with_test_data
+    pd.DataFrame({
+        'Data': ['01.01.2025', '02.01.2025', '03.01.2025'],
+        'Tech': [60, 30, 45],
+        'Praca': [120, 240, 200],
+        'Anki': [1, 0, 1],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+
+    data = service.load_data(service.find_excel_files())
+
+    timeline = data['timeline']
+    assert {'habit_Tech', 'habit_Praca', 'habit_Anki'} <= set(timeline.habit_ids)
+    assert list(timeline.values[timeline.habit_index['habit_Tech']]) == [60, 30, 45]
+    assert list(timeline.values[timeline.habit_index['habit_Praca']]) == [120, 240, 200]
+    assert list(data['rollup'].productivity_minutes) == [180, 270, 245]
+
+
+def test_load_data_reparses_only_changed_files(excel_service_with_test_data, temp_data_dir, monkeypatch):
+    """Test the per-file cache: unchanged workbooks are not parsed again."""
+    service = excel_service_with_test_data
+    pd.DataFrame({'Data': ['01.01.2025'], 'Anki': [1]}).to_excel(temp_data_dir / "2025.xlsx", index=False)
+    _write_multi_sheet(temp_data_dir / "2026.xlsx", ['01.01.2026'], no_porn=[1], tech=[30])
+
+    # First ingest saves default configs, after which results are steady
+    service.load_data(service.find_excel_files())
+    first = service.load_data(service.find_excel_files())
+
+    parsed_files = []
+    original_parse = service.parse_excel_file
+    monkeypatch.setattr(service, 'parse_excel_file',
+                        lambda path: parsed_files.append(path.name) or original_parse(path))
+
+    assert service.load_data(service.find_excel_files()) is first
+    assert parsed_files == []
+
+    _write_multi_sheet(temp_data_dir / "2026.xlsx", ['01.01.2026', '02.01.2026'], no_porn=[1, 1], tech=[30, 40])
+    second = service.load_data(service.find_excel_files())
+
+    assert parsed_files == ['2026.xlsx']
+    assert second['version'] != first['version']
+    assert second['timeline'].num_days == 367
+
+
+def test_config_changes_apply_without_reparsing(excel_service_with_test_data, temp_data_dir, monkeypatch):
+    """Test renaming or hiding a habit re-merges the cached parses instead of parsing again."""
+    service = excel_service_with_test_data
+    _write_multi_sheet(temp_data_dir / "2026.xlsx", ['01.01.2026', '02.01.2026'], no_porn=[1, 1], tech=[30, 40])
+    first = service.load_data(service.find_excel_files())
+
+    parsed_files = []
+    original_parse = service.parse_excel_file
+    monkeypatch.setattr(service, 'parse_excel_file',
+                        lambda path: parsed_files.append(path.name) or original_parse(path))
+
+    service.config_service.update_habit('habit_Tech + Praca', {'name': 'Deep work', 'order': 99})
+    service.config_service.update_habit('habit_No porn', {'active': False})
+    second = service.load_data(service.find_excel_files())
+
+    assert parsed_files == []
+    assert second['version'] != first['version']
+    tech = next(h for h in second['habits'] if h.id == 'habit_Tech + Praca')
+    assert (tech.name, tech.order) == ('Deep work', 99)
+    assert 'habit_No porn' not in {h.id for h in second['habits']}
+    assert 'habit_No porn' not in {e.habit_id for e in second['entries']}
+
+
+def test_schema_manifest_skips_type_inference(excel_service_with_test_data, excel_file_with_data, sample_excel_data, monkeypatch):
+    """Test column types are compiled once and reused until the header row changes."""
+    service = excel_service_with_test_data
+    first = service.parse_excel_file(excel_file_with_data)
+
+    schema = service.schema_manifest.get(excel_file_with_data, 'core', list(sample_excel_data.columns))
+    assert schema['date_format'] == 'dayfirst'
+    assert schema['columns']['Tech + Praca'] == {'habit_type': 'time', 'category': 'professional_work'}
+    assert 'No porn' not in schema['columns']  # empty columns stay uncompiled
+
+    inferred = []
+    original_determine = service._determine_habit_type
+    monkeypatch.setattr(service, '_determine_habit_type',
+                        lambda values: inferred.append(values.name) or original_determine(values))
+
+    second = service.parse_excel_file(excel_file_with_data)
+    assert inferred == []
+    assert [(h.id, h.habit_type) for h in second['habits']] == [(h.id, h.habit_type) for h in first['habits']]
+
+    sample_excel_data.rename(columns={'Anki': 'Anki cards'}).to_excel(excel_file_with_data, index=False)
+    service.parse_excel_file(excel_file_with_data)
+    assert 'Anki cards' in inferred
+
+
+def test_load_frame_pushdown_matches_merged(excel_service_with_test_data, temp_data_dir, monkeypatch):
+    """Test partial sheet reads return the same rows as slicing the merged dataset."""
+    service = excel_service_with_test_data
+    pd.DataFrame({'Data': ['30.12.2025', '31.12.2025'], 'Tech + Praca': [10, 20], 'Anki': [1, 0]}).to_excel(
+        temp_data_dir / "2025.xlsx", index=False)
+    _write_multi_sheet(temp_data_dir / "2026.xlsx", ['31.12.2025', '01.01.2026', '02.01.2026'],
+                       no_porn=[1, 1, 0], tech=[30, 40, 50])
+    files = service.find_excel_files()
+
+    parsed_files = []
+    monkeypatch.setattr(service, 'parse_excel_file', lambda path: parsed_files.append(path) or {})
+    partial = service.load_frame(files, 'core', columns=['Tech + Praca'], last_days=3)
+    assert parsed_files == []
+    assert list(partial.columns) == ['date', 'Tech + Praca']
+    assert list(partial['date']) == [date(2025, 12, 31), date(2026, 1, 1), date(2026, 1, 2)]
+    assert list(partial['Tech + Praca']) == [30, 40, 50]  # 2026 wins the overlapping day
+    assert service.load_frame(files, 'workouts', end=date(2025, 12, 31))['date'].tolist() == [date(2025, 12, 31)]
+    monkeypatch.undo()
+
+    service.load_data(files)
+    merged = service.load_frame(files, 'core', columns=['Tech + Praca'], last_days=3)
+    pd.testing.assert_frame_equal(partial, merged, check_dtype=False)
+
+
+def test_sorted_values_carried_over_on_append(excel_service_with_test_data, temp_data_dir):
+    """Test cached sorted values are updated in place when days are appended or edited."""
+    import numpy as np
+    from app.services.timeline import PRODUCTIVITY_KEY
+    service = excel_service_with_test_data
+    path = temp_data_dir / "2025.xlsx"
+    pd.DataFrame({'Data': ['01.01.2025', '02.01.2025', '03.01.2025'],
+                  'YouTube': [30, 0, 30], 'Gitara': [10, 20, None]}).to_excel(path, index=False)
+    first = service.load_data(service.find_excel_files())['timeline']
+    first.sorted_values('habit_YouTube')
+    first.sorted_values(PRODUCTIVITY_KEY)
+
+    # Jan 3 edited, Jan 4-5 appended
+    pd.DataFrame({'Data': ['01.01.2025', '02.01.2025', '03.01.2025', '04.01.2025', '05.01.2025'],
+                  'YouTube': [30, 0, 45, 30, 5], 'Gitara': [10, 20, None, None, 15]}).to_excel(path, index=False)
+    second = service.load_data(service.find_excel_files())['timeline']
+
+    assert second is not first
+    assert list(second._sorted_values['habit_YouTube']) == [0, 5, 30, 30, 45]
+    assert list(second._sorted_values[PRODUCTIVITY_KEY]) == [20, 20, 30, 40, 45]
+    assert 'habit_Gitara' not in second._sorted_values
+    assert list(second.sorted_values('habit_Gitara')) == [10, 15, 20]
+
+
+def test_trend_indicators_extend_previous_version(excel_service_with_test_data, temp_data_dir):
+    """Test trend indicators match pandas and are extended, not rebuilt, when days are appended."""
+    import numpy as np
+    service = excel_service_with_test_data
+    path = temp_data_dir / "2025.xlsx"
+    rng = np.random.default_rng(5)
+    minutes = rng.integers(0, 120, size=60).astype(float)
+    days = pd.date_range("2025-01-01", periods=60)
+    pd.DataFrame({'Data': days[:50].strftime("%d.%m.%Y"), 'YouTube': minutes[:50]}).to_excel(path, index=False)
+    service.load_data(service.find_excel_files())
+
+    pd.DataFrame({'Data': days.strftime("%d.%m.%Y"), 'YouTube': minutes}).to_excel(path, index=False)
+    trends = service.load_data(service.find_excel_files())['trends']
+    assert trends.reused_days == 50
+
+    row = [trends.key_index['habit_YouTube']]
+    all_days = np.arange(60)
+    values = trends.indicators(row, all_days)
+    series = pd.Series(minutes)
+    assert values['sma_7'][0] == pytest.approx(series.rolling(7, min_periods=1).mean().to_numpy())
+    assert values['ewma_28'][0] == pytest.approx(series.ewm(span=28, adjust=False).mean().to_numpy())
+    assert values['slope_28'][0, -1] == pytest.approx(np.polyfit(np.arange(28), minutes[-28:], 1)[0])
+
+
+def test_config_and_manifest_stay_in_data_dir(excel_service_with_test_data, excel_file_with_data, temp_data_dir):
+    """Test the habit config and schema manifest are written next to the workbooks."""
+    service = excel_service_with_test_data
+    service.load_data(service.find_excel_files())
+
+    assert service.config_service.config_path == temp_data_dir / "habits_config.json"
+    assert service.schema_manifest.manifest_path == temp_data_dir / "schema_manifest.json"
+    assert (temp_data_dir / "habits_config.json").exists()
+    assert (temp_data_dir / "schema_manifest.json").exists()
+
+
+def test_cache_memory_counts_timeline_caches(excel_service_with_test_data, excel_file_with_data):
+    """Test caches built lazily on the timeline count towards the dataset's memory."""
+    service = excel_service_with_test_data
+    timeline = service.load_data(service.find_excel_files())['timeline']
+    before = service.cache_memory_bytes()
+
+    prefix = timeline.prefix_sums()
+    index = timeline.streak_index('habit_Anki')
+    timeline.sorted_values('habit_Tech + Praca')
+
+    grown = service.cache_memory_bytes() - before
+    assert grown >= prefix.memory_bytes() + index.memory_bytes()
+    assert timeline.memory_bytes() > timeline.values.nbytes
+
+
+def test_cached_query_keeps_most_recent(monkeypatch):
+    """Test request-keyed results are kept in a bounded LRU."""
+    from app.services.timeline import HabitTimeline
+    timeline = HabitTimeline([], [])
+    monkeypatch.setattr(HabitTimeline, 'QUERY_CACHE_SIZE', 2)
+    computed = []
+
+    def query(key):
+        return timeline.cached_query(('q', key), lambda: computed.append(key) or key)
+
+    for key in [1, 2, 1, 3]:
+        query(key)
+    assert query(1) == 1 and query(3) == 3
+    assert computed == [1, 2, 3]
+    query(2)  # evicted as least recently used
+    assert computed == [1, 2, 3, 2]
+
+
+def test_timeline_memory_is_tracked_as_caches_fill(monkeypatch):
+    """Test cache sizes are added when entries are stored and removed when evicted."""
+    import numpy as np
+    from app.services.timeline import HabitTimeline
+    timeline = HabitTimeline([], [])
+    monkeypatch.setattr(HabitTimeline, 'QUERY_CACHE_SIZE', 1)
+    empty = timeline.memory_bytes()
+
+    timeline.cached(('big',), lambda: np.zeros(1000))
+    assert timeline.memory_bytes() >= empty + 8000
+    with_cached = timeline.memory_bytes()
+
+    timeline.cached_query(('q', 1), lambda: np.zeros(500))
+    assert timeline.memory_bytes() >= with_cached + 4000
+    timeline.cached_query(('q', 2), lambda: np.zeros(10))  # evicts the first result
+    assert with_cached < timeline.memory_bytes() < with_cached + 4000
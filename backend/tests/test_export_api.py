@@ -0,0 +1,57 @@
+import io
+import json
+import pandas as pd
+import pytest
+from app.core.config import settings
+
+
+@pytest.fixture
+def export_data(temp_data_dir, monkeypatch):
+    """Default dataset with one small workbook."""
+    pd.DataFrame({
+        'Data': ['01.01.2025', '02.01.2025', '03.01.2025'],
+        'Anki': [1, 0, 1],
+        'sport': ['bieganie', None, 'siłownia'],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+
+def test_export_csv(client, export_data):
+    """Test CSV export of all entries ordered by date."""
+    response = client.get("/api/export/?format=csv")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    frame = pd.read_csv(io.StringIO(response.text))
+    assert list(frame.columns) == ['date', 'habit_id', 'value', 'numeric_value', 'completed']
+    assert len(frame) == 5
+    assert list(frame['date']) == sorted(frame['date'])
+
+
+def test_export_ndjson_filtered(client, export_data):
+    """Test NDJSON export filtered by habit and date range."""
+    response = client.get("/api/export/?format=ndjson&habit=habit_sport&from=2025-01-02")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [{
+        'date': '2025-01-03', 'habit_id': 'habit_sport', 'value': 'siłownia',
+        'numeric_value': None, 'completed': False
+    }]
+
+
+def test_export_parquet_and_arrow(client, export_data):
+    """Test the binary formats round-trip through pyarrow."""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    parquet = pq.read_table(io.BytesIO(client.get("/api/export/?format=parquet").content))
+    arrow = pa.ipc.open_stream(client.get("/api/export/?format=arrow&habit=habit_Anki").content).read_all()
+
+    assert parquet.num_rows == 5
+    assert arrow.column('numeric_value').to_pylist() == [1.0, 0.0, 1.0]
+
+
+def test_export_errors(client, export_data):
+    """Test invalid format and unknown habits."""
+    assert client.get("/api/export/?format=xml").status_code == 400
+    assert client.get("/api/export/?habit=habit_missing").status_code == 404
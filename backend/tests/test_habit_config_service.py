@@ -0,0 +1,100 @@
+import json
+import threading
+import pytest
+from app.services.habit_config_service import HabitConfig, HabitConfigService
+
+
+@pytest.fixture
+def config_service(temp_data_dir):
+    """Create a HabitConfigService backed by a temporary file."""
+    return HabitConfigService(str(temp_data_dir / "habits_config.json"))
+
+
+def _config(name, order=0):
+    return HabitConfig(name=name, emoji="📝", order=order)
+
+
+def test_load_config_reloads_on_external_change(config_service):
+    """Test the in-memory config picks up edits made by another process."""
+    config_service.save_config({"habit_a": _config("A")})
+    assert config_service.load_config()["habit_a"].name == "A"
+
+    # Simulate another worker rewriting the file
+    with open(config_service.config_path, "w", encoding="utf-8") as f:
+        json.dump({"habit_a": _config("Renamed").model_dump()}, f)
+
+    assert config_service.load_config()["habit_a"].name == "Renamed"
+
+
+def test_load_config_returns_copies(config_service):
+    """Test that mutating a loaded config does not leak into the cache."""
+    config_service.save_config({"habit_a": _config("A")})
+
+    config_service.load_config()["habit_a"].name = "Mutated"
+
+    assert config_service.load_config()["habit_a"].name == "A"
+
+
+def test_register_defaults_single_write_keeps_existing(config_service, monkeypatch):
+    """Test new habit defaults are written once and never override user edits."""
+    config_service.save_config({"habit_a": _config("User name")})
+    writes = []
+    original_write = config_service._write
+    monkeypatch.setattr(config_service, "_write", lambda config: writes.append(1) or original_write(config))
+
+    config_service.register_defaults({
+        "habit_a": _config("Default name"),
+        "habit_b": _config("B"),
+        "habit_c": _config("C"),
+    })
+
+    assert len(writes) == 1
+    config = config_service.load_config()
+    assert config["habit_a"].name == "User name"
+    assert set(config) == {"habit_a", "habit_b", "habit_c"}
+
+
+def test_update_and_delete_habit(config_service):
+    """Test single-habit updates and soft deletes."""
+    config_service.save_config({"habit_a": _config("A")})
+
+    assert config_service.update_habit("habit_a", {"name": "New", "order": 3})
+    assert config_service.delete_habit("habit_a")
+    assert not config_service.update_habit("missing", {"name": "x"})
+
+    config = config_service.load_config()
+    assert config["habit_a"].name == "New"
+    assert config["habit_a"].order == 3
+    assert config["habit_a"].active is False
+
+
+def test_writes_are_atomic(config_service, temp_data_dir):
+    """Test no temporary files are left behind and the file is valid JSON."""
+    config_service.save_config({"habit_a": _config("A")})
+    config_service.update_habit("habit_a", {"name": "B"})
+
+    leftovers = [p.name for p in temp_data_dir.iterdir() if p.suffix == ".tmp"]
+    assert leftovers == []
+    with open(config_service.config_path, encoding="utf-8") as f:
+        assert json.load(f)["habit_a"]["name"] == "B"
+
+
+def test_concurrent_updates_are_not_lost(config_service, temp_data_dir):
+    """Test concurrent writers from separate service instances don't drop updates."""
+    habit_ids = [f"habit_{i}" for i in range(8)]
+    config_service.save_config({habit_id: _config(habit_id) for habit_id in habit_ids})
+
+    def worker(habit_id):
+        # Separate instances behave like separate worker processes
+        service = HabitConfigService(str(config_service.config_path))
+        for i in range(5):
+            service.update_habit(habit_id, {"order": i + 1})
+
+    threads = [threading.Thread(target=worker, args=(habit_id,)) for habit_id in habit_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    config = config_service.load_config()
+    assert all(config[habit_id].order == 5 for habit_id in habit_ids)
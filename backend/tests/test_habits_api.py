@@ -0,0 +1,180 @@
+import pytest
+from unittest.mock import patch
+from app.services.habit_config_service import HabitConfig, HabitConfigService
+
+
+@pytest.fixture
+def config_service(temp_data_dir):
+    """Habit config service with two habits, patched into the habits API."""
+    service = HabitConfigService(str(temp_data_dir / "habits_config.json"))
+    service.save_config({
+        "habit_anki": HabitConfig(name="Anki", emoji="🧠", order=1),
+        "habit_ynab": HabitConfig(name="YNAB", emoji="💰", order=2),
+    })
+    with patch('app.api.habits.config_service', service):
+        yield service
+
+
+def test_patch_config_applies_batch_in_one_write(client, config_service):
+    """Test that a batch of updates is applied with a single config write."""
+    with patch.object(config_service, '_write', wraps=config_service._write) as write:
+        response = client.patch("/api/habits/config", json={
+            "updates": {
+                "habit_anki": {"name": "Anki cards", "order": 2},
+                "habit_ynab": {"active": False, "order": 1},
+            }
+        })
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["updated"] == 2
+    assert data["version"] == config_service.version_tag()
+    assert write.call_count == 1
+
+    config = config_service.load_config()
+    assert config["habit_anki"].name == "Anki cards"
+    assert config["habit_anki"].order == 2
+    assert config["habit_ynab"].active is False
+
+
+def test_patch_config_unknown_habit_writes_nothing(client, config_service):
+    """Test that one unknown habit rejects the whole batch."""
+    version = config_service.version_tag()
+
+    response = client.patch("/api/habits/config", json={
+        "updates": {"habit_anki": {"name": "Changed"}, "habit_missing": {"active": False}}
+    })
+
+    assert response.status_code == 404
+    assert "habit_missing" in response.json()["detail"]
+    assert config_service.version_tag() == version
+    assert config_service.load_config()["habit_anki"].name == "Anki"
+
+
+def test_patch_config_version_conflict(client, config_service):
+    """Test optimistic concurrency with expected_version."""
+    first = client.patch("/api/habits/config", json={"updates": {"habit_anki": {"order": 5}}})
+    stale_version = "0"
+
+    response = client.patch("/api/habits/config", json={
+        "updates": {"habit_anki": {"order": 6}}, "expected_version": stale_version
+    })
+    assert response.status_code == 409
+
+    response = client.patch("/api/habits/config", json={
+        "updates": {"habit_anki": {"order": 6}}, "expected_version": first.json()["version"]
+    })
+    assert response.status_code == 200
+    assert config_service.load_config()["habit_anki"].order == 6
+
+
+@pytest.fixture
+def streak_data(temp_data_dir):
+    """Anki: done, done, missed, done, (no entry), done."""
+    import pandas as pd
+    pd.DataFrame({
+        'Data': ['01.01.2025', '02.01.2025', '03.01.2025', '04.01.2025', '05.01.2025', '06.01.2025'],
+        'Anki': [1, 1, 0, 1, None, 1],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+
+
+def test_streak_as_of(client, streak_data):
+    """Test as-of streak queries against entries up to that date."""
+    def streak(as_of):
+        response = client.get(f"/api/habits/habit_Anki/streak?as_of={as_of}")
+        assert response.status_code == 200
+        return {k: response.json()[k] for k in ('current_streak', 'best_streak', 'completed_today')}
+
+    assert streak("2024-12-31") == {'current_streak': 0, 'best_streak': 0, 'completed_today': False}
+    assert streak("2025-01-02") == {'current_streak': 2, 'best_streak': 2, 'completed_today': True}
+    # An unfilled as-of day doesn't break the streak, a logged miss before it does
+    assert streak("2025-01-03") == {'current_streak': 2, 'best_streak': 2, 'completed_today': False}
+    assert streak("2025-01-04") == {'current_streak': 1, 'best_streak': 2, 'completed_today': True}
+    assert streak("2025-01-06") == {'current_streak': 2, 'best_streak': 2, 'completed_today': True}
+
+    batch = client.get("/api/habits/streaks?as_of=2025-01-05").json()
+    assert batch["streaks"]["habit_Anki"] == {'current_streak': 1, 'best_streak': 2, 'completed_today': False}
+    assert client.get("/api/habits/habit_missing/streak").status_code == 404
+
+
+def test_habit_detail(client, streak_data):
+    """Test streak runs, top streaks and monthly rates of one habit."""
+    response = client.get("/api/habits/habit_Anki/detail?top=1")
+    assert response.status_code == 200
+    detail = response.json()
+
+    assert detail["streak_runs"] == [
+        {"start": "2025-01-01", "end": "2025-01-02", "length": 2},
+        {"start": "2025-01-04", "end": "2025-01-06", "length": 2},
+    ]
+    # Ties go to the most recent run
+    assert detail["top_streaks"] == [{"start": "2025-01-04", "end": "2025-01-06", "length": 2}]
+    assert detail["monthly"] == [
+        {"month": "2025-01", "days": 6, "logged": 5, "completed": 4, "completion_rate": pytest.approx(400 / 6)}
+    ]
+    assert detail["minutes"] is None
+    assert client.get("/api/habits/habit_missing/detail").status_code == 404
+
+
+def test_time_habit_detail_records(client, temp_data_dir):
+    """Test total minutes and best day/week/month of a time habit."""
+    import pandas as pd
+    pd.DataFrame({
+        'Data': ['30.01.2025', '31.01.2025', '01.02.2025', '03.02.2025', '04.02.2025'],
+        'YouTube': [30, 60, 20, 45, 50],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+
+    detail = client.get("/api/habits/habit_YouTube/detail").json()
+    assert detail["habit_type"] == "time"
+    assert detail["minutes"] == {
+        "total": 205.0,
+        "best_day": {"period": "2025-01-31", "minutes": 60.0},
+        "best_week": {"period": "2025-01-27", "minutes": 110.0},
+        "best_month": {"period": "2025-02", "minutes": 115.0},
+    }
+    assert [m["month"] for m in detail["monthly"]] == ["2025-01", "2025-02"]
+
+
+def test_weekly_target_progress(client, config_service, temp_data_dir):
+    """Test current-week progress, hit streaks and hit rate of a 2x weekly target."""
+    import pandas as pd
+    days = pd.date_range("2025-01-06", "2025-02-02")
+    done = {"2025-01-06", "2025-01-08", "2025-01-14", "2025-01-20", "2025-01-22", "2025-01-25",
+            "2025-01-28", "2025-01-31"}
+    pd.DataFrame({
+        'Data': days.strftime("%d.%m.%Y"),
+        'Yoga': [1 if str(day.date()) in done else 0 for day in days],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+
+    config = config_service.load_config()
+    config["habit_Yoga"] = HabitConfig(name="Yoga", emoji="🧘")
+    config_service.save_config(config)
+    assert client.get("/api/habits/habit_Yoga/target").status_code == 404
+    response = client.put("/api/habits/habit_Yoga", json={"target_count": 2, "target_period": "week"})
+    assert response.status_code == 200
+
+    # Weeks: hit, miss, hit, and Jan 31 is still ahead in the open week
+    progress = client.get("/api/habits/habit_Yoga/target?as_of=2025-01-29").json()
+    assert progress["current"] == {"period": "2025-W05", "start": "2025-01-27", "end": "2025-02-02",
+                                   "count": 1, "hit": False, "remaining": 1}
+    assert progress["current_hit_streak"] == 1
+    assert progress["best_hit_streak"] == 1
+    assert progress["hit_rate"] == pytest.approx(200 / 3)
+    assert [week["count"] for week in progress["history"]] == [2, 1, 3, 1]
+
+    progress = client.get("/api/habits/targets?as_of=2025-02-02").json()["targets"]["habit_Yoga"]
+    assert progress["current"]["hit"] is True
+    assert progress["current_hit_streak"] == 2
+    assert progress["best_hit_streak"] == 2
+
+    # The following week starts empty without breaking the streak
+    progress = client.get("/api/habits/habit_Yoga/target?as_of=2025-02-04").json()
+    assert progress["current"]["count"] == 0
+    assert progress["current_hit_streak"] == 2
+    assert progress["hit_rate"] == 75
+
+    client.put("/api/habits/habit_Yoga", json={"target_count": 3, "target_period": "month"})
+    progress = client.get("/api/habits/habit_Yoga/target?as_of=2025-01-31").json()
+    assert progress["current"]["period"] == "2025-01"
+    assert progress["current"]["count"] == 8
+    assert client.put("/api/habits/habit_Yoga", json={"target_period": "year"}).status_code == 422
@@ -0,0 +1,94 @@
+import time
+import pandas as pd
+import pytest
+from app.core.config import settings
+
+
+@pytest.fixture
+def review_data(temp_data_dir, monkeypatch):
+    """Default dataset with a binary and a time habit across New Year."""
+    pd.DataFrame({
+        'Data': ['30.12.2024', '31.12.2024', '01.01.2025', '02.01.2025', '03.01.2025', '04.01.2025'],
+        'Anki': [1, 1, 1, 1, 0, 1],
+        'YouTube': [10, 20, 30, 0, 40, 50],
+    }).to_excel(temp_data_dir / "2025.xlsx", index=False)
+    monkeypatch.setattr(settings, "EXCEL_DATA_PATH", str(temp_data_dir))
+
+
+def wait_for(client, job_id):
+    for _ in range(200):
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_year_review_job_is_cached_per_version(client, review_data, temp_data_dir):
+    """Test a year review runs in the background and is reused until the data changes."""
+    response = client.post("/api/jobs/", json={"kind": "year_review", "params": {"year": 2025}})
+    assert response.status_code == 202
+    job = wait_for(client, response.json()["id"])
+
+    assert job["status"] == "done" and job["progress"] == 1
+    review = job["result"]
+    anki = next(habits["habit_Anki"] for habits in review["categories"].values() if "habit_Anki" in habits)
+    # The streak from 2024 is clipped to the year
+    assert anki == {"name": "Anki", "logged": 4, "completed": 3, "completion_rate": 75, "longest_streak": 2}
+    assert review["productivity"]["total_minutes"] == 120
+    assert review["productivity"]["monthly_minutes"] == [120] + [0] * 11
+
+    again = client.post("/api/jobs/", json={"kind": "year_review", "params": {"year": 2025}})
+    assert again.status_code == 200
+    assert again.json()["cached"] is True and again.json()["id"] == job["id"]
+
+    time.sleep(0.01)
+    pd.DataFrame({'Data': ['01.01.2025'], 'Anki': [1], 'YouTube': [5]}).to_excel(temp_data_dir / "2025.xlsx", index=False)
+    changed = client.post("/api/jobs/", json={"kind": "year_review", "params": {"year": 2025}})
+    assert changed.status_code == 202 and changed.json()["id"] != job["id"]
+    assert wait_for(client, changed.json()["id"])["result"]["productivity"]["total_minutes"] == 5
+
+
+def test_job_errors(client, review_data):
+    """Test unknown kinds, unknown jobs and failing analyses."""
+    assert client.post("/api/jobs/", json={"kind": "nope"}).status_code == 400
+    assert client.get("/api/jobs/missing").status_code == 404
+
+    response = client.post("/api/jobs/", json={"kind": "correlations", "params": {"habits": ["habit_missing"]}})
+    job = wait_for(client, response.json()["id"])
+    assert job["status"] == "failed"
+    assert "habit_missing" in job["error"]
+    assert any(j["id"] == job["id"] for j in client.get("/api/jobs/").json()["jobs"])
+
+
+def test_jobs_are_scoped_to_their_dataset(client, review_data, temp_data_dir, monkeypatch):
+    """Test a job is only listed and readable through the dataset it ran on."""
+    root = temp_data_dir / "datasets"
+    (root / "alice").mkdir(parents=True)
+    pd.DataFrame({'Data': ['01.01.2025'], 'Anki': [1]}).to_excel(root / "alice" / "log.xlsx", index=False)
+    monkeypatch.setattr(settings, "DATASETS_ROOT", str(root))
+
+    job_id = client.post("/api/datasets/alice/jobs/", json={"kind": "year_review"}).json()["id"]
+
+    assert client.get(f"/api/datasets/alice/jobs/{job_id}").status_code == 200
+    assert [j["id"] for j in client.get("/api/datasets/alice/jobs/").json()["jobs"]] == [job_id]
+    assert client.get(f"/api/jobs/{job_id}").status_code == 404
+    assert client.get("/api/jobs/").json()["jobs"] == []
+
+
+def test_submit_leaves_parsing_to_the_worker(client, review_data, monkeypatch):
+    """Test submitting a job on a cold dataset doesn't load the data in the request."""
+    import threading
+    from app.services.excel_service import ExcelService
+    loaded_on = []
+    original_load = ExcelService.load_data
+    monkeypatch.setattr(ExcelService, "load_data", lambda self, files: (
+        loaded_on.append(threading.current_thread().name) or original_load(self, files)))
+
+    job = wait_for(client, client.post("/api/jobs/", json={"kind": "year_review"}).json()["id"])
+
+    assert job["status"] == "done"
+    assert loaded_on and all(name.startswith("analysis-job") for name in loaded_on)
+    # Once loaded, the signature-based version matches the loaded one, so the job is reused
+    again = client.post("/api/jobs/", json={"kind": "year_review"}).json()
+    assert again["cached"] is True and again["id"] == job["id"]
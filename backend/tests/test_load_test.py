@@ -0,0 +1,30 @@
+from benchmarks.load_test import load_access_log, percentile, route_key
+
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles used in the load test report."""
+    values = [float(v) for v in range(1, 101)]
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7
+    assert percentile([], 50) == 0
+
+
+def test_load_access_log(tmp_path):
+    """Test parsing uvicorn and common log format request lines."""
+    log = tmp_path / "access.log"
+    log.write_text(
+        'INFO:     127.0.0.1:5000 - "GET /api/habits/ HTTP/1.1" 200 OK\n'
+        '10.0.0.2 - - [19/Oct/2026:10:00:00 +0000] "GET /api/analytics/calendar?days=30 HTTP/1.1" 200 512\n'
+        'INFO:     127.0.0.1:5001 - "PUT /api/habits/habit_Anki HTTP/1.1" 200 OK\n'
+        'some unrelated line\n'
+    )
+
+    assert load_access_log(log, include_writes=False) == [
+        ("GET", "/api/habits/"),
+        ("GET", "/api/analytics/calendar?days=30"),
+    ]
+    assert len(load_access_log(log, include_writes=True)) == 3
+    assert route_key("GET", "/api/analytics/calendar?days=30") == "GET /api/analytics/calendar"
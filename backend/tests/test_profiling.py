@@ -0,0 +1,86 @@
+import pytest
+from app.core.config import settings
+from app.core.profiling import CallTreeNode
+
+
+@pytest.fixture
+def trusted_testclient(monkeypatch):
+    """Trust the TestClient's fake client host for profiling."""
+    monkeypatch.setattr(settings, "PROFILING_TRUSTED_HOSTS", "testclient")
+
+
+def test_profile_header_returns_call_tree(client, trusted_testclient):
+    """Test that X-Profile: 1 returns the profile instead of the body."""
+    response = client.get("/health", headers={"X-Profile": "1"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["path"] == "/health"
+    assert data["status_code"] == 200
+    assert "duration_ms" in data
+    assert data["call_tree"]["function"] == "<request>"
+    assert "X-Profile-Duration-Ms" in response.headers
+
+
+def test_profile_query_flag(client, trusted_testclient):
+    """Test that ?profile=1 works like the header."""
+    response = client.get("/health?profile=1")
+
+    assert "call_tree" in response.json()
+
+
+def test_profile_ignored_for_untrusted_client(client):
+    """Test that untrusted clients get the normal response."""
+    response = client.get("/health", headers={"X-Profile": "1"})
+
+    assert response.json() == {"status": "healthy"}
+
+
+def test_slow_requests_saved_and_rotated(client, temp_data_dir, monkeypatch):
+    """Test threshold mode saves profiles and keeps only the newest files."""
+    profile_dir = temp_data_dir / "profiles"
+    monkeypatch.setattr(settings, "PROFILE_SLOW_REQUEST_MS", 0.0001)
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(profile_dir))
+    monkeypatch.setattr(settings, "PROFILE_MAX_FILES", 2)
+
+    for _ in range(3):
+        response = client.get("/health")
+        # Normal body is still returned in threshold mode
+        assert response.json() == {"status": "healthy"}
+
+    assert len(list(profile_dir.glob("*.json"))) == 2
+
+
+def test_call_tree_aggregates_stacks():
+    """Test that sampled stacks are merged into a call tree."""
+    root = CallTreeNode("<request>", "", 0)
+    root.add_stack([("handler", "a.py", 1), ("parse", "b.py", 2)])
+    root.add_stack([("handler", "a.py", 1), ("parse", "b.py", 2)])
+    root.add_stack([("handler", "a.py", 1), ("streaks", "c.py", 3)])
+
+    tree = root.to_dict(interval_ms=5)
+
+    assert tree["samples"] == 3
+    handler = tree["children"][0]
+    assert handler["function"] == "handler"
+    assert handler["samples"] == 3
+    assert [child["function"] for child in handler["children"]] == ["parse", "streaks"]
+    assert handler["children"][0]["time_ms"] == 10
+
+
+def test_threshold_mode_streams_response(client, excel_file_with_data, temp_data_dir, monkeypatch):
+    """Test threshold mode passes streamed bodies through and saves the profile once they finish."""
+    from app.core import profiling
+    profile_dir = temp_data_dir / "profiles"
+    monkeypatch.setattr(settings, "PROFILE_SLOW_REQUEST_MS", 0.0001)
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(profile_dir))
+
+    saved = []
+    monkeypatch.setattr(profiling, "_save_slow_profile", lambda profile: saved.append(profile))
+    with client.stream("GET", "/api/export/?format=csv") as response:
+        body = b"".join(response.iter_bytes())
+
+    # The whole export still arrives, and the profile covers the streamed body
+    assert response.headers["content-type"].startswith("text/csv")
+    assert body.startswith(b"date,habit_id,value")
+    assert len(saved) == 1 and saved[0]["path"] == "/api/export/"
@@ -0,0 +1,39 @@
+import pandas as pd
+from benchmarks.workbook_generator import (
+    generate_multi_sheet_workbook,
+    generate_single_sheet_workbook,
+)
+
+
+def test_single_sheet_workbook_parses(excel_service_with_test_data, temp_data_dir):
+    """Test the 2025-format generator produces a parseable workbook."""
+    path = generate_single_sheet_workbook(temp_data_dir / "single.xlsx", years=0.1, habits=8)
+
+    df = pd.read_excel(path)
+    assert len(df) == 36
+    assert {'Data', 'WEEKDAY', 'Tech + Praca', 'Razem', 'accessories'}.issubset(df.columns)
+
+    result = excel_service_with_test_data.parse_excel_file(path)
+    assert any(h.habit_type == 'time' for h in result['habits'])
+    assert any(h.habit_type == 'binary' for h in result['habits'])
+
+
+def test_multi_sheet_workbook_parses(excel_service_with_test_data, temp_data_dir):
+    """Test the 2026-format generator produces core/habits/workouts sheets."""
+    path = generate_multi_sheet_workbook(temp_data_dir / "multi.xlsx", years=0.1, habits=12)
+
+    assert set(pd.ExcelFile(path).sheet_names) == {'core', 'habits', 'workouts'}
+
+    result = excel_service_with_test_data.parse_excel_file(path)
+    habit_ids = {h.id for h in result['habits']}
+    assert 'habit_workout_grade' in habit_ids
+    assert 'habit_sauna_session' in habit_ids
+    assert 'habit_habit_11' in habit_ids
+
+
+def test_sparsity_blanks_cells(temp_data_dir):
+    """Test that sparsity controls the fraction of blank habit cells."""
+    path = generate_single_sheet_workbook(temp_data_dir / "sparse.xlsx", years=1, habits=5, sparsity=0.5)
+
+    blank_ratio = pd.read_excel(path)['YNAB'].isna().mean()
+    assert 0.4 < blank_ratio < 0.6